@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        csvindex.py
+# Purpose:     seekable date index for the append-only csv files
+#
+# The SoC, uptime, internal values and wxdata csv files are only appended
+# to and every line starts with 'dd.mm.yyyy'. For every file a small sidecar
+# keeps the byte offset of the first line of each day:
+#
+#   INDEXPATH/<csv name>.idx     size, inode, day -> offset
+#
+# The index is brought up to date on every use (or by the writer after the
+# append), only the bytes appended since then are scanned. A time window
+# read seeks straight to the first line of the window, so the 24h and week
+# plots do not depend on the size of the file.
+# If the csv was rewritten (smaller than the indexed size or new inode) the
+# index is rebuilt.
+#
+# usage:
+#   from csvindex import read_window
+#   lines = read_window(wospi.UPTIMEFILE, date(2026, 10, 16))
+#
+#   python csvindex.py <csv> ...   ... update the index of the files
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import config
+import os, sys
+import io
+import json
+
+# from local module
+from wxtools import print_dbg
+
+#-------------------------------------------------------------------------------
+
+INDEXPATH    = getattr(config, 'INDEXPATH', config.CSVPATH + 'index/')
+
+# read the whole file if disabled
+USE_CSVINDEX = getattr(config, 'USE_CSVINDEX', True)
+
+DEBUG = False
+
+#-------------------------------------------------------------------------------
+
+def index_name(csvfile):
+    return INDEXPATH + os.path.basename(csvfile) + '.idx'
+
+
+def read_index(csvfile):
+    """ index of a csv, None if there is none yet
+    """
+    try:
+        with open(index_name(csvfile), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_index(csvfile, idx):
+    """ replace the index file atomically
+    """
+    try:
+        if not os.path.isdir(INDEXPATH):
+            os.makedirs(INDEXPATH)
+
+        tmpfile = index_name(csvfile) + '.tmp'
+        with open(tmpfile, 'w') as f:
+            json.dump(idx, f)
+        os.replace(tmpfile, index_name(csvfile))
+
+    except OSError as e:
+        # still usable for this run
+        print_dbg(True, "WARN : cannot write index of %s: %s" % (csvfile, e))
+
+    return
+
+
+def csv_day(line):
+    """ b'dd.mm.yyyy ...' -> 'yyyy-mm-dd', None for other lines
+    """
+    if line[2:3] == b'.' and line[5:6] == b'.' and line[:2].isdigit():
+        return (line[6:10] + b'-' + line[3:5] + b'-' + line[:2]).decode('ascii', 'replace')
+    return None
+
+
+def update_index(csvfile):
+    """ index the lines appended since the last update
+        returns the index
+    """
+    st  = os.stat(csvfile)
+    idx = read_index(csvfile)
+
+    if idx is None or idx['inode'] != st.st_ino or idx['size'] > st.st_size:
+        if idx is not None:
+            print_dbg(True, "INFO : %s was rewritten, rebuilding index" % csvfile)
+        idx = {'size': 0, 'inode': st.st_ino, 'days': {}}
+
+    if idx['size'] == st.st_size:
+        return idx
+
+    days = idx['days']
+    pos  = idx['size']
+    with open(csvfile, 'rb') as f:
+        f.seek(pos)
+        for line in f:
+            if not line.endswith(b'\n'):
+                # incomplete last line, the writer is not done yet
+                break
+
+            day = csv_day(line)
+            if day is not None and day not in days:
+                days[day] = pos
+            pos += len(line)
+
+    print_dbg(DEBUG, "DEBUG: indexed %s: %d -> %d bytes, %d days" % (csvfile, idx['size'], pos, len(days)))
+
+    idx['size'] = pos
+    write_index(csvfile, idx)
+
+    return idx
+
+
+def window_offset(csvfile, start_date):
+    """ byte offset of the first line at or after start_date
+    """
+    if not USE_CSVINDEX:
+        return 0
+
+    idx   = update_index(csvfile)
+    start = start_date.strftime('%Y-%m-%d')
+
+    # the minimum, in case a day was appended out of order
+    offsets = [off for day, off in idx['days'].items() if day >= start]
+    if offsets:
+        return min(offsets)
+
+    return idx['size']
+
+
+def read_from(csvfile, offset):
+    """ lines of the csv from offset to the end
+    """
+    with open(csvfile, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+
+    return io.TextIOWrapper(io.BytesIO(data)).readlines()
+
+
+def read_window(csvfile, start_date):
+    """ lines of the csv from the first line of start_date on,
+        earlier lines are not read
+    """
+    return read_from(csvfile, window_offset(csvfile, start_date))
+
+
+def last_line(csvfile):
+    """ last line of the csv, only the last day is read
+    """
+    offset = 0
+    if USE_CSVINDEX:
+        days = update_index(csvfile)['days']
+        if days:
+            offset = days[max(days)]
+
+    lines = read_from(csvfile, offset)
+    if not lines and offset:
+        lines = read_from(csvfile, 0)
+
+    return lines[-1] if lines else ''
+
+#-------------------------------------------------------------------------------
+
+def main():
+    if len(sys.argv) < 2:
+        print("usage: %s <csv> ..." % sys.argv[0])
+        sys.exit(1)
+
+    for csvfile in sys.argv[1:]:
+        idx = update_index(csvfile)
+        print_dbg(True, "INFO : %s: %d days, %d bytes" % (csvfile, len(idx['days']), idx['size']))
+
+
+if __name__ == '__main__':
+    main()
@@ -62,6 +62,7 @@ import pytz
 import re
 import csv
 import config
+import csvindex
 
 
 # cwop passcode
@@ -186,10 +187,11 @@ def read_last_csv_line(infile):
     """ read last line from csv YYYY-MM-wxdata.csv
     """
     try:
-        with open(infile, 'r') as f:
-            last_line = f.readlines()[-1].split(",")
-
-        f.close()
+        # only the last day is read
+        last_line = csvindex.last_line(infile)
+        if not last_line:
+            raise ValueError('%s is empty' % infile)
+        last_line = last_line.split(",")
     except Exception as e:
         print('Done with exception(s): %s.' % e)
         errStat = 1
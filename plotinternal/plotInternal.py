@@ -24,13 +24,16 @@
 
 import wospi
 import os, sys
-import subprocess
 import shutil
 import re
 import time
 from datetime import date, timedelta, datetime
 import numpy
 
+# from local module
+from wxtools import gnuplot_run
+from csvindex import window_offset, read_from
+
 DEBUG=False
 TRACE=True
 KEEP_PNG=False
@@ -75,11 +78,43 @@ def print_dbg(level,msg):
         print("%s %s" % (now,msg))
     return
 
+def read_internal(intfile, start_date=None):
+    """ read the internal values csv in one pass, from start_date on
+        returns the data lines and an index 'dd.mm.yyyy' -> line numbers
+        the 24h and week plot only read the last days using the csv index
+    """
+    offset = 0
+    if start_date is not None:
+        offset = window_offset(intfile, start_date)
+
+    lines = []
+    index = {}
+    for line in read_from(intfile, offset):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        index.setdefault(line[:10], []).append(len(lines))
+        lines.append(line)
+
+    print_dbg(DEBUG, "read_internal: %d lines, %d days from %s" % (len(lines), len(index), intfile))
+
+    return lines, index
+
+
+def select_internal(lines, index, start_date, end_date):
+    """ data lines of the days from start_date to end_date
+    """
+    block = []
+    for dv in daterange(start_date, end_date):
+        print_dbg(TRACE,"working on %s" % dv)
+        block.extend(lines[i] for i in index.get(dv.strftime('%d.%m.%Y'), ()))
+
+    return block
+
+
 def prepareInternalTemperature(fromDay, fromMonth, fromYear, toDay, toMonth, toYear, outfile, rType):
     """ prepare csv data for gnuplot depending on plot type
     """
-    InternalTemp = {}
-
     # datetime             SoC    IAT   IRH   DHT_T    DHT_RH   T11  RH11
     # 01.02.2016 06:03:02, 42.2, 21.6,   48,   21.0,   58.9,   20.0, 37.0
 
@@ -105,56 +140,16 @@ def prepareInternalTemperature(fromDay, fromMonth, fromYear, toDay, toMonth, toY
     INTTEMP = wospi.TMPPATH + 'plot' + outfile + '.tmp'
     print_dbg(DEBUG,"prepareInternalTemperature: write %s timerange into temp" % rType)
     if (os.path.isfile(CURRENT_INTFILE)):
-        sf = open(CURRENT_INTFILE,'r')
-        wxlines = sf.readlines()
-        sf.close()
-
-        st = open(INTTEMP, 'w')
-        st.write('# date-time,         SoC,  Tv,   RHv, T22, RH22, T11,  RH11, Ts22, RHs22, Ts11, RHs11\n')
-
         if rType == 'full':
-            re_hdr = re.compile(r'^#')
-            for line in wxlines:
-                if not re.search(re_hdr, line.strip()):
-                    print_dbg(DEBUG,"DEBUG: %s" % line.strip())
-                    line_stat = standard_deviation(line)
-
-                    st.write(line_stat)
-
+            lines, index = read_internal(CURRENT_INTFILE)
+            block = lines
         else:
-            for dv in daterange(start_date, end_date ):
-                print_dbg(TRACE,"working on %s" % dv)
-                csvDate = str(dv)[8:10].zfill(2) + '.' + str(dv)[5:7].zfill(2) + '.' + str(dv)[:4]
-
-                re_date = re.compile(r"^%s.*" % csvDate)
-                for line in wxlines:
-                    m = re.search(re_date, line.strip())
-                    if m:
-                        if rType == '24h' or rType == 'week':
-                            line_stat = standard_deviation(line)
-
-                            st.write(line_stat)
-                            print_dbg(DEBUG,"DEBUG: %s" % line_stat.strip())
-
-
-
-        for dv in daterange(start_date, end_date ):
-            print_dbg(TRACE,"working on %s" % dv)
-            csvDate = str(dv)[8:10].zfill(2) + '.' + str(dv)[5:7].zfill(2) + '.' + str(dv)[:4]
-
-            try:
-                if rType == 'minmax' or rType == 'full1':
-                    rec  = csvDate + ', '
-                    rec += InternalTemp[csvDate][0] + ', '
-                    rec += InternalTemp[csvDate][1]
-                    rec += '\n'
-                    st.write(rec)
-
-            except:
-                # ignore data outside daterange
-                pass
-
+            lines, index = read_internal(CURRENT_INTFILE, start_date)
+            block = select_internal(lines, index, start_date, end_date)
 
+        st = open(INTTEMP, 'w')
+        st.write('# date-time,         SoC,  Tv,   RHv, T22, RH22, T11,  RH11, Ts22, RHs22, Ts11, RHs11\n')
+        st.writelines(standard_deviation(block))
 
         # close the tmp file
         st.close()
@@ -171,48 +166,9 @@ def prepareInternalTemperature(fromDay, fromMonth, fromYear, toDay, toMonth, toY
 def runGnuPlot(plt):
     """ run gnuplot
     """
-    # full error message
-    re_stderr = re.compile(r'^.*,\s+(line\s+\d+):\s+(.*)')
-    el = 0
-
     inFile = wospi.TMPPATH + 'plot' + plt + '.plt'
 
-    gnuplot = '/usr/bin/gnuplot'
-
-
-    if os.path.exists(gnuplot):
-        print_dbg(DEBUG,"runGnuPlot: plot png " + plt)
-        try:
-            proc_out = subprocess.Popen([gnuplot, inFile], stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-
-            output = proc_out.stdout.readlines()
-            outerr = proc_out.stderr.readlines()
-
-            for line in outerr:
-                line = line.decode('latin1').strip()
-                m = re.search(re_stderr, line)
-                if m:
-                    print_dbg(True, "STDERR: %s" % line.strip())
-                    if re.search("warning:",line):
-                        # we ignore warning errors
-                        pass
-                    else:
-                        raise ValueError('syntax or plot error in gnuplot file')
-                    el = 1
-
-            if TRACE:
-                for n in output:
-                    print_dbg(True, "STDOUT: %s" % n.strip())
-                for n in outerr:
-                    print_dbg(True, "STDERR: %s" % n.strip())
-
-        except Exception as e:
-            print_dbg(True, 'WARN : GnuPlot done with exception(s): %s.' % e)
-            el = 1
-
-    else:
-        print_dbg(True,"ERROR: gnuplot command '%s' not found." % gnuplot)
-        el = 1
+    el = gnuplot_run(inFile, DEBUG, TRACE)
 
     # cleanup temp files
     if not KEEP_TMP:
@@ -263,35 +219,25 @@ def uploadPNG(png):
 
     return
 
-def standard_deviation(line):
+def standard_deviation(lines):
     """ calc standard deviation for temperatur and humidity
+        returns the lines with the 4 deviations appended
     """
+    if not lines:
+        return []
 
     # 01.02.2016 06:03:02, 42.2, 21.6, 48, 21.0, 58.9, 20.0, 37.0
-    parts = line.strip().split(',')
-
-    #Tv22  = [ parts[2], parts[4]]
-    #RHv22 = [ parts[3], parts[5]]
-    #Tv11  = [ parts[2], parts[6]]
-    #RHv11 = [ parts[3], parts[7]]
-
-    #Tv22  = list(map(float, Tv22))
-    #RHv22 = list(map(float, RHv22))
-    #Tv11  = list(map(float, Tv11))
-    #RHv11 = list(map(float, RHv11))
-
-    Tv22  = [float(parts[2]), float(parts[4])]
-    RHv22 = [float(parts[3]), float(parts[5])]
-    Tv11  = [float(parts[2]), float(parts[6])]
-    RHv11 = [float(parts[3]), float(parts[7])]
-
-    #
-    T22dev  = numpy.std(numpy.array([Tv22]), ddof=0)
-    RH22dev = numpy.std(numpy.array([RHv22]), ddof=0)
-    T11dev  = numpy.std(numpy.array([Tv11]), ddof=0)
-    RH11dev = numpy.std(numpy.array([RHv11]), ddof=0)
-
-    return line.strip() + ", " + str(T22dev) + ", " + str(T11dev) + ", " + str(RH22dev) + ", " + str(RH11dev) +"\n"
+    # Tv, RHv, T22, RH22, T11, RH11
+    v = numpy.loadtxt(lines, delimiter=',', usecols=range(2, 8), ndmin=2)
+
+    T22dev  = numpy.std(v[:, [0, 2]], axis=1, ddof=0)
+    RH22dev = numpy.std(v[:, [1, 3]], axis=1, ddof=0)
+    T11dev  = numpy.std(v[:, [0, 4]], axis=1, ddof=0)
+    RH11dev = numpy.std(v[:, [1, 5]], axis=1, ddof=0)
+
+    dev = zip(T22dev.tolist(), T11dev.tolist(), RH22dev.tolist(), RH11dev.tolist())
+
+    return ["%s, %r, %r, %r, %r\n" % ((line,) + d) for line, d in zip(lines, dev)]
 
 # -------------------------------------------------------------------------------------------
 
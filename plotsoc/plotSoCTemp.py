@@ -31,6 +31,7 @@ from datetime import date, timedelta, datetime
 
 # from local module
 from wxtools import print_dbg, runGnuPlot, uploadPNG
+from csvindex import read_window
 
 DEBUG=False
 TRACE=False
@@ -57,6 +58,27 @@ def daterange( start_date, end_date ):
             yield start_date - timedelta( n )
 
 
+def socFile(year):
+    """ csv of the SoC values of a year
+    """
+    return str(os.path.dirname(wospi.SOCFILE)) + '/' + str(year) + '-' + str(os.path.basename(wospi.SOCFILE))
+
+
+def readSoCWindow(start_date, end_date):
+    """ lines from start_date on, read from the yearly csv files
+        the csv index is used to skip the lines before start_date
+    """
+    lines = []
+    for year in range(start_date.year, end_date.year+1):
+        SOCcur = socFile(year)
+        if (os.path.isfile(SOCcur)):
+            lines.extend(read_window(SOCcur, start_date))
+        else:
+            print_dbg(DEBUG, "DEBUG file missing %s" % SOCcur)
+
+    return lines
+
+
 def prepareCSVDataYear(fromYear, tmpfile):
     """ merging csv files from YYY to current year
     """
@@ -76,7 +98,7 @@ def prepareCSVDataYear(fromYear, tmpfile):
 
     for dv in range(fromYear, end.year+1):
         curYY  = str(dv)
-        SOCcur = str(os.path.dirname(wospi.SOCFILE)) + '/' + str(curYY) + '-' + str(os.path.basename(wospi.SOCFILE))
+        SOCcur = socFile(curYY)
         if (os.path.isfile(SOCcur)):
             print_dbg(DEBUG, "DEBUG merging %s from %s" % (curYY, SOCcur))
             wx  = open(tmpfile, 'ab')
@@ -126,7 +148,18 @@ def prepareSoCTemperature(fromDay, fromMonth, fromYear, toDay, toMonth, toYear,
     SOCTEMP = wospi.TMPPATH + 'plot' + outfile + '.tmp'
     print_dbg(DEBUG,"prepareSoCTemperature: write %s timerange into temp" % rType)
     if (os.path.isfile(SOC)):
-        sf = open(SOC,'r')
+        if rType == '24h' or rType == 'week':
+            wxlines = readSoCWindow(start_date, end_date)
+        else:
+            sf = open(SOC,'r')
+            wxlines = sf.readlines()
+            sf.close()
+
+        # group the lines by day, one pass over the data
+        DayLines = {}
+        for line in wxlines:
+            DayLines.setdefault(line.strip()[:10], []).append(line)
+
         st = open(SOCTEMP, 'w')
 
         for dv in daterange(start_date, end_date ):
@@ -134,48 +167,42 @@ def prepareSoCTemperature(fromDay, fromMonth, fromYear, toDay, toMonth, toYear,
             csvDate = str(dv)[8:10].zfill(2) + '.' + str(dv)[5:7].zfill(2) + '.' + str(dv)[:4]
 
             print_dbg(DEBUG,"  csvDate: %s" % (csvDate))
-            re_date = re.compile(r"^%s.*" % csvDate)
-            for line in sf:
-                m = re.search(re_date, line.strip())
-                if m:
-                    if rType == 'week':
-                        parts = line.strip().split(',')
-                        newrec  = parts[0][6:10] + '.'
-                        newrec += parts[0][3:5] + '.'
-                        newrec += parts[0][0:2] + ' '
-                        newrec += parts[0][11:19] + ','
-                        newrec += parts[1] + '\n'
-
-                        st.write(newrec)
-
-                    elif rType == 'minmax' or rType == 'full':
-                        parts = line.strip().split(',')
-                        newdate  = parts[0][6:10] + '.'
-                        newdate += parts[0][3:5] + '.'
-                        newdate += parts[0][0:2]
-
-                        tVal = parts[1]
-
-                        if newdate not in MinMaxTemp.keys():
-                            print_dbg(TRACE,"  new val %s: %s" % (newdate,tVal))
-                            MinMaxTemp[newdate] = [tVal, tVal]
+            for line in DayLines.get(csvDate, []):
+                if rType == 'week':
+                    parts = line.strip().split(',')
+                    newrec  = parts[0][6:10] + '.'
+                    newrec += parts[0][3:5] + '.'
+                    newrec += parts[0][0:2] + ' '
+                    newrec += parts[0][11:19] + ','
+                    newrec += parts[1] + '\n'
+
+                    st.write(newrec)
+
+                elif rType == 'minmax' or rType == 'full':
+                    parts = line.strip().split(',')
+                    newdate  = parts[0][6:10] + '.'
+                    newdate += parts[0][3:5] + '.'
+                    newdate += parts[0][0:2]
+
+                    tVal = parts[1]
+
+                    if newdate not in MinMaxTemp.keys():
+                        print_dbg(TRACE,"  new val %s: %s" % (newdate,tVal))
+                        MinMaxTemp[newdate] = [tVal, tVal]
+                    else:
+                        if tVal < MinMaxTemp[newdate][0]:
+                            MinMaxTemp[newdate][0] = tVal
+                        elif tVal > MinMaxTemp[newdate][1]:
+                            MinMaxTemp[newdate][1] = tVal
                         else:
-                            if tVal < MinMaxTemp[newdate][0]:
-                                MinMaxTemp[newdate][0] = tVal
-                            elif tVal > MinMaxTemp[newdate][1]:
-                                MinMaxTemp[newdate][1] = tVal
-                            else:
-                                print_dbg(TRACE,"  newdate: %s" % (newdate))
+                            print_dbg(TRACE,"  newdate: %s" % (newdate))
 
-                    elif rType == '24h':
-                        st.write(line)
-
-                    else:
-                        #print_dbg(DEBUG,"no match: %s" % (line.strip()))
-                        pass
+                elif rType == '24h':
+                    st.write(line)
 
-            # reset filepointer
-            sf.seek(0)
+                else:
+                    #print_dbg(DEBUG,"no match: %s" % (line.strip()))
+                    pass
 
         if rType == 'minmax' or rType == 'full':
             # write min/max values to tmp file
@@ -184,8 +211,7 @@ def prepareSoCTemperature(fromDay, fromMonth, fromYear, toDay, toMonth, toYear,
                 st.write(rec)
 
 
-        # close the csv and the tmp file
-        sf.close()
+        # close the tmp file
         st.close()
 
     else:
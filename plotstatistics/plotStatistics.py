@@ -26,9 +26,9 @@
 #	5. set first column as index
 #
 # II. calc temperature statistics
-#	1. get outside_air_temp column
-#	2. get a 6h time shifted outside_air_temp column (for trop night calc.)
-#	3. resample by day
+#	1. read the daily outside_air_temp summary (wxrollup.py)
+#	2. trop night min is the min of 06:00pm - 06:00am, assigned to the next day
+#	3. daily min, max, mean come from the summary, one grouped pass
 #	4. get a min, max, mean and trop record
 #	5. rename columns
 #	6. build new dataframe
@@ -36,7 +36,7 @@
 #		- set flag if threshold reached
 #		- change boolean to numeric
 #
-#	8. resample by month, sum up
+#	8. roll up by month, sum up
 #	9. sort dataframe for a consistent output
 #	10. rename columns to a usable label
 #
@@ -84,12 +84,14 @@ import getopt
 from datetime import date, timedelta, datetime
 from config import TMPPATH, HOMEPATH, CSVPATH, CSVFILESUFFIX, SCPTARGET, SCP
 
-# numpy and panda for data structure
-import pandas as pd
-import numpy as np
-
 # from local module
-from wxtools import jump_by_month, print_dbg, stripNL, runGnuPlot, uploadPNG, uploadAny
+from wxtools import jump_by_month, print_dbg, stripNL, runGnuPlot, uploadPNG, uploadAny, timed, lazy_module
+from wxarchive import load_wx, read_wx_frame, wx_float
+from wxrollup import load_daily, fill_days, rollup_frame, monthly_rollup
+
+# numpy and panda for data structure, imported on first use
+pd = lazy_module('pandas')
+np = lazy_module('numpy')
 
 #-------------------------------------------------------------------------------
 
@@ -211,6 +213,8 @@ KEEP_PNG = False
 KEEP_TMP = False
 # upload png and inc
 DO_SCP   = True
+# read wxdata from the columnar archive (wxarchive.py) instead of merging csv files
+USE_ARCHIVE = True
 
 #-------------------------------------------------------------------------------
 
@@ -346,6 +350,7 @@ def prepareCSVDataRain(fromMonth,fromYear, tmpfile):
     return
 
 
+@timed('load')
 def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, do_fill):
     """ read wxdata into pandas dataformat
     """
@@ -355,42 +360,21 @@ def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, d
     # sample data
     # 01.02.2016 00:05:19,3.9,90,2.2,1012.5,237,1.7,0.0,0,0.0,0.0,0.0,0.0,1.5,1.7,6.1,135
 
-    # read all csv fields
-    data = pd.read_csv(wxin, header=None, converters = {16 : stripNL})
+    # only outside temp is used for the statistics, compact dtypes (wxarchive.WX_DTYPES)
+    data = read_wx_frame(wxin, ['outside_air_temp'])
 
     # fill future month records with empty data
     # to have a even plotted chart (needs commandline option 'f')
     if do_fill and int(datetime.now().month) < 12:
         fillMonth = datetime.now().month + 1
         print_dbg(True, "INFO : fill future months with empty data (%s - 12)" % fillMonth)
-        for n in range(fillMonth,13):
-            future_date  = '01.' + str(n).zfill(2) + '.' + str(toYear)
-            data.loc[-1] = [future_date +" 00:00:00",0.0,90,0.0,1000.0,100,0.0,0.0,0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0]  # adding a row
-            data.index   = data.index + 1  # shifting index
-            print_dbg(DEBUG, "DEBUG: added fill data for date %s" % future_date)
+        fill_dates = [datetime(toYear, n, 1) for n in range(fillMonth,13)]
+        fill = pd.DataFrame({'timestamp': pd.to_datetime(fill_dates),
+                             'outside_air_temp': np.float32(0.0)})
+        data = pd.concat([fill, data], ignore_index=True)
 
-
-    # rename columns
-    data.rename(columns={ 0: 'timestamp',
-                          1: 'outside_air_temp',
-                          2: 'outside_rel_hum',
-                          3: 'outside_dew_point_temp',
-                          4: 'barometic_pressure',
-                          5: 'present_wind_direction',
-                          6: 'present_wind_speed',
-                          7: 'UV_index',
-                          8: 'solar_radiation',
-                          9: 'rain_rate',
-                         10: 'daily_rain',
-                         11: 'daily_ET',
-                         12: 'monthly_ET',
-                         13: 'ten_min_avg_wind_speed',
-                         14: 'two_min_avg_wind_speed',
-                         15: 'ten_min_wind_gust_speed',
-                         16: 'ten_min_wind_gust_direction'}, inplace=True)
-
-    # convert date string field to datetime
-    data['timestamp'] = pd.to_datetime(data['timestamp'], format = '%d.%m.%Y %H:%M:%S')
+    # same values as the archive path
+    data = wx_float(data, ['outside_air_temp'])
 
     toHour = 23
     start_date = "%s-%s-%s %s:00:00" % (fromYear,str(fromMonth).zfill(2),str(fromDay).zfill(2),str(fromHour).zfill(2))
@@ -411,6 +395,60 @@ def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, d
     return plotdata
 
 
+def read_wx_archive(fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, do_fill):
+    """ read wxdata from the columnar archive into pandas dataformat
+        same result as prepareCSVData + read_wx_csv
+    """
+
+    print_dbg(True, 'INFO : building DataFrame from archive')
+
+    start_date = datetime(fromYear, fromMonth, fromDay, int(fromHour), 0, 0)
+    end_date   = datetime(toYear, toMonth, toDay, 23, 59, 59)
+
+    # only outside temp is used for the statistics
+    data = load_wx(start_date, end_date, ['outside_air_temp'], fill_missing=True)
+
+    # fill future month records with empty data
+    # to have a even plotted chart (needs commandline option 'f')
+    if do_fill and int(datetime.now().month) < 12:
+        fillMonth = datetime.now().month + 1
+        print_dbg(True, "INFO : fill future months with empty data (%s - 12)" % fillMonth)
+        fill_dates = [datetime(toYear, n, 1) for n in range(fillMonth,13)]
+        fill = pd.DataFrame({'timestamp': pd.to_datetime([d for d in fill_dates if start_date <= d <= end_date]),
+                             'outside_air_temp': 0.0})
+        data = pd.concat([fill, data], ignore_index=True)
+
+    # use first col. as index
+    plotdata = data.set_index('timestamp')
+
+    return plotdata
+
+
+def read_wx_daily(fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, do_fill):
+    """ read the daily temperature summary (wxrollup) into pandas dataformat
+        same daily values as read_wx_archive + rollup in temp_stats
+    """
+
+    print_dbg(True, 'INFO : building DataFrame from daily summary')
+
+    start_date = datetime(fromYear, fromMonth, fromDay, int(fromHour), 0, 0)
+    end_date   = datetime(toYear, toMonth, toDay, 23, 59, 59)
+
+    # only outside temp is used for the statistics
+    data = load_daily(start_date, end_date, ['outside_air_temp'], fill_missing=True)
+
+    # fill future month records with empty data
+    # to have a even plotted chart (needs commandline option 'f')
+    if do_fill and int(datetime.now().month) < 12:
+        fillMonth = datetime.now().month + 1
+        print_dbg(True, "INFO : fill future months with empty data (%s - 12)" % fillMonth)
+        fill_dates = [datetime(toYear, n, 1) for n in range(fillMonth,13)]
+        data = fill_days(data, [d for d in fill_dates if start_date <= d <= end_date], ['outside_air_temp'])
+
+    return data
+
+
+@timed('load')
 def read_rx_csv(rxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, do_fill):
     """ read rxdata into pandas dataformat
     """
@@ -474,6 +512,7 @@ def rebuild_name(fin,key):
     return fout
 
 
+@timed('compute')
 def rain_stats(pdin,key,fromMonth,toMonth,do_fill):
     """ calculate rain statistics per day and per month
         # 05.01.2019, 7.4, 9.4, 9.4
@@ -483,52 +522,32 @@ def rain_stats(pdin,key,fromMonth,toMonth,do_fill):
     """
     print_dbg(True, 'INFO : calculating rain stats')
 
-    # get rain columns
-
-    # month and year
-    pd_rain  = pdin.iloc[:,[1,2]]
-
-    # rain_dd
-    pd_rain_d  = pdin.iloc[:,[0]]
-
-    M_FREQ = 'ME'
-    Q_FREQ = 'QE'
-
-    # resample to day and calc some basic stats
-    pd_ver = int(re.sub(r"\.","",pd.__version__))
-    if (pd_ver <= 141):
-        M_FREQ = 'M'
-        # old syntax
-        # numpy: 1.6.2
-        # pandas: 0.14.1
-        r_mean = pd_rain.resample(M_FREQ, how='mean')
-        r_max   = pd_rain.resample(M_FREQ, how='max')
-        r_max_d = pd_rain_d.resample(M_FREQ, how='max')
-        r_sum_d = pd_rain_d.resample(M_FREQ, how='sum')
-
-    else:
-        # PLI new syntax
-        # numpy: 1.12.1
-        # pandas: 0.19.2
-        r_mean = pd_rain.resample(M_FREQ).mean()
-        r_max   = pd_rain.resample(M_FREQ).max()
-        # max mm per day/month
-        r_max_d = pd_rain_d.resample(M_FREQ).max()
-        # r_sum_d = r_max = monthly rain
-        r_sum_d = pd_rain_d.resample(M_FREQ).sum()
-        r_sum_q = pd_rain_d.resample(Q_FREQ).sum()
-        r_avg_m = pd_rain_d.resample(M_FREQ).mean()
-        #r_avg_m = r_sum_d.resample(M_FREQ).mean()
-
+    # month and year, rain_dd only on rain days (> 0.2mm)
+    pd_rain = pdin.iloc[:,[0,1,2]].copy()
+    pd_rain['rain_wet'] = pd_rain.rain_dd.mask(pd_rain.rain_dd.le(0.2))
+
+    # all monthly aggregates in one pass (wxrollup)
+    r_all = monthly_rollup(pd_rain, {'rain_dd' : ['max','sum'],
+                                     'rain_wet': ['count','mean'],
+                                     'rain_mm' : ['mean','max'],
+                                     'rain_yy' : ['mean','max']
+                                    })
+
+    r_mean  = r_all[['rain_mm_mean','rain_yy_mean']].rename(columns={'rain_mm_mean': 'rain_mm', 'rain_yy_mean': 'rain_yy'})
+    r_max   = r_all[['rain_mm_max','rain_yy_max']].rename(columns={'rain_mm_max': 'rain_mm', 'rain_yy_max': 'rain_yy'})
+    # max mm per day/month
+    r_max_d = r_all[['rain_dd_max']].rename(columns={'rain_dd_max': 'rain_dd'})
+    # r_sum_d = r_max = monthly rain
+    r_sum_d = r_all[['rain_dd_sum']].rename(columns={'rain_dd_sum': 'rain_dd'})
+    r_sum_q = r_sum_d.resample('QS').sum()
 
     # number of rain days, avg mm/day (if raining)
-    r_nr_d  = pd_rain_d.mask(pd_rain_d.rain_dd.le(0.2)).groupby(pd.Grouper(freq=M_FREQ)).count()
-    r_avg_d = pd_rain_d.mask(pd_rain_d.rain_dd.le(0.2)).groupby(pd.Grouper(freq=M_FREQ)).mean()
+    r_nr_d  = r_all[['rain_wet_count']].rename(columns={'rain_wet_count': 'rain_dd'})
+    r_avg_d = r_all[['rain_wet_mean']].rename(columns={'rain_wet_mean': 'rain_dd'})
 
     r_avg_m = r_sum_d.rolling(window=2).mean()
-    #r_avg_m.at[key + '-01-31', 'rain_dd'] = r_sum_d.loc[key + '-01-31', 'rain_dd']
 
-    date_key = pd.to_datetime(key + '-01-31')
+    date_key = pd.to_datetime(key + '-01-01')
     if date_key in r_sum_d.index:
         r_avg_m.at[date_key, 'rain_dd'] = r_sum_d.loc[date_key, 'rain_dd']
     else:
@@ -567,29 +586,13 @@ def rain_stats(pdin,key,fromMonth,toMonth,do_fill):
     rain_df.fillna(0, inplace=True)
 
     # create monthly stats
-    if (pd_ver <= 141):
-        # old syntax
-        # numpy: 1.6.2
-        # pandas: 0.14.1
-        m_df  = rain_df.resample('MS', how={'_01rain_days'        :'sum',
-                                            '_02daily_rain_max'   :'max',
-                                            '_03daily_rain_avg'   :'mean',
-                                            '_04monthly_rain_max' :'max',
-                                            '_05yearly_rain_max'  :'max',
-                                            '_06yearly_rain_mean' :'mean'
-                                        })
-
-    else:
-        # PLI new syntax
-        # numpy: 1.12.1
-        # pandas: 0.19.2
-        m_df  = rain_df.resample('MS').agg({'_01rain_days'        :'sum',
-                                            '_02daily_rain_max'   :'max',
-                                            '_03daily_rain_avg'   :'mean',
-                                            '_04monthly_rain_max' :'max',
-                                            '_05yearly_rain_max'  :'max',
-                                            '_06yearly_rain_mean' :'mean'
-                                        })
+    m_df  = monthly_rollup(rain_df, {'_01rain_days'        :'sum',
+                                     '_02daily_rain_max'   :'max',
+                                     '_03daily_rain_avg'   :'mean',
+                                     '_04monthly_rain_max' :'max',
+                                     '_05yearly_rain_max'  :'max',
+                                     '_06yearly_rain_mean' :'mean'
+                                    })
 
     m_df['_06yearly_rain_mean'] = m_df._06yearly_rain_mean.apply(lambda x: '-')
     print_dbg(DEBUG, "DEBUG: pandas rain m_df: \n%s" % (m_df))
@@ -668,57 +671,30 @@ def rain_stats(pdin,key,fromMonth,toMonth,do_fill):
 
 #------------------------------------------------------------------------------------------------------------
 
+@timed('compute')
 def temp_stats(pdin,key,fromMonth,toMonth,do_fill):
     """ calculate temperature statistics per day and per month
     """
     print_dbg(True, 'INFO : calculating temperature stats')
 
-    # get temperature column
-    pd_temp  = pdin.iloc[:,[0]]
-    FREQ = 'D'
-    print_dbg(DEBUG, "DEBUG: pandas temperature dataframe end: \n%s" % (pd_temp.tail(3)))
+    # daily min, max, mean and trope-night min in one pass (wxrollup)
+    # pdin is either raw wxdata or the daily summary from read_wx_daily
+    if 'outside_air_temp_min' not in pdin.columns:
+        pdin = rollup_frame(pdin, ['outside_air_temp'], ['min','max','sum','count'], trope=True)
+    print_dbg(DEBUG, "DEBUG: pandas temperature daily summary end: \n%s" % (pdin.tail(3)))
 
-    # for calc. of the trope-night shift records between 18:00 - 06:00 to 00:00 - 12:00
-    # need this for resampling
-    # to have the required timerange within the same day
+    # for calc. of the trope-night the min of 06:00pm - 06:00am is assigned to the next day
     # last night was a trope-night if between 06:00pm and 06:00am Tmin >= 20degC
-    pdt = pd_temp.shift(6, freq='h')
-    print_dbg(DEBUG, "DEBUG: pandas temperature df tshift 6h: \n%s" % (pdt.tail(3)))
-
-    # the temperature we need to check is now between 00:00 and 12:00 noon
-    # ignore everything outside, Tmin needs to be >= 20
-    pdx = pdt.loc[(pdt.index.hour <= 12)]
-
-
-    # resample to day and calc some basic stats
-    pd_ver = int(re.sub(r"\.","",pd.__version__))
-    if (pd_ver <= 141):
-        # old syntax
-        # numpy: 1.6.2
-        # pandas: 0.14.1
-        t_mean = pd_temp.resample(FREQ, how='mean')
-        t_max  = pd_temp.resample(FREQ, how='max')
-        t_min  = pd_temp.resample(FREQ, how='min')
-        t_min_n= pdx.resample(FREQ, how='min')
-
-    else:
-        # PLI new syntax
-        # numpy: 1.12.1
-        # pandas: 0.19.2
-        t_mean = pd_temp.resample(FREQ).mean()
-        t_max  = pd_temp.resample(FREQ).max()
-        t_min  = pd_temp.resample(FREQ).min()
-        t_min_n= pdx.resample(FREQ).min()
-
-    # drop last record for trope-night; due to timeshift before
-    if len(t_min) < len(t_min_n):
-        t_min_n=t_min_n.iloc[:-1]
+    t_min   = pdin[['outside_air_temp_min']]
+    t_max   = pdin[['outside_air_temp_max']]
+    t_mean  = pdin[['outside_air_temp_mean']]
+    t_min_n = pdin[['outside_air_temp_trope']]
 
     # rename columns
-    tx_min  = t_min.rename  (columns={'outside_air_temp': '_01temp_min'})
-    tx_max  = t_max.rename  (columns={'outside_air_temp': '_02temp_max'})
-    tx_mean = t_mean.rename (columns={'outside_air_temp': '_03temp_mean'})
-    tx_trop = t_min_n.rename(columns={'outside_air_temp': '_09temp_trope'})
+    tx_min  = t_min.rename  (columns={'outside_air_temp_min'  : '_01temp_min'})
+    tx_max  = t_max.rename  (columns={'outside_air_temp_max'  : '_02temp_max'})
+    tx_mean = t_mean.rename (columns={'outside_air_temp_mean' : '_03temp_mean'})
+    tx_trop = t_min_n.rename(columns={'outside_air_temp_trope': '_09temp_trope'})
 
     print_dbg(DEBUG, "DEBUG: pandas temperature tx_mean: \n%s" % (tx_mean.tail(3)))
     print_dbg(DEBUG, "DEBUG: pandas temperature tx_trop: \n%s" % (tx_trop.tail(3)))
@@ -780,35 +756,16 @@ def temp_stats(pdin,key,fromMonth,toMonth,do_fill):
     #---------------------------------------------------------------------
 
     # create monthly stats
-    if (pd_ver <= 141):
-        # old syntax
-        # numpy: 1.6.2
-        # pandas: 0.14.1
-        m_df  = temp_df.resample('MS', how={'_01temp_min' :'min',
-                                            '_02temp_max' :'max',
-                                            '_03temp_mean':'mean',
-                                            '_04t_ice'    :'sum',
-                                            '_05t_frost'  :'sum',
-                                            '_06t_summer' :'sum',
-                                            '_07t_hot'    :'sum',
-                                            '_08t_desert' :'sum',
-                                            '_09t_trope'  :'sum'
-                                        })
-
-    else:
-        # PLI new syntax
-        # numpy: 1.12.1
-        # pandas: 0.19.2
-        m_df  = temp_df.resample('MS').agg({'_01temp_min' :'min',
-                                            '_02temp_max' :'max',
-                                            '_03temp_mean':'mean',
-                                            '_04t_ice'    :'sum',
-                                            '_05t_frost'  :'sum',
-                                            '_06t_summer' :'sum',
-                                            '_07t_hot'    :'sum',
-                                            '_08t_desert' :'sum',
-                                            '_09t_trope'  :'sum'
-                                        })
+    m_df  = monthly_rollup(temp_df, {'_01temp_min' :'min',
+                                     '_02temp_max' :'max',
+                                     '_03temp_mean':'mean',
+                                     '_04t_ice'    :'sum',
+                                     '_05t_frost'  :'sum',
+                                     '_06t_summer' :'sum',
+                                     '_07t_hot'    :'sum',
+                                     '_08t_desert' :'sum',
+                                     '_09t_trope'  :'sum'
+                                    })
 
     d_min    = "%.2f" % m_df._01temp_min.min()
     d_max    = "%.2f" % m_df._02temp_max.max()
@@ -1071,8 +1028,11 @@ def main():
 
 
     try:
-        prepareCSVData(fromMonth,fromYear, statdata)
-        wr = read_wx_csv(statdata,fromDay,fromMonth,fromYear,'00',toDay,toMonth,toYear,has_cmdf)
+        if USE_ARCHIVE:
+            wr = read_wx_daily(fromDay,fromMonth,fromYear,'00',toDay,toMonth,toYear,has_cmdf)
+        else:
+            prepareCSVData(fromMonth,fromYear, statdata)
+            wr = read_wx_csv(statdata,fromDay,fromMonth,fromYear,'00',toDay,toMonth,toYear,has_cmdf)
 
         df = temp_stats(wr,key,fromMonth,toMonth,has_cmdf)
         save_html(df, key,'t')
@@ -7,7 +7,7 @@
 # Configuration options in config.py
 #
 # depends on:  WOSPi
-#   ephem
+#   wxsun.py, wxarchive.py, numpy
 #   plotsun_*.input
 #
 # used for:
@@ -22,15 +22,20 @@
 #-------------------------------------------------------------------------------
 # Changes:
 #  PLI, 18.07.2025: changes for python3
+#  PLI, 17.10.2026: sun times and seasons from wxsun.py instead of ephem
+#  PLI, 17.10.2026: sunshine duration from wxarchive, counted per day with numpy
 
 import wospi
 import os, sys
-import subprocess
-import shutil
-import re
 import time
 from datetime import date, timedelta, datetime
-import ephem
+import numpy as np
+
+# from local module
+from wxtools import gnuplot_run
+from wxsun import sun_range, seasons
+from wxarchive import load_wx, to_epoch
+from wxrollup import day_keys
 
 # display more infos
 DEBUG=False
@@ -46,9 +51,6 @@ DO_SCP=True
 #
 NB_DAYS = 370
 
-# merged version of all used csv files
-tmpwrdata  = wospi.TMPPATH + 'plotwxdata.tmp'
-
 # save equinox and solstice dates in tmp. file for gnuplot.
 EQUINOX_OUT = wospi.TMPPATH + 'equinox.tmp'
 
@@ -93,10 +95,7 @@ def toHour(tstring):
 def saveEquinoxDates(startDate):
     """ calculates the startdate of the equinoxs and solistices
     """
-    spring = datetime.strptime(str(ephem.previous_spring_equinox(startDate)),'%Y/%m/%d %H:%M:%S').strftime('%d.%m.%Y')
-    summer = datetime.strptime(str(ephem.previous_summer_solstice(startDate)),'%Y/%m/%d %H:%M:%S').strftime('%d.%m.%Y')
-    autumn = datetime.strptime(str(ephem.previous_autumnal_equinox(startDate)),'%Y/%m/%d %H:%M:%S').strftime('%d.%m.%Y')
-    winter = datetime.strptime(str(ephem.previous_winter_solstice(startDate)),'%Y/%m/%d %H:%M:%S').strftime('%d.%m.%Y')
+    spring, summer, autumn, winter = [d.strftime('%d.%m.%Y') for d in seasons(startDate)]
 
     print_dbg(DEBUG, "current date    : %s" % startDate.strftime('%d.%m.%Y'))
     print_dbg(DEBUG, "spring_equinox  : %s" % spring)
@@ -116,60 +115,43 @@ def saveEquinoxDates(startDate):
     return
 
 
-def prepareCSVData(fromMonth,fromYear):
-    """ merging csv files from YYYMM to current month into one file
+def sunDuration(start_date, end_date):
+    """ sunlight and sunshine duration per day
+        returns the days (days since epoch) and the minutes with
+        solar radiation > 0 and > 120 W/m2
     """
-
-    # get date to read the current csv
-    YYMM = '%s' % time.strftime('%Y-%m')
-    WX   = wospi.CSVPATH + YYMM + "-" + wospi.CSVFILESUFFIX
-
-    # get name for previous csv
-    fromYYMM = str(fromYear) + '-' + str(fromMonth).zfill(2)
-
-    # remove existing temp file
-    if (os.path.isfile(tmpwrdata)):
-        os.unlink(tmpwrdata)
-
-    start = date( year = fromYear, month = fromMonth, day = 1 )
-    end   = date.today()
-
-    print_dbg(DEBUG, "DEBUG: start: %s" % (start))
-    print_dbg(DEBUG, "DEBUG: end  : %s" % (end))
-
-    if (YYMM != fromYYMM):
-        print_dbg(DEBUG, "DEBUG: YYMM (%s) != fromYYMM (%s)" % (YYMM,fromYYMM))
-        print_dbg(True, "INFO : merging wxdata.csv into one file")
-        # open target file
-        wx  = open(tmpwrdata, 'wb')
-
-        for dv in jump_by_month( start, end ):
-            curYYMM = str(dv)[:7]
-            WXcur = wospi.CSVPATH + curYYMM + "-" + wospi.CSVFILESUFFIX
-            if (os.path.isfile(WXcur)):
-                print_dbg(DEBUG, "DEBUG: merging %s" % curYYMM)
-                wxc = open(WXcur,'rb')
-                shutil.copyfileobj(wxc, wx)
-                wxc.close()
-            else:
-                print_dbg(DEBUG,"DEBUG: missing %s" % curYYMM)
-
-        wx.close()
-
-    else:
-        print_dbg(DEBUG, "DEBUG: YYMM (%s) == fromYYMM (%s)" % (YYMM,fromYYMM))
-        print_dbg(True, "INFO : creating tmpcsv from %s" % YYMM)
-        shutil.copyfile(WX,tmpwrdata)
-
-    return
+    data  = load_wx(datetime(start_date.year, start_date.month, start_date.day),
+                    datetime(end_date.year, end_date.month, end_date.day, 23, 59, 59),
+                    ['solar_radiation'])
+    keys  = day_keys(to_epoch(data['timestamp'].values))
+    solar = data['solar_radiation'].values
+
+    if len(keys) == 0:
+        return keys, keys, keys
+
+    # first reading of each day, the readings are in time order
+    starts   = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    interval = int(wospi.CSVINTERVAL)
+
+    # count number of events with solar radiation > 0 and > 120
+    # Die tatsächliche Sonnenscheindauer ist als die Zeitspanne definiert,
+    # während der die direkte Sonnenstrahlung senkrecht zur Sonnenrichtung mindestens 120 W/m2 beträgt
+    # https://de.wikipedia.org/wiki/Sonnenschein
+    # https://en.wikipedia.org/wiki/Sunlight
+    #
+    # the first reading of a day always counts one interval
+    light = (solar > 0).astype(np.int64)
+    shine = (solar > 120).astype(np.int64)
+    light = interval * (1 + np.add.reduceat(light, starts) - light[starts])
+    shine = interval * (1 + np.add.reduceat(shine, starts) - shine[starts])
+
+    return keys[starts], light, shine
 
 
 def prepareSunData(fromDay, fromMonth, fromYear, toDay, toMonth, toYear, outfile):
     """ prepare csv data; used by the gnuplot script
     """
     SunTimes = {}
-    SunLight = {}
-    SunShine = {}
 
     # set startdate
     start_date = date( year = fromYear, month = fromMonth, day = fromDay )
@@ -179,9 +161,6 @@ def prepareSunData(fromDay, fromMonth, fromYear, toDay, toMonth, toYear, outfile
 
     print_dbg(True,"INFO : processing from %s to %s" % (start_date,end_date))
 
-    # create single csv for further processing
-    prepareCSVData(fromMonth,fromYear)
-
     # open file for gnuplot
     OUTTEMP = wospi.TMPPATH + 'plot' + outfile + '.tmp'
     st = open(OUTTEMP, 'w')
@@ -211,78 +190,54 @@ def prepareSunData(fromDay, fromMonth, fromYear, toDay, toMonth, toYear, outfile
                 print_dbg(DEBUG,"DEBUG: found 2nd value %s: %s" % (parts[0],newrec.strip()))
                 #SunTimes[parts[0]] = newrec
 
+    # days missing in SUNTIMEFILE (or all days, if there is none) are computed
+    sun = sun_range(start_date, end_date)
+    for dv, srise, sset in zip(sun['date'].tolist(), sun['sunrise'].tolist(), sun['sunset'].tolist()):
+        csvDate = dv.strftime('%d.%m.%Y')
+        if csvDate in SunTimes or srise != srise or sset != sset:
+            continue
 
-    if (os.path.isfile(tmpwrdata)):
-        print_dbg(DEBUG,"prepareSunData: calculate sunshine duration")
-        sf = open(tmpwrdata,'r')
-        wxlines = sf.readlines()
-        sf.close()
+        # same resolution as the times of the file: minutes
+        sunrise = "%.2f" % (int(srise * 60) / 60.0)
+        sunset  = "%.2f" % (int(sset * 60) / 60.0)
+        SunTimes[csvDate] = csvDate + ', ' + sunrise + ', ' + sunset + ', ' + str(float(sunset)-float(sunrise))
+        print_dbg(DEBUG,"DEBUG: computed %s" % SunTimes[csvDate])
 
-        for line in wxlines:
-            parts = line.strip().split(',')
 
-            # we only need date and solar radiation
-            keyDate = parts[0].split()[0]
-            tVal = parts[8]
+    print_dbg(DEBUG,"prepareSunData: calculate sunshine duration")
+    days, light, shine = sunDuration(start_date, end_date)
 
-            # count number of events with solar radiation > 0
-            if keyDate not in SunLight.keys():
-                SunLight[keyDate] = int(wospi.CSVINTERVAL)
+    if len(days) == 0:
+        print_dbg(True, "WARN : no wxdata from %s to %s" % (start_date, end_date))
+        st.close()
+        return
 
-            else:
-                if int(tVal) > 0:
-                    SunLight[keyDate] += int(wospi.CSVINTERVAL)
+    # write data sorted to file
+    # convert minutes to hours and write sunshine values to tmp file
+    dates = np.arange(np.datetime64(start_date, 'D'), np.datetime64(end_date, 'D') + 1)
+    idx   = np.minimum(np.searchsorted(days, dates.astype(np.int64)), len(days) - 1)
+    found = days[idx] == dates.astype(np.int64)
+    light = np.where(found, light[idx] / 60.0, 0.0)
+    shine = np.where(found, shine[idx] / 60.0, 0.0)
 
+    recs = []
+    for dv, ok, lh, sh in zip(dates.tolist(), found.tolist(), light.tolist(), shine.tolist()):
+        csvDate = dv.strftime('%d.%m.%Y')
+        if csvDate not in SunTimes:
+            continue
 
-            # count number of events with solar radiation > 120
-            # Die tatsächliche Sonnenscheindauer ist als die Zeitspanne definiert,
-            # während der die direkte Sonnenstrahlung senkrecht zur Sonnenrichtung mindestens 120 W/m2 beträgt
-            # https://de.wikipedia.org/wiki/Sonnenschein
-            # https://en.wikipedia.org/wiki/Sunlight
-            if keyDate not in SunShine.keys():
-                SunShine[keyDate] = int(wospi.CSVINTERVAL)
+        rec = "%s, %.2f, %.2f\n" % (SunTimes[csvDate], lh, sh)
+        if not ok:
+            # no readings, add dummy value
+            print_dbg(True,"WARN :   ign val %s: %s" % (csvDate, rec.strip()))
+        recs.append(rec)
 
-            else:
-                if int(tVal) > 120:
-                    SunShine[keyDate] += int(wospi.CSVINTERVAL)
-
-
-
-        # write data sorted to file
-        # convert minutes to hours and write sunshine values to tmp file
-        # we have a reading every 'wospi.CSVINTERVAL' minutes. As we add wospi.CSVINTERVAL for each solar radiation > 0, we need
-        # devide by 60 to get the hour-value
-        for dv in daterange(start_date, end_date ):
-            csvDate = str(dv)[8:10].zfill(2) + '.' + str(dv)[5:7].zfill(2) + '.' + str(dv)[:4]
-
-            try:
-                rec  = SunTimes[csvDate] + ', '
-                rec += "%.2f" % (SunLight[csvDate]/60.0) + ', '
-                rec += "%.2f" % (SunShine[csvDate]/60.0)
-                rec += '\n'
-                st.write(rec)
-
-            except:
-                # key error, add dummy value
-                if csvDate in SunTimes:
-                    rec  = SunTimes[csvDate] + ', '
-                    rec += "0.00" + ', '
-                    rec += "0.00"
-                    rec += '\n'
-                    st.write(rec)
-                    print_dbg(True,"WARN :   ign val %s: %s" % (csvDate, rec.strip()))
-                else:
-                    pass
-
-
-        # close the tmp file
-        st.close()
+    st.writelines(recs)
 
-        saveEquinoxDates(end_date)
-        removeTMP(tmpwrdata)
+    # close the tmp file
+    st.close()
 
-    else:
-        print_db(True, "WARN : file %s is missing" % config.SUNTIMEFILE)
+    saveEquinoxDates(end_date)
 
     return
 
@@ -297,48 +252,10 @@ def print_dbg(level,msg):
 
 def runGnuPlot(plt):
     """ run gnuplot
-        TODO: parse output
     """
-    re_stderr = re.compile(r'^.*,\s+(line\s+\d+):\s+(.*)')
-    el = 0
-
     inFile = wospi.TMPPATH + 'plot' + plt + '.plt'
 
-    gnuplot = '/usr/bin/gnuplot'
-
-    if os.path.exists(gnuplot):
-        print_dbg(DEBUG,"runGnuPlot: plot png " + plt)
-        try:
-            proc_out = subprocess.Popen([gnuplot, inFile], stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-
-            output = proc_out.stdout.readlines()
-            outerr = proc_out.stderr.readlines()
-
-            for line in outerr:
-                line = line.decode('latin1').strip()
-                m = re.search(re_stderr, line)
-                if m:
-                    print_dbg(True, "STDERR: %s" % line.strip())
-                    if re.search("warning:",line):
-                        # we ignore warning errors
-                        pass
-                    else:
-                        raise ValueError('syntax or plot error in gnuplot file')
-                    el = 1
-
-            if TRACE:
-                for n in output:
-                    print_dbg(True, "STDOUT: %s" % n.strip())
-                for n in outerr:
-                    print_dbg(True, "STDERR: %s" % n.strip())
-
-        except Exception as e:
-            print_dbg(True, 'WARN : GnuPlot done with exception(s): %s.' % e)
-            el = 1
-
-    else:
-        print_dbg(True,"ERROR: gnuplot command '%s' not found." % gnuplot)
-        el = 1
+    el = gnuplot_run(inFile, DEBUG, TRACE)
 
     # cleanup temp files
     if not KEEP_TMP:
@@ -7,7 +7,7 @@
 #
 # Configuration options in config.py
 #
-# depends on:  WOSPi, numpy, pandas
+# depends on:  WOSPi, numpy, pandas, wxsun.py
 #
 # used for:
 #   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
@@ -23,29 +23,37 @@
 #-------------------------------------------------------------------------------
 # Changes:
 
-import subprocess
+from __future__ import annotations
+
 #from datetime import date, timedelta, datetime
 from config import MYPOSITION, TMPPATH, HOMEPATH, CSVPATH, CSVFILESUFFIX, SCPTARGET, SCP
-from wxtools import print_dbg, runGnuPlot, uploadPNG, uploadAny
+from wxtools import print_dbg, runGnuPlot, gnuplot_run, uploadPNG, uploadAny, timed, lazy_module
+from wxarchive import load_wx, read_wx_frame, month_range, WX_COLUMNS, to_epoch
+from wxrollup import group_reduce, day_keys, month_keys
+from wxsun import parse_position
 
-# numpy and panda for data structure
-import pandas as pd
-import numpy as np
 from datetime import datetime, date, timedelta
-import matplotlib.pyplot as plt
 from dataclasses import dataclass
 import os
 import time
-import re
 import sys
 import glob
 import argparse
 import calendar
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple, Optional
 
 import warnings
 warnings.filterwarnings('ignore')
 
+# numpy, panda and matplotlib, imported on first use
+pd  = lazy_module('pandas')
+np  = lazy_module('numpy')
+plt = lazy_module('matplotlib.pyplot')
+
+# disable X11, the figures are rendered in worker processes too
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
 # current year
 yy    = '%s' % time.strftime('%Y')
 mm    = '%s' % time.strftime('%m')
@@ -62,38 +70,45 @@ KEEP_PNG = False
 KEEP_TMP = True
 # upload png and inc
 DO_SCP   = True
+# read wxdata from the columnar archive (wxarchive.py) instead of the csv files
+USE_ARCHIVE = True
+# worker processes for reading the monthly csv files (1 = sequential)
+LOAD_WORKERS = os.cpu_count() or 1
+# worker processes for rendering the matplotlib figures (1 = sequential)
+RENDER_WORKERS = os.cpu_count() or 1
+# analyze all years (-a a) one month at a time, memory stays bounded
+STREAM_ALL = True
 
 
 #-------------------------------------------------------------------------------
 
-def parse_position(position_str):
-    """Parse MYPOSITION string to decimal degrees"""
-    position_str = position_str.upper().strip()
-    
-    # Pattern for: N 48*00.12'  E 016*00.101'
-    pattern = r'([NS])\s*([\d.]+)[\*°]\s*([\d.]+)?\'?\s*([EW])\s*([\d.]+)[\*°]\s*([\d.]+)?\'?'
-    match = re.search(pattern, position_str)
-    
-    if match:
-        lat_dir, lat_deg, lat_min, lon_dir, lon_deg, lon_min = match.groups()
-        
-        lat_deg = float(lat_deg) if lat_deg else 0
-        lat_min = float(lat_min) if lat_min else 0
-        lon_deg = float(lon_deg) if lon_deg else 0
-        lon_min = float(lon_min) if lon_min else 0
-        
-        latitude = lat_deg + lat_min/60.0
-        if lat_dir == 'S':
-            latitude = -latitude
-            
-        longitude = lon_deg + lon_min/60.0
-        if lon_dir == 'W':
-            longitude = -longitude
-            
-        return latitude, longitude
-    
-    # Default fallback
-    return 48.0, 16.0
+def read_month_csv(file):
+    """
+    Read one monthly wxdata csv, returns (DataFrame or None, status line)
+    Top level function, so it can run in a worker process
+    """
+    filename = os.path.basename(file)
+    # Extract year-month from filename
+    parts = filename.split('-')
+    if len(parts) >= 2:
+        file_year_month = f"{parts[0]}-{parts[1]}"
+    else:
+        file_year_month = filename
+
+    try:
+        # Read the file with the compact dtypes (wxarchive.WX_DTYPES)
+        df = read_wx_frame(file)
+
+        if len(df) == 0:
+            return None, f"  ✗ {file_year_month}: No valid datetimes after conversion"
+
+        # same column labels as read_csv(header=None)
+        df.columns = range(len(WX_COLUMNS))
+
+        return df, f"  ✓ {file_year_month}: {len(df):6} rows"
+
+    except Exception as e:
+        return None, f"  ✗ {filename}: Error - {e}"
 
 def load_and_combine_files(csv_path, year=None, month=None):
     """
@@ -122,44 +137,19 @@ def load_and_combine_files(csv_path, year=None, month=None):
     
     print(f"Found {len(all_files)} CSV files:")
     
-    # Load each file
+    # Load each file, in a process pool if there is more than one
+    workers = min(len(all_files), LOAD_WORKERS)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(read_month_csv, all_files))
+    else:
+        results = [read_month_csv(file) for file in all_files]
+
     dfs = []
-    for file in all_files:
-        try:
-            filename = os.path.basename(file)
-            # Extract year-month from filename
-            parts = filename.split('-')
-            if len(parts) >= 2:
-                file_year_month = f"{parts[0]}-{parts[1]}"
-            else:
-                file_year_month = filename
-            
-            # Read the file
-            df = pd.read_csv(
-                file,
-                header=None,
-                parse_dates=[0],
-                dayfirst=True,
-                infer_datetime_format=True,
-                on_bad_lines='skip',
-                low_memory=False
-            )
-            
-            if len(df) > 0:
-                # Ensure first column is datetime
-                df[0] = pd.to_datetime(df[0], errors='coerce', dayfirst=True)
-                df = df.dropna(subset=[0])  # Remove rows where datetime conversion failed
-                
-                if len(df) > 0:
-                    dfs.append(df)
-                    print(f"  ✓ {file_year_month}: {len(df):6} rows")
-                else:
-                    print(f"  ✗ {file_year_month}: No valid datetimes after conversion")
-            else:
-                print(f"  ✗ {file_year_month}: Empty file")
-                
-        except Exception as e:
-            print(f"  ✗ {os.path.basename(file)}: Error - {e}")
+    for df, msg in results:
+        print(msg)
+        if df is not None:
+            dfs.append(df)
     
     if not dfs:
         print("No valid data loaded!")
@@ -179,6 +169,56 @@ def load_and_combine_files(csv_path, year=None, month=None):
     
     return combined_df
 
+def load_archive_files(csv_path, year=None, month=None):
+    """
+    Load data for specific year/month or all years from the columnar archive.
+    Returns the same integer labelled columns as load_and_combine_files
+    """
+    if year:
+        if month:
+            start = datetime(year, month, 1)
+            end   = datetime(year, month, calendar.monthrange(year, month)[1], 23, 59, 59)
+            print(f"Loading archive for: {year}-{month:02d}")
+        else:
+            start = datetime(year, 1, 1)
+            end   = datetime(year, 12, 31, 23, 59, 59)
+            print(f"Loading archive for year: {year}")
+    else:
+        years = get_available_years(csv_path)
+        if not years:
+            print(f"No CSV files found in {csv_path}")
+            return None
+        start = datetime(years[0], 1, 1)
+        end   = datetime(years[-1], 12, 31, 23, 59, 59)
+        print(f"Loading archive for all available years")
+
+    try:
+        combined_df = load_wx(start, end)
+    except Exception as e:
+        print(f"  ✗ Error loading archive - {e}")
+        return None
+
+    if len(combined_df) == 0:
+        print("No valid data loaded!")
+        return None
+
+    # same column labels as read_csv(header=None)
+    combined_df.columns = range(len(WX_COLUMNS))
+
+    print(f"\nCombined dataset: {len(combined_df):,} total rows")
+    print(f"Date range: {combined_df[0].min()} to {combined_df[0].max()}")
+
+    return combined_df
+
+@timed('load')
+def load_wx_data(csv_path, year=None, month=None):
+    """
+    Load wxdata from archive or csv files, depending on USE_ARCHIVE
+    """
+    if USE_ARCHIVE:
+        return load_archive_files(csv_path, year=year, month=month)
+    return load_and_combine_files(csv_path, year=year, month=month)
+
 def get_available_years(csv_path):
     """Get list of available years in the data directory"""
     pattern = f"*-{CSVFILESUFFIX}"
@@ -227,79 +267,180 @@ def analyze_solar_column(df, solar_col_idx=8):
     # Convert solar_rad to numeric, coerce errors
     df['solar_rad'] = pd.to_numeric(df['solar_rad'], errors='coerce')
     
-    # Basic statistics
-    solar_stats = df['solar_rad'].describe()
-    print(f"\nBasic statistics for solar radiation:")
-    print(f"  Min:     {solar_stats['min']:8.1f} W/m²")
-    print(f"  Max:     {solar_stats['max']:8.1f} W/m²")
-    print(f"  Mean:    {solar_stats['mean']:8.1f} W/m²")
-    print(f"  Std:     {solar_stats['std']:8.1f} W/m²")
-    print(f"  25%:     {solar_stats['25%']:8.1f} W/m²")
-    print(f"  50%:     {solar_stats['50%']:8.1f} W/m² (median)")
-    print(f"  75%:     {solar_stats['75%']:8.1f} W/m²")
-    
-    # Count zeros and non-zeros
-    total = len(df)
-    zeros = (df['solar_rad'] == 0).sum()
-    non_zeros = total - zeros
-    print(f"\nZero vs Non-zero values:")
-    print(f"  Zero values:     {zeros:8} ({zeros/total*100:5.1f}%)")
-    print(f"  Non-zero values: {non_zeros:8} ({non_zeros/total*100:5.1f}%)")
-    
-    # Values above thresholds
-    print(f"\nValues above thresholds:")
-    thresholds = [1, 50, 100, 120, 200, 300, 400, 500, 600, 700, 800, 900, 1000]
-    for threshold in thresholds:
-        above = (df['solar_rad'] > threshold).sum()
-        if above > 0:
-            print(f"  >{threshold:4d} W/m²: {above:8} ({above/total*100:5.1f}%)")
-    
-    # Analyze by year and month
-    df['year'] = df['datetime'].dt.year
-    df['month'] = df['datetime'].dt.month
-    
-    print(f"\nYearly maximums:")
-    yearly_max = df.groupby('year')['solar_rad'].max()
-    for year, max_val in yearly_max.items():
-        if max_val > 0:
-            print(f"  {year}: {max_val:6.1f} W/m²")
-    
-    print(f"\nMonthly statistics (across all years in dataset):")
-    monthly_stats = df.groupby('month')['solar_rad'].agg(['max', 'mean', 'count']).round(1)
-    for month in range(1, 13):
-        if month in monthly_stats.index:
-            stats = monthly_stats.loc[month]
-            month_name = datetime(2000, month, 1).strftime('%b')
-            print(f"  {month_name}: max={stats['max']:5.0f}, avg={stats['mean']:5.1f}, readings={int(stats['count']):,}")
-    
-    # Check for diurnal pattern
-    df['hour'] = df['datetime'].dt.hour
-    hourly_avg = df.groupby('hour')['solar_rad'].mean()
-    
-    print(f"\nDiurnal pattern (average by hour):")
-    for hour in range(0, 24):
-        if hour in hourly_avg.index:
-            print(f"  {hour:02d}:00 - {hourly_avg[hour]:6.1f} W/m²")
-    
-    # Check if values seem reasonable
-    max_solar = df['solar_rad'].max()
-    if max_solar < 500:
-        print(f"\n⚠ WARNING: Maximum value ({max_solar:.1f} W/m²) seems low.")
-        print("  Possible issues:")
-        print("  1. Wrong column (not solar radiation)")
-        print("  2. Units issue (e.g., data in kJ/m² or other units)")
-        print("  3. Sensor calibration issue")
-        print("  4. Heavy cloud cover entire period")
-        
-        # Check for unit conversion possibility
-        if max_solar < 500 and max_solar > 0:
-            print(f"\nPossible unit conversions (if data is actually in different units):")
-            print(f"  If data is in W/m² * 0.1: {max_solar*10:.1f} W/m²")
-            print(f"  If data is in kJ/m²: {max_solar*0.2778:.1f} W/m² (divide by 3.6)")
-            print(f"  If data is in MJ/m²: {max_solar*277.8:.1f} W/m² (multiply by 277.8)")
+    # statistics, same report as for the streamed all-years analysis
+    stats = SolarStats()
+    stats.add(df)
+    stats.report()
     
     return df, solar_col_idx
 
+def solar_frame(df, solar_col_idx=8):
+    """Name the datetime and solar radiation columns of a block, None if the column is missing"""
+    num_cols = len(df.columns)
+    if solar_col_idx >= num_cols:
+        print(f"ERROR: Solar column index {solar_col_idx} is out of range.")
+        return None
+
+    col_names = [f'col_{i}' for i in range(num_cols)]
+    col_names[0] = 'datetime'
+    col_names[solar_col_idx] = 'solar_rad'
+    df.columns = col_names
+    df['solar_rad'] = pd.to_numeric(df['solar_rad'], errors='coerce')
+
+    return df
+
+class SolarStats:
+    """Statistics of the solar radiation, can be fed one block (month) at a time"""
+
+    THRESHOLDS = [1, 50, 100, 120, 200, 300, 400, 500, 600, 700, 800, 900, 1000]
+
+    def __init__(self):
+        self.total = 0
+        self.zeros = 0
+        self.above = np.zeros(len(self.THRESHOLDS), dtype=np.int64)
+        # value -> count, the readings have a small number of distinct values
+        self.values: Dict[float, int] = {}
+        self.yearly_max: Dict[int, float] = {}
+        # month 1..12 and hour 0..23: max, sum, count and if there were readings at all
+        self.month_max = np.full(13, np.nan)
+        self.month_sum = np.zeros(13)
+        self.month_cnt = np.zeros(13, dtype=np.int64)
+        self.month_seen = np.zeros(13, dtype=bool)
+        self.hour_sum = np.zeros(24)
+        self.hour_cnt = np.zeros(24, dtype=np.int64)
+        self.hour_seen = np.zeros(24, dtype=bool)
+
+    def add(self, df):
+        """Add the readings of a block with 'datetime' and 'solar_rad' columns"""
+        solar = df['solar_rad'].values.astype(np.float64)
+        self.total += len(solar)
+        self.zeros += int((solar == 0).sum())
+        for i, threshold in enumerate(self.THRESHOLDS):
+            self.above[i] += int((solar > threshold).sum())
+
+        vals, cnts = np.unique(solar[~np.isnan(solar)], return_counts=True)
+        for v, c in zip(vals.tolist(), cnts.tolist()):
+            self.values[v] = self.values.get(v, 0) + c
+
+        dt = df['datetime']
+        valid = dt.notna().values
+        solar = solar[valid]
+        dt = dt[valid].dt
+
+        years, agg = group_reduce(dt.year.values, {'solar_rad': solar}, {'solar_rad': ['max']})
+        for y, m in zip(years.tolist(), agg['solar_rad_max'].tolist()):
+            self.yearly_max[y] = np.fmax(self.yearly_max.get(y, np.nan), m)
+
+        months, agg = group_reduce(dt.month.values, {'solar_rad': solar}, {'solar_rad': ['max', 'sum', 'count']})
+        self.month_max[months] = np.fmax(self.month_max[months], agg['solar_rad_max'])
+        self.month_sum[months] += agg['solar_rad_sum']
+        self.month_cnt[months] += agg['solar_rad_count'].astype(np.int64)
+        self.month_seen[months] = True
+
+        hours, agg = group_reduce(dt.hour.values, {'solar_rad': solar}, {'solar_rad': ['sum', 'count']})
+        self.hour_sum[hours] += agg['solar_rad_sum']
+        self.hour_cnt[hours] += agg['solar_rad_count'].astype(np.int64)
+        self.hour_seen[hours] = True
+
+    def describe(self) -> Dict[str, float]:
+        """min, max, mean, std and quartiles like pandas describe()"""
+        vals = np.array(sorted(self.values), dtype=np.float64)
+        cnts = np.array([self.values[v] for v in vals.tolist()], dtype=np.int64)
+        n = int(cnts.sum())
+        if n == 0:
+            return dict((k, np.nan) for k in ('min', 'max', 'mean', 'std', '25%', '50%', '75%'))
+
+        cum = np.cumsum(cnts)
+        def nth(k):
+            return vals[np.searchsorted(cum, k, side='right')]
+
+        def quantile(q):
+            # linear interpolation, same as numpy/pandas
+            pos = q * (n - 1)
+            lo = int(np.floor(pos))
+            t = pos - lo
+            a, b = nth(lo), nth(min(lo + 1, n - 1))
+            if t >= 0.5:
+                return b - (b - a) * (1 - t)
+            return a + (b - a) * t
+
+        mean = (vals * cnts).sum() / n
+        std = np.sqrt((cnts * (vals - mean) ** 2).sum() / (n - 1)) if n > 1 else np.nan
+
+        return {'min': vals[0], 'max': vals[-1], 'mean': mean, 'std': std,
+                '25%': quantile(0.25), '50%': quantile(0.5), '75%': quantile(0.75)}
+
+    def report(self):
+        """Print the analysis of the solar radiation data"""
+        solar_stats = self.describe()
+        print(f"\nBasic statistics for solar radiation:")
+        print(f"  Min:     {solar_stats['min']:8.1f} W/m²")
+        print(f"  Max:     {solar_stats['max']:8.1f} W/m²")
+        print(f"  Mean:    {solar_stats['mean']:8.1f} W/m²")
+        print(f"  Std:     {solar_stats['std']:8.1f} W/m²")
+        print(f"  25%:     {solar_stats['25%']:8.1f} W/m²")
+        print(f"  50%:     {solar_stats['50%']:8.1f} W/m² (median)")
+        print(f"  75%:     {solar_stats['75%']:8.1f} W/m²")
+        
+        # Count zeros and non-zeros
+        total = self.total
+        zeros = self.zeros
+        non_zeros = total - zeros
+        print(f"\nZero vs Non-zero values:")
+        print(f"  Zero values:     {zeros:8} ({zeros/total*100:5.1f}%)")
+        print(f"  Non-zero values: {non_zeros:8} ({non_zeros/total*100:5.1f}%)")
+        
+        # Values above thresholds
+        print(f"\nValues above thresholds:")
+        for threshold, above in zip(self.THRESHOLDS, self.above.tolist()):
+            if above > 0:
+                print(f"  >{threshold:4d} W/m²: {above:8} ({above/total*100:5.1f}%)")
+        
+        print(f"\nYearly maximums:")
+        for year in sorted(self.yearly_max):
+            max_val = self.yearly_max[year]
+            if max_val > 0:
+                print(f"  {year}: {max_val:6.1f} W/m²")
+        
+        print(f"\nMonthly statistics (across all years in dataset):")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            month_mean = np.where(self.month_cnt > 0, self.month_sum / self.month_cnt, np.nan)
+        for month in range(1, 13):
+            if self.month_seen[month]:
+                month_name = datetime(2000, month, 1).strftime('%b')
+                print(f"  {month_name}: max={np.round(self.month_max[month], 1):5.0f}, "
+                      f"avg={np.round(month_mean[month], 1):5.1f}, readings={int(self.month_cnt[month]):,}")
+        
+        # Check for diurnal pattern
+        with np.errstate(invalid='ignore', divide='ignore'):
+            hourly_avg = np.where(self.hour_cnt > 0, self.hour_sum / self.hour_cnt, np.nan)
+        
+        print(f"\nDiurnal pattern (average by hour):")
+        for hour in range(0, 24):
+            if self.hour_seen[hour]:
+                print(f"  {hour:02d}:00 - {hourly_avg[hour]:6.1f} W/m²")
+        
+        # Check if values seem reasonable
+        max_solar = solar_stats['max']
+        if max_solar < 500:
+            print(f"\n⚠ WARNING: Maximum value ({max_solar:.1f} W/m²) seems low.")
+            print("  Possible issues:")
+            print("  1. Wrong column (not solar radiation)")
+            print("  2. Units issue (e.g., data in kJ/m² or other units)")
+            print("  3. Sensor calibration issue")
+            print("  4. Heavy cloud cover entire period")
+            
+            # Check for unit conversion possibility
+            if max_solar < 500 and max_solar > 0:
+                print(f"\nPossible unit conversions (if data is actually in different units):")
+                print(f"  If data is in W/m² * 0.1: {max_solar*10:.1f} W/m²")
+                print(f"  If data is in kJ/m²: {max_solar*0.2778:.1f} W/m² (divide by 3.6)")
+                print(f"  If data is in MJ/m²: {max_solar*277.8:.1f} W/m² (multiply by 277.8)")
+
+# clear-sky lookup tables per site (latitude, altitude), shape (366 days, 1440 minutes)
+# the model only depends on day of year and minute of day, so a table is valid for all years
+_CLEAR_SKY_LUT: Dict[Tuple[float, float], np.ndarray] = {}
+
 @dataclass
 class SunCalculator:
     """Class to calculate sunshine hours"""
@@ -339,165 +480,399 @@ class SunCalculator:
         except:
             return 0
 
-def calculate_sunshine(df, latitude, longitude, solar_threshold=120, year=None):
+    def clear_sky_table(self) -> np.ndarray:
+        """Clear-sky radiation for every (day of year, minute of day), cached per site"""
+        key = (self.latitude, self.altitude)
+        if key in _CLEAR_SKY_LUT:
+            return _CLEAR_SKY_LUT[key]
+
+        # same model as clear_sky_radiation, on a (366, 1440) grid
+        doy = np.arange(1, 367, dtype=np.float64)[:, np.newaxis]
+        hour = np.arange(1440, dtype=np.float64)[np.newaxis, :] / 60.0
+
+        declination = 0.409 * np.sin(2 * np.pi / 365 * doy - 1.39)
+        lat_rad = np.radians(self.latitude)
+        hour_angle = np.radians(15 * (hour - 12))
+
+        cos_theta = (np.sin(lat_rad) * np.sin(declination) +
+                     np.cos(lat_rad) * np.cos(declination) * np.cos(hour_angle))
+        cos_theta = np.maximum(0.001, cos_theta)
+
+        solar_constant = 1367
+        G_sc = solar_constant * (1 + 0.033 * np.cos(2 * np.pi * doy / 365))
+        tau = 0.65 + 0.02 * np.exp(-self.altitude / 8000)
+
+        G_clear = np.maximum(0, G_sc * cos_theta * tau ** (1 / cos_theta))
+
+        _CLEAR_SKY_LUT[key] = G_clear
+        return G_clear
+
+    def clear_sky_radiation_batch(self, timestamps) -> np.ndarray:
+        """Calculate clear-sky solar radiation for an array of timestamps (NaT gives 0)"""
+        ts = pd.DatetimeIndex(timestamps)
+        table = self.clear_sky_table()
+
+        valid = ~ts.isna()
+        doy = np.where(valid, ts.dayofyear, 1).astype(np.intp) - 1
+        minute = np.where(valid, ts.hour * 60 + ts.minute, 0).astype(np.intp)
+
+        return np.where(valid, table[doy, minute], 0.0)
+
+class SunshineAccumulator:
     """
-    Calculate sunshine hours from the DataFrame
+    Sunshine detection fed with blocks of readings in time order.
+    Keeps only the partial daily and hourly aggregates and the time of the
+    last reading (for time_diff across block boundaries), the result is the
+    same as for one block with all readings.
     """
-    if year:
-        print(f"\n{'='*60}")
-        print(f"CALCULATING SUNSHINE HOURS FOR {year}")
-        print(f"Location: {latitude:.4f}°N, {longitude:.4f}°E")
-    else:
+
+    HOURLY_COLUMNS = ('is_sunshine', 'solar_rad', 'clear_sky_rad')
+
+    def __init__(self, latitude, longitude, solar_threshold=120):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.solar_threshold = solar_threshold
+        self.sun_calc = SunCalculator(latitude=latitude, longitude=longitude)
+
+        self.pending = None
+        self.last_time = None
+        self.total_intervals = 0
+        self.total_sunshine_intervals = 0
+        # time_diff -> count, for the median interval
+        self.intervals: Dict[float, int] = {}
+        # per block: days, solar_rad sum and count, sunshine_hours sum, readings
+        self.daily = []
+        # daylight hours: sum and count per column, if there were readings
+        self.hour_sum = dict((c, np.zeros(24)) for c in self.HOURLY_COLUMNS)
+        self.hour_cnt = dict((c, np.zeros(24)) for c in self.HOURLY_COLUMNS)
+        self.hour_seen = np.zeros(24, dtype=bool)
+
+    def header(self, year=None):
+        """Print the header of the sunshine calculation"""
+        if year:
+            print(f"\n{'='*60}")
+            print(f"CALCULATING SUNSHINE HOURS FOR {year}")
+            print(f"Location: {self.latitude:.4f}°N, {self.longitude:.4f}°E")
+        else:
+            print(f"\n{'='*60}")
+            print(f"CALCULATING SUNSHINE HOURS")
+            print(f"Location: {self.latitude:.4f}°N, {self.longitude:.4f}°E")
+        
+        print(f"Threshold: {self.solar_threshold} W/m²")
+        print("="*60)
+
+    def add(self, df):
+        """Add a block with 'datetime' and 'solar_rad' columns, later than the previous block"""
+        if self.pending is not None:
+            df = pd.concat([self.pending, df], ignore_index=True)
+            self.pending = None
+
+        # the first reading gets the interval of the second one
+        if self.last_time is None and len(df) < 2:
+            self.pending = df
+            return
+
+        self._process(df)
+
+    def _process(self, df):
+        df['hour'] = df['datetime'].dt.hour
+        
+        # Calculate clear-sky radiation
+        df['clear_sky_rad'] = self.sun_calc.clear_sky_radiation_batch(df['datetime'])
+        
+        # Calculate time interval between readings
+        if self.last_time is None:
+            df['time_diff'] = df['datetime'].diff().dt.total_seconds() / 3600.0
+            if len(df) > 1:
+                df.loc[0, 'time_diff'] = df.loc[1, 'time_diff']
+            else:
+                df.loc[0, 'time_diff'] = 0.0833  # Default 5 minutes
+        else:
+            # continue from the last reading of the previous block
+            dt = pd.concat([pd.Series([self.last_time]), df['datetime']], ignore_index=True)
+            df['time_diff'] = (dt.diff().dt.total_seconds() / 3600.0).values[1:]
+        self.last_time = df['datetime'].iloc[-1]
+        
+        td = df['time_diff'].values
+        vals, cnts = np.unique(td[~np.isnan(td)], return_counts=True)
+        for v, c in zip(vals.tolist(), cnts.tolist()):
+            self.intervals[v] = self.intervals.get(v, 0) + c
+        
+        # Handle division by zero
+        df['ratio'] = df['solar_rad'] / df['clear_sky_rad']
+        df['ratio'] = df['ratio'].fillna(0)
+        df['ratio'] = df['ratio'].replace([np.inf, -np.inf], 0)
+        df['ratio'] = df['ratio'].clip(0, 2)
+        
+        # WMO algorithm: > threshold AND ratio > 0.4
+        df['is_sunshine'] = ((df['solar_rad'] > self.solar_threshold) & (df['ratio'] > 0.4)).astype(int)
+        df['sunshine_hours'] = df['is_sunshine'] * df['time_diff']
+        
+        self.total_sunshine_intervals += int(df['is_sunshine'].sum())
+        self.total_intervals += len(df)
+        
+        # one grouped pass per block (wxrollup)
+        valid = df['datetime'].notna().values
+        epoch = to_epoch(df['datetime'].values[valid])
+        days, agg = group_reduce(day_keys(epoch),
+                                 {'solar_rad': df['solar_rad'].values[valid],
+                                  'sunshine_hours': df['sunshine_hours'].values[valid],
+                                  'is_sunshine': df['is_sunshine'].values[valid]},
+                                 {'solar_rad': ['sum', 'count'], 'sunshine_hours': ['sum'], 'is_sunshine': ['count']})
+        self.daily.append((days, agg['solar_rad_sum'], agg['solar_rad_count'],
+                           agg['sunshine_hours_sum'], agg['is_sunshine_count']))
+        
+        # Filter daylight hours
+        daylight = ((df['hour'] >= 6) & (df['hour'] <= 20)).values
+        hours, agg = group_reduce(df['hour'].values[daylight].astype(np.int64),
+                                  dict((c, df[c].values[daylight]) for c in self.HOURLY_COLUMNS),
+                                  dict((c, ['sum', 'count']) for c in self.HOURLY_COLUMNS))
+        for c in self.HOURLY_COLUMNS:
+            self.hour_sum[c][hours] += agg[c + '_sum']
+            self.hour_cnt[c][hours] += agg[c + '_count']
+        self.hour_seen[hours] = True
+
+    def median_interval(self):
+        """median of time_diff from the interval counts"""
+        vals = np.array(sorted(self.intervals), dtype=np.float64)
+        cum = np.cumsum([self.intervals[v] for v in vals.tolist()])
+        n = cum[-1]
+        lo = vals[np.searchsorted(cum, (n - 1) // 2, side='right')]
+        hi = vals[np.searchsorted(cum, n // 2, side='right')]
+        return np.mean([lo, hi])
+
+    def finish(self, year=None):
+        """Write the daily, monthly and hourly summaries"""
+        if self.pending is not None:
+            self._process(self.pending)
+            self.pending = None
+
+        self.header(year)
+        
+        print("Calculating clear-sky radiation...", end='', flush=True)
+        print(" ✓")
+        
+        median_interval = self.median_interval()
+        print(f"  Median interval: {median_interval*60:.1f} minutes")
+        
+        # Calculate ratio and detect sunshine
+        print("Detecting sunshine intervals...", end='', flush=True)
+        
+        total_sunshine_intervals = self.total_sunshine_intervals
+        total_intervals = self.total_intervals
+        print(f" ✓")
+        print(f"  Sunshine detected in {total_sunshine_intervals:,} of {total_intervals:,} intervals "
+              f"({total_sunshine_intervals/total_intervals*100:.1f}%)")
+        
+        return self.summaries(median_interval, year)
+
+    def summaries(self, median_interval, year=None):
+        """Daily, monthly and hourly summaries from the merged aggregates"""
+        # Determine output file names based on year
+        if year:
+            daily_file = f'daily_sunshine_{year}.csv'
+            monthly_file = f'monthly_sunshine_{year}.csv'
+            hourly_file = f'hourly_sunshine_profile_{year}.csv'
+        else:
+            daily_file = 'daily_sunshine_all_years.csv'
+            monthly_file = 'monthly_sunshine_all_years.csv'
+            hourly_file = 'hourly_sunshine_profile_all_years.csv'
+    
+        # DAILY SUMMARY
+        print("\nCreating daily summary...", end='', flush=True)
+        # merge the partial aggregates, a day can be split over two blocks
+        parts = list(zip(*self.daily))
+        days, agg = group_reduce(np.concatenate(parts[0]),
+                                 {'solar_sum': np.concatenate(parts[1]),
+                                  'solar_cnt': np.concatenate(parts[2]),
+                                  'sunshine_hours': np.concatenate(parts[3]),
+                                  'readings': np.concatenate(parts[4])},
+                                 {'solar_sum': ['sum'], 'solar_cnt': ['sum'], 'sunshine_hours': ['sum'], 'readings': ['sum']})
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_solar_rad = np.where(agg['solar_cnt_sum'] > 0, agg['solar_sum_sum'] / agg['solar_cnt_sum'], np.nan)
+        daily_summary = pd.DataFrame({
+            'date': pd.to_datetime(days * 86400, unit='s').date,
+            'solar_rad': avg_solar_rad,
+            'sunshine_hours': agg['sunshine_hours_sum'],
+            'is_sunshine': agg['readings_sum'].astype(np.int64)
+        })
+    
+        daily_summary.columns = ['date', 'avg_solar_rad', 'sunshine_hours', 'readings']
+        daily_summary['sunshine_percent'] = (daily_summary['sunshine_hours'] / 
+                                            (daily_summary['readings'] * median_interval)) * 100
+        daily_summary['date_str'] = daily_summary['date'].astype(str)
+        daily_summary['year'] = pd.to_datetime(daily_summary['date']).dt.year
+        daily_summary['month'] = pd.to_datetime(daily_summary['date']).dt.month
+        daily_summary['weekday'] = pd.to_datetime(daily_summary['date']).dt.day_name()
+    
+        daily_summary.to_csv(TMPPATH+daily_file, index=False, float_format='%.3f')
+        print(f" ✓\n  Saved to: {daily_file}")
+    
+        # MONTHLY SUMMARY
+        print("Creating monthly summary...", end='', flush=True)
+        months, agg = group_reduce(month_keys(to_epoch(pd.to_datetime(daily_summary['date']).values)),
+                                   {'sunshine_hours': daily_summary['sunshine_hours'].values,
+                                    'avg_solar_rad': daily_summary['avg_solar_rad'].values,
+                                    'date': np.ones(len(daily_summary))},
+                                   {'sunshine_hours': ['sum'], 'avg_solar_rad': ['mean'], 'date': ['count']})
+        monthly_summary = pd.DataFrame({
+            'year': months // 12,
+            'month': months % 12 + 1,
+            'sunshine_hours': agg['sunshine_hours_sum'],
+            'avg_solar_rad': agg['avg_solar_rad_mean'],
+            'date': agg['date_count'].astype(np.int64)
+        })
+    
+        monthly_summary.columns = ['year', 'month', 'total_sunshine', 'avg_solar_rad', 'days']
+        monthly_summary['sunshine_per_day'] = monthly_summary['total_sunshine'] / monthly_summary['days']
+        monthly_summary['month_name'] = monthly_summary['month'].apply(lambda x: date(2000, x, 1).strftime('%b'))
+        monthly_summary['year_month'] = monthly_summary['year'].astype(str) + '-' + monthly_summary['month'].astype(str).str.zfill(2)
+    
+        monthly_summary.to_csv(TMPPATH+monthly_file, index=False, float_format='%.2f')
+        print(f" ✓\n  Saved to: {monthly_file}")
+    
+        # HOURLY PROFILE
+        print("Creating hourly profile...", end='', flush=True)
+    
+        hours = np.flatnonzero(self.hour_seen)
+        agg = {}
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for c in self.HOURLY_COLUMNS:
+                cnt = self.hour_cnt[c][hours]
+                agg[c + '_mean'] = np.where(cnt > 0, self.hour_sum[c][hours] / cnt, np.nan)
+        hourly_profile = pd.DataFrame({
+            'hour': hours,
+            'is_sunshine': agg['is_sunshine_mean'],
+            'solar_rad': agg['solar_rad_mean'],
+            'clear_sky_rad': agg['clear_sky_rad_mean']
+        })
+    
+        hourly_profile['sunshine_prob'] = hourly_profile['is_sunshine'] * 100
+    
+        hourly_profile.to_csv(TMPPATH+hourly_file, index=False, float_format='%.1f')
+        print(f" ✓\n  Saved to: {hourly_file}")
+    
+        # Print summary
         print(f"\n{'='*60}")
-        print(f"CALCULATING SUNSHINE HOURS")
-        print(f"Location: {latitude:.4f}°N, {longitude:.4f}°E")
+        if year:
+            print(f"SUMMARY FOR {year}")
+        else:
+            print("SUMMARY (All Years)")
+        print("="*60)
     
-    print(f"Threshold: {solar_threshold} W/m²")
-    print("="*60)
+        total_days = len(daily_summary)
+        total_sunshine = daily_summary['sunshine_hours'].sum()
+        avg_daily = daily_summary['sunshine_hours'].mean()
+    
+        print(f"\nStatistics:")
+        print(f"  Total days analyzed: {total_days:,}")
+        print(f"  Total sunshine hours: {total_sunshine:,.1f}")
+        print(f"  Average daily sunshine: {avg_daily:.2f} hours")
+        print(f"  Maximum daily sunshine: {daily_summary['sunshine_hours'].max():.2f} hours")
     
+        # Top sunniest days
+        if len(daily_summary) >= 5:
+            print(f"\nTop 5 Sunniest Days:")
+            top_days = daily_summary.nlargest(5, 'sunshine_hours')
+            for idx, row in top_days.iterrows():
+                print(f"  {row['date']}: {row['sunshine_hours']:.2f} hours")
+    
+        # Monthly totals
+        print(f"\nMonthly Totals:")
+        for idx, row in monthly_summary.iterrows():
+            print(f"  {row['year_month']} ({row['month_name']}): "
+                  f"{row['total_sunshine']:.1f} hours ({row['sunshine_per_day']:.2f} hours/day)")
+    
+        return daily_summary, monthly_summary, hourly_profile
+
+
+@timed('compute')
+def calculate_sunshine(df, latitude, longitude, solar_threshold=120, year=None):
+    """
+    Calculate sunshine hours from the DataFrame
+    """
+    acc = SunshineAccumulator(latitude, longitude, solar_threshold)
+
     # Make sure we have the right columns
     if 'solar_rad' not in df.columns:
+        acc.header(year)
         print("ERROR: 'solar_rad' column not found in DataFrame!")
         return None, None, None
-    
-    # Create date columns
-    df['date'] = df['datetime'].dt.date
-    df['year'] = df['datetime'].dt.year
-    df['month'] = df['datetime'].dt.month
-    df['hour'] = df['datetime'].dt.hour
-    df['minute'] = df['datetime'].dt.minute
-    
-    # Initialize sun calculator
-    sun_calc = SunCalculator(latitude=latitude, longitude=longitude)
-    
-    # Calculate clear-sky radiation
-    print("Calculating clear-sky radiation...", end='', flush=True)
-    df['clear_sky_rad'] = df['datetime'].apply(sun_calc.clear_sky_radiation)
-    print(" ✓")
-    
-    # Calculate time interval between readings
-    df['time_diff'] = df['datetime'].diff().dt.total_seconds() / 3600.0
-    if len(df) > 1:
-        df.loc[0, 'time_diff'] = df.loc[1, 'time_diff']
-    else:
-        df.loc[0, 'time_diff'] = 0.0833  # Default 5 minutes
-    
-    median_interval = df['time_diff'].median()
-    print(f"  Median interval: {median_interval*60:.1f} minutes")
-    
-    # Calculate ratio and detect sunshine
-    print("Detecting sunshine intervals...", end='', flush=True)
-    
-    # Handle division by zero
-    df['ratio'] = df['solar_rad'] / df['clear_sky_rad']
-    df['ratio'] = df['ratio'].fillna(0)
-    df['ratio'] = df['ratio'].replace([np.inf, -np.inf], 0)
-    df['ratio'] = df['ratio'].clip(0, 2)
-    
-    # WMO algorithm: > threshold AND ratio > 0.4
-    df['is_sunshine'] = ((df['solar_rad'] > solar_threshold) & (df['ratio'] > 0.4)).astype(int)
-    df['sunshine_hours'] = df['is_sunshine'] * df['time_diff']
-    
-    total_sunshine_intervals = df['is_sunshine'].sum()
-    total_intervals = len(df)
-    print(f" ✓")
-    print(f"  Sunshine detected in {total_sunshine_intervals:,} of {total_intervals:,} intervals "
-          f"({total_sunshine_intervals/total_intervals*100:.1f}%)")
-    
-    # Determine output file names based on year
-    if year:
-        daily_file = f'daily_sunshine_{year}.csv'
-        monthly_file = f'monthly_sunshine_{year}.csv'
-        hourly_file = f'hourly_sunshine_profile_{year}.csv'
-    else:
-        daily_file = 'daily_sunshine_all_years.csv'
-        monthly_file = 'monthly_sunshine_all_years.csv'
-        hourly_file = 'hourly_sunshine_profile_all_years.csv'
-    
-    # DAILY SUMMARY
-    print("\nCreating daily summary...", end='', flush=True)
-    daily_summary = df.groupby('date').agg({
-        'solar_rad': 'mean',
-        'sunshine_hours': 'sum',
-        'is_sunshine': 'count'
-    }).reset_index()
-    
-    daily_summary.columns = ['date', 'avg_solar_rad', 'sunshine_hours', 'readings']
-    daily_summary['sunshine_percent'] = (daily_summary['sunshine_hours'] / 
-                                        (daily_summary['readings'] * median_interval)) * 100
-    daily_summary['date_str'] = daily_summary['date'].astype(str)
-    daily_summary['year'] = pd.to_datetime(daily_summary['date']).dt.year
-    daily_summary['month'] = pd.to_datetime(daily_summary['date']).dt.month
-    daily_summary['weekday'] = pd.to_datetime(daily_summary['date']).dt.day_name()
-    
-    daily_summary.to_csv(TMPPATH+daily_file, index=False, float_format='%.3f')
-    print(f" ✓\n  Saved to: {daily_file}")
-    
-    # MONTHLY SUMMARY
-    print("Creating monthly summary...", end='', flush=True)
-    monthly_summary = daily_summary.groupby(['year', 'month']).agg({
-        'sunshine_hours': 'sum',
-        'avg_solar_rad': 'mean',
-        'date': 'count'
-    }).reset_index()
-    
-    monthly_summary.columns = ['year', 'month', 'total_sunshine', 'avg_solar_rad', 'days']
-    monthly_summary['sunshine_per_day'] = monthly_summary['total_sunshine'] / monthly_summary['days']
-    monthly_summary['month_name'] = monthly_summary['month'].apply(lambda x: date(2000, x, 1).strftime('%b'))
-    monthly_summary['year_month'] = monthly_summary['year'].astype(str) + '-' + monthly_summary['month'].astype(str).str.zfill(2)
-    
-    monthly_summary.to_csv(TMPPATH+monthly_file, index=False, float_format='%.2f')
-    print(f" ✓\n  Saved to: {monthly_file}")
-    
-    # HOURLY PROFILE
-    print("Creating hourly profile...", end='', flush=True)
-    
-    # Filter daylight hours
-    daylight = df[(df['hour'] >= 6) & (df['hour'] <= 20)].copy()
-    hourly_profile = daylight.groupby('hour').agg({
-        'is_sunshine': 'mean',
-        'solar_rad': 'mean',
-        'clear_sky_rad': 'mean'
-    }).reset_index()
-    
-    hourly_profile['sunshine_prob'] = hourly_profile['is_sunshine'] * 100
-    
-    hourly_profile.to_csv(TMPPATH+hourly_file, index=False, float_format='%.1f')
-    print(f" ✓\n  Saved to: {hourly_file}")
-    
-    # Print summary
-    print(f"\n{'='*60}")
-    if year:
-        print(f"SUMMARY FOR {year}")
+
+    acc.add(df)
+    return acc.finish(year)
+
+
+def iter_wx_months(csv_path):
+    """
+    Yield the wxdata of all years one month at a time, in time order
+    (from the archive or the csv files, depending on USE_ARCHIVE)
+    """
+    years = get_available_years(csv_path)
+    if not years:
+        print(f"No CSV files found in {csv_path}")
+        return
+
+    if USE_ARCHIVE:
+        print(f"Loading archive for all available years")
+        for yymm in month_range(date(years[0], 1, 1), date(years[-1], 12, 1)):
+            year, month = int(yymm[:4]), int(yymm[5:7])
+            start = datetime(year, month, 1)
+            end   = datetime(year, month, calendar.monthrange(year, month)[1], 23, 59, 59)
+            df = load_wx(start, end)
+            if len(df) == 0:
+                continue
+            # same column labels as read_csv(header=None)
+            df.columns = range(len(WX_COLUMNS))
+            yield df
     else:
-        print("SUMMARY (All Years)")
+        print(f"Looking for all available files")
+        all_files = sorted(glob.glob(os.path.join(csv_path, f"*-{CSVFILESUFFIX}")))
+        print(f"Found {len(all_files)} CSV files:")
+        for file in all_files:
+            df, msg = read_month_csv(file)
+            print(msg)
+            if df is not None:
+                yield df.sort_values(by=0).reset_index(drop=True)
+
+
+@timed('compute')
+def calculate_sunshine_stream(csv_path, latitude, longitude, solar_threshold=120):
+    """
+    All years sunshine analysis with one month of readings in memory.
+    The solar statistics and the sunshine aggregates are collected per month
+    and merged at the end, the output is the same as for the combined data.
+    """
+    stats = SolarStats()
+    acc = SunshineAccumulator(latitude, longitude, solar_threshold)
+
+    rows = 0
+    first = last = None
+    for df in iter_wx_months(csv_path):
+        df = solar_frame(df, solar_col_idx)
+        if df is None:
+            return None, None, None
+
+        rows += len(df)
+        first = df['datetime'].min() if first is None else min(first, df['datetime'].min())
+        last  = df['datetime'].max() if last is None else max(last, df['datetime'].max())
+
+        stats.add(df)
+        acc.add(df)
+
+    if rows == 0:
+        print("No valid data loaded!")
+        return None, None, None
+
+    print(f"\nCombined dataset: {rows:,} total rows")
+    print(f"Date range: {first} to {last}")
+
+    print("\n" + "="*60)
+    print("ANALYZING SOLAR RADIATION DATA")
     print("="*60)
-    
-    total_days = len(daily_summary)
-    total_sunshine = daily_summary['sunshine_hours'].sum()
-    avg_daily = daily_summary['sunshine_hours'].mean()
-    
-    print(f"\nStatistics:")
-    print(f"  Total days analyzed: {total_days:,}")
-    print(f"  Total sunshine hours: {total_sunshine:,.1f}")
-    print(f"  Average daily sunshine: {avg_daily:.2f} hours")
-    print(f"  Maximum daily sunshine: {daily_summary['sunshine_hours'].max():.2f} hours")
-    
-    # Top sunniest days
-    if len(daily_summary) >= 5:
-        print(f"\nTop 5 Sunniest Days:")
-        top_days = daily_summary.nlargest(5, 'sunshine_hours')
-        for idx, row in top_days.iterrows():
-            print(f"  {row['date']}: {row['sunshine_hours']:.2f} hours")
-    
-    # Monthly totals
-    print(f"\nMonthly Totals:")
-    for idx, row in monthly_summary.iterrows():
-        print(f"  {row['year_month']} ({row['month_name']}): "
-              f"{row['total_sunshine']:.1f} hours ({row['sunshine_per_day']:.2f} hours/day)")
-    
+    stats.report()
 
-    return daily_summary, monthly_summary, hourly_profile
+    return acc.finish(None)
 
 
 def gnuplotStats(plt):
@@ -512,45 +887,7 @@ def gnuplotStats(plt):
     LEVEL1 = True
     LEVEL2 = True
 
-    # full error message
-    re_stderr = re.compile(r'^.*,\s+(line\s+\d+):\s+(.*)')
-    el = 0
-
-    gnuplot = '/usr/bin/gnuplot'
-
-    if os.path.exists(gnuplot):
-        print_dbg(LEVEL1,"runGnuPlot: plot png " + plt)
-        try:
-            proc_out = subprocess.Popen([gnuplot, plt], stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-
-            output = proc_out.stdout.readlines()
-            outerr = proc_out.stderr.readlines()
-
-            for line in outerr:
-                line = line.decode('latin1').strip()
-                m = re.search(re_stderr, line)
-                if m:
-                    print_dbg(True, "STDERR: %s" % line)
-                    if re.search("warning:",line):
-                        # we ignore warning errors
-                        pass
-                    else:
-                        raise ValueError('syntax or plot error in gnuplot file')
-                    el = 1
-
-            if LEVEL2:
-                for n in output:
-                    print_dbg(True, "STDOUT: %s" % n.strip())
-                for n in outerr:
-                    print_dbg(True, "STDERR: %s" % n.strip())
-
-        except Exception as e:
-            print_dbg(True, 'WARN : GnuPlot done with exception(s): %s.' % e)
-            el = 1
-
-    else:
-        print_dbg(True,"ERROR: gnuplot command '%s' not found." % gnuplot)
-        el = 1
+    el = gnuplot_run(plt, LEVEL1, LEVEL2)
 
     # cleanup temp files
     #if not KEEP_TMP:
@@ -568,6 +905,7 @@ def gnuplotStats(plt):
     return
 
 
+@timed('plot')
 def create_year_specific_visualizations(year):
     """Create gnuplot scripts for specific year"""
     
@@ -1334,6 +1672,7 @@ def create_combined_statistics(years: List[int], output_file: str = 'sunshine_st
 
 #-------------------------------------------------------------------------------
 
+@timed('compute')
 def main_statistics(year):
     """Main function to generate sunshine statistics"""
     
@@ -1460,34 +1799,8 @@ def main_statistics(year):
 
 #---- from advanced_visualizations.py ---------------------------------------------------------------------------
 
-def create_all_visualizations():
-    """Create all advanced visualizations for multi-year data"""
-
-    # Check if files exist
-    required_files = [
-        'daily_sunshine_all_years.csv',
-        'monthly_sunshine_all_years.csv'
-    ]
-
-    for file in required_files:
-        if not os.path.exists(TMPPATH+file):
-            print(f"Error: Required file '{file}' not found.")
-            print("Please run the main analysis with option 2 (all years) first.")
-            return
-
-    print("Creating advanced visualizations...")
-
-    # Load data
-    daily = pd.read_csv(TMPPATH+'daily_sunshine_all_years.csv')
-    monthly = pd.read_csv(TMPPATH+'monthly_sunshine_all_years.csv')
-
-    # Convert date columns
-    daily['date'] = pd.to_datetime(daily['date_str'])
-    daily['year'] = daily['date'].dt.year
-    daily['month'] = daily['date'].dt.month
-
-    # 1. Monthly Heatmap
-    print("1. Creating monthly heatmap...")
+def plot_monthly_heatmap(daily, monthly):
+    """ 1. Monthly Heatmap """
     plt.figure(figsize=(14, 10))
 
     # Pivot table for heatmap
@@ -1516,12 +1829,13 @@ def create_all_visualizations():
     
     plt.tight_layout()
     plt.savefig(TMPPATH+'monthly_heatmap.png', dpi=150)
-    print("   Saved: monthly_heatmap.png")
-    uploadPNG(TMPPATH  + f'monthly_heatmap.png', DO_SCP, KEEP_PNG, SCP)
-    
-    # 2. Yearly Trends
-    print("2. Creating yearly trends...")
-    
+    plt.close('all')
+
+    return 'monthly_heatmap.png'
+
+
+def plot_yearly_trends(daily, monthly):
+    """ 2. Yearly Trends """
     # Calculate yearly totals
     yearly_totals = daily.groupby('year')['sunshine_hours'].sum().reset_index()
     
@@ -1547,11 +1861,13 @@ def create_all_visualizations():
         plt.legend()
     plt.tight_layout()
     plt.savefig(TMPPATH+'yearly_trends.png', dpi=150)
-    print("   Saved: yearly_trends.png")
-    uploadPNG(TMPPATH  + f'yearly_trends.png', DO_SCP, KEEP_PNG, SCP)
-    
-    # 3. Monthly Averages across years
-    print("3. Creating monthly averages...")
+    plt.close('all')
+
+    return 'yearly_trends.png'
+
+
+def plot_monthly_averages(daily, monthly):
+    """ 3. Monthly Averages across years """
     plt.figure(figsize=(12, 6))
     
     # Calculate monthly averages
@@ -1570,48 +1886,13 @@ def create_all_visualizations():
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
     plt.savefig(TMPPATH+'monthly_averages.png', dpi=150)
-    print("   Saved: monthly_averages.png")
-    uploadPNG(TMPPATH  + f'monthly_averages.png', DO_SCP, KEEP_PNG, SCP)
-    
-############################# old #################################################
-    ## 4. Distribution of daily sunshine hours
-    #print("4. Creating distribution plot...")
-    #plt.figure(figsize=(12, 6))
-    
-    ## Create histogram
-    #plt.hist(daily['sunshine_hours'], bins=50, color='orange', 
-    #         alpha=0.7, edgecolor='black', density=True)
-    
-    ## Add kernel density estimate
-    #from scipy import stats
-    #kde = stats.gaussian_kde(daily['sunshine_hours'])
-    #x_range = np.linspace(0, daily['sunshine_hours'].max(), 1000)
-    #plt.plot(x_range, kde(x_range), 'r-', linewidth=2, label='Density')
-    
-    #plt.title(f'Distribution of Daily Sunshine Hours\n{MYPOSITION}')
-    #plt.xlabel('Sunshine Hours per Day')
-    #plt.ylabel('Density')
-    #plt.grid(True, alpha=0.3)
-    #plt.legend()
-    #plt.tight_layout()
-    #plt.savefig(TMPPATH+'sunshine_distribution.png', dpi=150)
-    #print("   Saved: sunshine_distribution.png")
-    #uploadPNG(TMPPATH  + f'sunshine_distribution.png', DO_SCP, KEEP_PNG, SCP)
-############################# old/new #################################################
-
-    # 4. Distribution of daily sunshine hours
-    print("4. Creating distribution plot...")
-    plt.figure(figsize=(12, 6))
+    plt.close('all')
 
-    # Create histogram without KDE
-    counts, bins, patches = plt.hist(daily['sunshine_hours'], bins=50, 
-                                     color='orange', alpha=0.7, 
-                                     edgecolor='black', density=True)
+    return 'monthly_averages.png'
 
-    # Add a simple curve using numpy instead of scipy
-    # Calculate bin centers
-    bin_centers = 0.5 * (bins[1:] + bins[:-1])
 
+def plot_distribution(daily, monthly):
+    """ 4. Distribution of daily sunshine hours, histogram and cumulative """
     # Calculate cumulative distribution for reference
     sorted_hours = np.sort(daily['sunshine_hours'])
     cumulative = np.arange(1, len(sorted_hours) + 1) / len(sorted_hours)
@@ -1653,12 +1934,13 @@ def create_all_visualizations():
 
     plt.tight_layout()
     plt.savefig(TMPPATH+'sunshine_distribution.png', dpi=150)
-    print("   Saved: sunshine_distribution.png")
-    uploadPNG(TMPPATH  + f'sunshine_distribution.png', DO_SCP, KEEP_PNG, SCP)
-############################# new #################################################
-    
-    # 5. Cumulative sunshine by month
-    print("5. Creating cumulative sunshine plot...")
+    plt.close('all')
+
+    return 'sunshine_distribution.png'
+
+
+def plot_cumulative(daily, monthly):
+    """ 5. Cumulative sunshine by month """
     plt.figure(figsize=(12, 6))
     
     # Calculate cumulative sunshine by date
@@ -1674,9 +1956,73 @@ def create_all_visualizations():
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
     plt.savefig(TMPPATH+'cumulative_sunshine.png', dpi=150)
-    print("   Saved: cumulative_sunshine.png")
-    uploadPNG(TMPPATH  + f'cumulative_sunshine.png', DO_SCP, KEEP_PNG, SCP)
-    
+    plt.close('all')
+
+    return 'cumulative_sunshine.png'
+
+
+# figures of create_all_visualizations, they only depend on the csv data
+ALL_FIGURES = [
+    ('Creating monthly heatmap',         plot_monthly_heatmap),
+    ('Creating yearly trends',           plot_yearly_trends),
+    ('Creating monthly averages',        plot_monthly_averages),
+    ('Creating distribution plot',       plot_distribution),
+    ('Creating cumulative sunshine plot', plot_cumulative),
+]
+
+
+def render_figures(figures, *data):
+    """ render the figures in a process pool, upload each one as soon as it is done
+        results and uploads are taken in list order, the png names are fixed
+        by the plot functions
+    """
+    workers = min(len(figures), RENDER_WORKERS)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        if pool:
+            jobs = [pool.submit(func, *data) for title, func in figures]
+        for i, (title, func) in enumerate(figures):
+            print(f"{i+1}. {title}...")
+            png = jobs[i].result() if pool else func(*data)
+            print(f"   Saved: {png}")
+            # upload while the other figures are still rendered
+            uploadPNG(TMPPATH + png, DO_SCP, KEEP_PNG, SCP)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    return
+
+
+@timed('plot')
+def create_all_visualizations():
+    """Create all advanced visualizations for multi-year data"""
+
+    # Check if files exist
+    required_files = [
+        'daily_sunshine_all_years.csv',
+        'monthly_sunshine_all_years.csv'
+    ]
+
+    for file in required_files:
+        if not os.path.exists(TMPPATH+file):
+            print(f"Error: Required file '{file}' not found.")
+            print("Please run the main analysis with option 2 (all years) first.")
+            return
+
+    print("Creating advanced visualizations...")
+
+    # Load data
+    daily = pd.read_csv(TMPPATH+'daily_sunshine_all_years.csv')
+    monthly = pd.read_csv(TMPPATH+'monthly_sunshine_all_years.csv')
+
+    # Convert date columns
+    daily['date'] = pd.to_datetime(daily['date_str'])
+    daily['year'] = daily['date'].dt.year
+    daily['month'] = daily['date'].dt.month
+
+    render_figures(ALL_FIGURES, daily, monthly)
 
     print(f"\nAll visualizations created successfully!")
     print(f"Location: {MYPOSITION}")
@@ -1787,17 +2133,33 @@ def main():
 
     year_input = args.year
     month_input = args.month
+    month = None
 
     if args.analyze == 'y':
         year = int(year_input)
 
         print(f"\nLoading data for {year}...")
-        combined_df = load_and_combine_files(CSVPATH, year=year)
+        combined_df = load_wx_data(CSVPATH, year=year)
+
+    elif args.analyze == 'a' and STREAM_ALL:
+        # All years, one month at a time
+        print(f"\nLoading all available data ({len(available_years)} years)...")
+        daily, monthly, hourly = calculate_sunshine_stream(
+            CSVPATH, latitude, longitude, solar_threshold
+        )
+        year = None
+
+        if daily is None:
+            print("Failed to load data!")
+            return
+
+        report_results(args, daily, year)
+        return
 
     elif args.analyze == 'a':
         # All years
         print(f"\nLoading all available data ({len(available_years)} years)...")
-        combined_df = load_and_combine_files(CSVPATH)
+        combined_df = load_wx_data(CSVPATH)
         year = None
 
     elif args.analyze == 'm':
@@ -1810,7 +2172,7 @@ def main():
             return
 
         print(f"\nLoading data for {year}-{month:02d}...")
-        combined_df = load_and_combine_files(CSVPATH, year=year, month=month)
+        combined_df = load_wx_data(CSVPATH, year=year, month=month)
 
 
     else:
@@ -1867,6 +2229,13 @@ def main():
             df_with_solar, latitude, longitude, solar_threshold, year
         )
 
+    report_results(args, daily, year, month)
+
+
+def report_results(args, daily, year, month=None):
+    """
+    List the generated files and create the all-years charts
+    """
     if daily is not None:
         print("\n" + "="*70)
         print("ANALYSIS COMPLETE")
@@ -23,12 +23,14 @@
 
 import wospi
 import os, sys
-import subprocess
 import shutil
-import re
 import time
 from datetime import date, timedelta, datetime
 
+# from local module
+from wxtools import gnuplot_run
+from csvindex import read_window
+
 DEBUG=False
 TRACE=False
 KEEP_PNG=False
@@ -93,9 +95,8 @@ def prepareUptimeData(fromDay, fromMonth, fromYear, toDay, toMonth, toYear, outf
     UPTEMP = wospi.TMPPATH + 'plot' + outfile + '.tmp'
     print_dbg(DEBUG,"DEBUG: prepareUptimeData: write %s timerange into temp" % rType)
     if (os.path.isfile(wospi.UPTIMEFILE)):
-        sf = open(wospi.UPTIMEFILE,'r')
-        wxlines = sf.readlines()
-        sf.close()
+        # only the lines from start_date on are read
+        wxlines = read_window(wospi.UPTIMEFILE, start_date)
 
         st = open(UPTEMP, 'w')
 
@@ -158,48 +159,10 @@ def print_dbg(level,msg):
 
 def runGnuPlot(plt):
     """ run gnuplot
-        TODO: parse output
     """
-    re_stderr = re.compile(r'^.*,\s+(line\s+\d+):\s+(.*)')
-    el = 0
-
     inFile = wospi.TMPPATH + 'plot' + plt + '.plt'
 
-    gnuplot = '/usr/bin/gnuplot'
-
-    if os.path.exists(gnuplot):
-        print_dbg(DEBUG,"DEBUG: runGnuPlot: plot png " + plt)
-        try:
-            proc_out = subprocess.Popen([gnuplot, inFile], stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-
-            output = proc_out.stdout.readlines()
-            outerr = proc_out.stderr.readlines()
-
-            for line in outerr:
-                line = line.decode('latin1').strip()
-                m = re.search(re_stderr, line)
-                if m:
-                    print_dbg(True, "STDER: %s" % line.strip())
-                    if re.search("warning:",line):
-                        # we ignore warning errors
-                        pass
-                    else:
-                        raise ValueError('syntax or plot error in gnuplot file')
-                    el = 1
-
-            if TRACE:
-                for n in output:
-                    print_dbg(True, "STDOUT: %s" % n.strip())
-                for n in outerr:
-                    print_dbg(True, "STDERR: %s" % n.strip())
-
-        except Exception as e:
-            print_dbg(True, 'WARN : GnuPlot done with exception(s): %s.' % e)
-            el = 1
-
-    else:
-        print_dbg(True,"ERROR: gnuplot command '%s' not found." % gnuplot)
-        el = 1
+    el = gnuplot_run(inFile, DEBUG, TRACE)
 
     # cleanup temp files
     if not KEEP_TMP:
@@ -78,12 +78,14 @@ import getopt
 from datetime import date, timedelta, datetime
 from config import TMPPATH, HOMEPATH, CSVPATH, CSVFILESUFFIX, SCPTARGET, SCP
 
-# numpy and panda for data structure
-import pandas as pd
-import numpy as np
-
 # from local module
-from wxtools import jump_by_month, print_dbg, stripNL, runGnuPlot, uploadPNG, uploadAny
+from wxtools import jump_by_month, print_dbg, runGnuPlot, uploadPNG, uploadAny, timed, lazy_module
+from wxarchive import load_wx, read_wx_frame, wx_float
+from wxrollup import load_daily, fill_days, rollup_frame, monthly_rollup
+
+# numpy and panda for data structure, imported on first use
+pd = lazy_module('pandas')
+np = lazy_module('numpy')
 
 #-------------------------------------------------------------------------------
 
@@ -161,6 +163,8 @@ KEEP_PNG = False
 KEEP_TMP = True
 # upload png and inc
 DO_SCP   = True
+# read wxdata from the columnar archive (wxarchive.py) instead of merging csv files
+USE_ARCHIVE = True
 
 #
 NB_DAYS = 370
@@ -231,6 +235,7 @@ def prepareCSVData(fromMonth,fromYear, tmpfile):
     return
 
 
+@timed('load')
 def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, do_fill):
     """ read wxdata into pandas dataformat
     """
@@ -240,42 +245,21 @@ def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, d
     # sample data
     # 01.02.2016 00:05:19,3.9,90,2.2,1012.5,237,1.7,0.0,0,0.0,0.0,0.0,0.0,1.5,1.7,6.1,135
 
-    # read all csv fields
-    data = pd.read_csv(wxin, header=None, converters = {16 : stripNL})
+    # only the UV index is used for the statistics, compact dtypes (wxarchive.WX_DTYPES)
+    data = read_wx_frame(wxin, ['UV_index'])
 
     # fill future month records with empty data
     # to have a even plotted chart (needs commandline option 'f')
     if do_fill:
         fillMonth = datetime.now().month + 1
         print_dbg(True, "INFO : fill future months with empty data (%s - 12)" % fillMonth)
-        for n in range(fillMonth,13):
-            future_date  = '01.' + str(n).zfill(2) + '.' + str(toYear)
-            data.loc[-1] = [future_date +" 00:00:00",0.0,90,0.0,1000.0,100,0.0,0.0,0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0]  # adding a row
-            data.index   = data.index + 1  # shifting index
-            print_dbg(DEBUG, "DEBUG: added fill data for date %s" % future_date)
+        fill_dates = [datetime(toYear, n, 1) for n in range(fillMonth,13)]
+        fill = pd.DataFrame({'timestamp': pd.to_datetime(fill_dates),
+                             'UV_index': np.float32(0.0)})
+        data = pd.concat([fill, data], ignore_index=True)
 
-
-    # rename columns
-    data.rename(columns={ 0: 'timestamp',
-                          1: 'outside_air_temp',
-                          2: 'outside_rel_hum',
-                          3: 'outside_dew_point_temp',
-                          4: 'barometic_pressure',
-                          5: 'present_wind_direction',
-                          6: 'present_wind_speed',
-                          7: 'UV_index',
-                          8: 'solar_radiation',
-                          9: 'rain_rate',
-                         10: 'daily_rain',
-                         11: 'daily_ET',
-                         12: 'monthly_ET',
-                         13: 'ten_min_avg_wind_speed',
-                         14: 'two_min_avg_wind_speed',
-                         15: 'ten_min_wind_gust_speed',
-                         16: 'ten_min_wind_gust_direction'}, inplace=True)
-
-    # convert date string field to datetime
-    data['timestamp'] = pd.to_datetime(data['timestamp'], format = '%d.%m.%Y %H:%M:%S')
+    # same values as the archive path
+    data = wx_float(data, ['UV_index'])
 
     toHour = 23
     start_date = "%s-%s-%s %s:00:00" % (fromYear,str(fromMonth).zfill(2),str(fromDay).zfill(2),str(fromHour).zfill(2))
@@ -296,6 +280,59 @@ def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, d
     return plotdata
 
 
+def read_wx_archive(fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, do_fill):
+    """ read wxdata from the columnar archive into pandas dataformat
+        same result as prepareCSVData + read_wx_csv
+    """
+
+    print_dbg(True, 'INFO : building DataFrame from archive')
+
+    start_date = datetime(fromYear, fromMonth, fromDay, int(fromHour), 0, 0)
+    end_date   = datetime(toYear, toMonth, toDay, 23, 59, 59)
+
+    # only the UV index is used for the statistics
+    data = load_wx(start_date, end_date, ['UV_index'], fill_missing=True)
+
+    # fill future month records with empty data
+    # to have a even plotted chart (needs commandline option 'f')
+    if do_fill:
+        fillMonth = datetime.now().month + 1
+        print_dbg(True, "INFO : fill future months with empty data (%s - 12)" % fillMonth)
+        fill_dates = [datetime(toYear, n, 1) for n in range(fillMonth,13)]
+        fill = pd.DataFrame({'timestamp': pd.to_datetime([d for d in fill_dates if start_date <= d <= end_date]),
+                             'UV_index': 0.0})
+        data = pd.concat([fill, data], ignore_index=True)
+
+    # use first col. as index
+    plotdata = data.set_index('timestamp')
+
+    return plotdata
+
+
+def read_wx_daily(fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear, do_fill):
+    """ read the daily UV summary (wxrollup) into pandas dataformat
+        same daily values as read_wx_archive + rollup in uv_stats
+    """
+
+    print_dbg(True, 'INFO : building DataFrame from daily summary')
+
+    start_date = datetime(fromYear, fromMonth, fromDay, int(fromHour), 0, 0)
+    end_date   = datetime(toYear, toMonth, toDay, 23, 59, 59)
+
+    # only the UV index is used for the statistics
+    data = load_daily(start_date, end_date, ['UV_index'], fill_missing=True)
+
+    # fill future month records with empty data
+    # to have a even plotted chart (needs commandline option 'f')
+    if do_fill:
+        fillMonth = datetime.now().month + 1
+        print_dbg(True, "INFO : fill future months with empty data (%s - 12)" % fillMonth)
+        fill_dates = [datetime(toYear, n, 1) for n in range(fillMonth,13)]
+        data = fill_days(data, [d for d in fill_dates if start_date <= d <= end_date], ['UV_index'])
+
+    return data
+
+
 def rebuild_name(fin,key):
     """ add year prefix to filename
     """
@@ -308,38 +345,26 @@ def rebuild_name(fin,key):
     return fout
 
 
+@timed('compute')
 def uv_stats(pdin,key,fromMonth,toMonth,do_fill):
     """ calculate UV statistics per day and per month
     """
     print_dbg(True, 'INFO : calculating UV stats')
 
-    # get UV column
-    pd_uv  = pdin.iloc[:,[6]]
-    FREQ = 'D'
-    print_dbg(DEBUG, "DEBUG: pandas UV dataframe end: \n%s" % (pd_uv.tail(3)))
-
-    # resample to day and calc some basic stats
-    # old syntax
-    # numpy: 1.6.2
-    # pandas: 0.14.1
-    #uv_mean = pd_uv.resample(FREQ, how='mean')
-    #uv_max  = pd_uv.resample(FREQ, how='max')
-    #uv_min  = pd_uv.resample(FREQ, how='min')
-    # PLI new syntax
-    # numpy: 1.12.1
-    # pandas: 0.19.2
-    uv_mean = pd_uv.resample(FREQ).mean()
-    uv_max  = pd_uv.resample(FREQ).max()
-    uv_min  = pd_uv.resample(FREQ).min()
+    # daily min, max and mean in one pass (wxrollup)
+    # pdin is either raw wxdata or the daily summary from read_wx_daily
+    if 'UV_index_min' not in pdin.columns:
+        pdin = rollup_frame(pdin, ['UV_index'])
+    print_dbg(DEBUG, "DEBUG: pandas UV daily summary end: \n%s" % (pdin.tail(3)))
 
-    # drop last record for trope-night; due to timeshift before
-    #if len(uv_min) < len(uv_min_n):
-    #    uv_min_n=uv_min_n.iloc[:-1]
+    uv_min  = pdin[['UV_index_min']]
+    uv_max  = pdin[['UV_index_max']]
+    uv_mean = pdin[['UV_index_mean']]
 
     # rename columns
-    uvx_min  = uv_min.rename  (columns={'UV_index': '_01uv_min'})
-    uvx_max  = uv_max.rename  (columns={'UV_index': '_02uv_max'})
-    uvx_mean = uv_mean.rename (columns={'UV_index': '_03uv_mean'})
+    uvx_min  = uv_min.rename  (columns={'UV_index_min' : '_01uv_min'})
+    uvx_max  = uv_max.rename  (columns={'UV_index_max' : '_02uv_max'})
+    uvx_mean = uv_mean.rename (columns={'UV_index_mean': '_03uv_mean'})
 
     print_dbg(DEBUG, "DEBUG: pandas UV uvx_mean: \n%s" % (uvx_mean.tail(3)))
 
@@ -381,10 +406,10 @@ def uv_stats(pdin,key,fromMonth,toMonth,do_fill):
 
     #m_df  = uv_df.resample('MS').apply(lambda x: agg_dict[x.name](x))
 
-    m_df  = uv_df.resample('MS').agg({'_01uv_min' :'min',
-                                        '_02uv_max' :'max',
-                                        '_03uv_mean':'mean',
-                                    })
+    m_df  = monthly_rollup(uv_df, {'_01uv_min' :'min',
+                                   '_02uv_max' :'max',
+                                   '_03uv_mean':'mean',
+                                  })
 
     d_min    = "%.2f" % m_df._01uv_min.min()
     d_max    = "%.2f" % m_df._02uv_max.max()
@@ -651,8 +676,11 @@ def main():
 
 
     try:
-        prepareCSVData(fromMonth,fromYear, statdata)
-        wr = read_wx_csv(statdata,fromDay,fromMonth,fromYear,'00',toDay,toMonth,toYear,has_cmdf)
+        if USE_ARCHIVE:
+            wr = read_wx_daily(fromDay,fromMonth,fromYear,'00',toDay,toMonth,toYear,has_cmdf)
+        else:
+            prepareCSVData(fromMonth,fromYear, statdata)
+            wr = read_wx_csv(statdata,fromDay,fromMonth,fromYear,'00',toDay,toMonth,toYear,has_cmdf)
 
         df = uv_stats(wr,key,fromMonth,toMonth,has_cmdf)
         save_html(df, key)
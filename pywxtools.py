@@ -17,12 +17,13 @@
 
 import config
 import os, sys
-import subprocess
 import shutil
-import re
 import time
 from datetime import date, timedelta, datetime
 
+# from local module
+from wxtools import gnuplot_run, uploadAny, uploadPNG
+
 
 #-------------------------------------------------------------------------------
 
@@ -48,49 +49,10 @@ def print_dbg(level,msg):
 
 def runGnuPlot(plt, KEEP_TMP=False, LEVEL1=False, LEVEL2=False):
     """ run gnuplot
-        TODO: parse output
     """
-    # full error message
-    re_stderr = re.compile(r'^.*,\s+(line\s+\d+):\s+(.*)')
-    el = 0
-
     inFile = config.TMPPATH + 'plot' + plt + '.plt'
 
-    gnuplot = '/usr/bin/gnuplot'
-
-    if os.path.exists(gnuplot):
-        print_dbg(LEVEL1,"runGnuPlot: plot png " + plt)
-        try:
-            proc_out = subprocess.Popen([gnuplot, inFile], stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-
-            output = proc_out.stdout.readlines()
-            outerr = proc_out.stderr.readlines()
-
-            for line in outerr:
-                line = line.decode('latin1').strip()
-                m = re.search(re_stderr, line)
-                if m:
-                    print_dbg(True, "STDERR: %s" % line)
-                    if re.search("warning:",line):
-                        # we ignore warning errors
-                        pass
-                    else:
-                        raise ValueError('syntax or plot error in gnuplot file')
-                    el = 1
-
-            if LEVEL2:
-                for n in output:
-                    print_dbg(True, "STDOUT: %s" % n.strip())
-                for n in outerr:
-                    print_dbg(True, "STDERR: %s" % n.strip())
-
-        except Exception as e:
-            print_dbg(True, 'WARN : GnuPlot done with exception(s): %s.' % e)
-            el = 1
-
-    else:
-        print_dbg(True,"ERROR: gnuplot command '%s' not found." % gnuplot)
-        el = 1
+    el = gnuplot_run(inFile, LEVEL1, LEVEL2)
 
     # cleanup temp files
     if not KEEP_TMP:
@@ -106,51 +68,6 @@ def runGnuPlot(plt, KEEP_TMP=False, LEVEL1=False, LEVEL2=False):
     return el
 
 
-def uploadAny(inFile, DO_SCP=True, KEEP_IN=False, trans_mode='scp'):
-    """ copies the any file to the website
-    """
-
-    SCPCOMMAND_PLOTINT = '%s -o ConnectTimeout=12 %s %s' % (trans_mode, inFile, config.SCPTARGET)
-
-    if DO_SCP:
-        try:
-            print_dbg(True, 'INFO : uploading %s.' % (inFile))
-            os.system(SCPCOMMAND_PLOTINT)
-
-        except Exception as e:
-            print_dbg(True, 'ERROR: upload %s: %s.' % (inFile,e))
-
-    if not KEEP_IN:
-        if (os.path.isfile(inFile)):
-            os.unlink(inFile)
-        else:
-            print_dbg(True, 'ERROR: cannot delete %s.' % (inFile))
-
-    return
-
-
-def uploadPNG(png, DO_SCP=True, KEEP_PNG=False,trans_mode='scp'):
-    """ copies the png file to the website
-    """
-
-    SCPCOMMAND_PLOTINT = '%s -o ConnectTimeout=12 %s %s' % (trans_mode, png, config.SCPTARGET)
-
-    if DO_SCP:
-        try:
-            print_dbg(True, 'INFO : uploading %s.' % (png))
-            os.system(SCPCOMMAND_PLOTINT)
-
-        except Exception as e:
-            print_dbg(True, 'ERROR: upload png %s: %s.' % (png,e))
-
-    if not KEEP_PNG:
-        if (os.path.isfile(png)):
-            os.unlink(png)
-        else:
-            print_dbg(True, 'ERROR: cannot delete %s.' % (png))
-
-    return
-
 def stripNL(text):
     """ remove the newline from the end of the string
     """
@@ -19,6 +19,16 @@
 # 7) use values from URL and configure the variabels EXTENT, WIDTH and HEIGHT in main()
 
 # added code to generate gif
+#
+# The frames are downloaded in a small thread pool, every request has a
+# timeout and is retried with backoff. Downloaded frames are kept in
+# SATCACHE, the name contains date, satellite and a key of bbox and size,
+# so a run only fetches the new day. Frames older than the window are
+# removed from the cache.
+#
+# Configuration options in config.py (all optional)
+#   SATCACHE          ... frame cache, default /var/tmp/satcache/
+#   SAT_SNAPSHOT_URL  ... snapshot service, e.g. a local http server for testing
 
 # used for:
 #   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
@@ -35,6 +45,7 @@
 #  PLI, 02.11.2023: add watermark color
 #  PLI, 15.11.2023: read HOMEPATH from environment
 #  PLI, 18.07.2025: changes for python3
+#  PLI, 17.10.2026: concurrent download with retry, frame cache
 #
 
 import sys, os
@@ -43,7 +54,10 @@ CONFIG_HOME = os.environ.get('HOMEPATH')
 sys.path.append(CONFIG_HOME)
 
 import urllib.request, urllib.parse, urllib.error
+import hashlib
+import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, date
 import numpy as np
 
@@ -51,6 +65,7 @@ from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageSequence
 import imageio
 from fnmatch import fnmatch
 
+import config
 from config import SCPTARGET, SCP
 
 # font for watermark text
@@ -63,9 +78,23 @@ outdir = '/var/tmp/'
 # gif file name
 outgif = outdir + 'radar.gif'
 
+# downloaded frames, kept between the runs
+cachedir = getattr(config, 'SATCACHE', outdir + 'satcache/')
+
+# NASA Worldview snapshot service
+SNAPSHOT_URL = getattr(config, 'SAT_SNAPSHOT_URL', 'https://wvs.earthdata.nasa.gov/api/v1/snapshot')
+
 # number of days bevor today to start
 NUMDAYS=-5
 
+# parallel downloads, timeout per request (seconds)
+FETCH_WORKERS = 4
+FETCH_TIMEOUT = 60
+
+# retries of a failed request, waiting FETCH_BACKOFF, 2*FETCH_BACKOFF, ... seconds
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 5
+
 # print debug info
 DEBUG=False
 
@@ -138,15 +167,12 @@ def get_image_type(filename):
         return img.format.lower()
 
 
-def animate_gif(in_dir,in_mask):
+def animate_gif(file_names):
     """ combine the jpg files into a gif
         repeat rotation of jpgs
     """
-    # get all jpg files to merge into gif
-    file_names = sorted((fn for fn in os.listdir(in_dir) if fnmatch(fn,in_mask)))
-
     # get list of jpeg files
-    images = [Image.open(in_dir + '/' + fn) for fn in file_names]
+    images = [Image.open(fn) for fn in file_names]
 
     size = (886,488)
     #size = (886/2,488/2)
@@ -169,14 +195,6 @@ def animate_gif(in_dir,in_mask):
         print_dbg(True, 'ERROR: could not create %s: %s.' % (outgif,e))
         sys.exit(3)
 
-    if not KEEP_TMP:
-        for fn in file_names:
-            print_dbg(True, "INFO: removing %s" % fn)
-            try:
-                os.remove(in_dir + fn)
-            except Exception as e:
-                print_dbg(True, 'ERROR: could not remove %s: %s.' % (fn,e))
-
 
 
 def uploadGIF(gif):
@@ -198,6 +216,150 @@ def uploadGIF(gif):
 
     return
 
+#-------------------------------------------------------------------------------
+# frame cache and download
+
+def frame_url(day, sat, extent, width, height):
+    """ snapshot url of one satellite and day
+    """
+    #URL = SNAPSHOT_URL + "?REQUEST=GetSnapshot&" \
+    #        "TIME="+day.strftime("%Y-%m-%d")+"&" \
+    #        "BBOX="+EXTENT+"&" \
+    #        "CRS=EPSG:4326&" \
+    #        "LAYERS=MODIS_"+sat+"_CorrectedReflectance_TrueColor,Coastlines,MODIS_"+sat+"_Thermal_Anomalies_All&" \
+    #        "FORMAT=image/jpeg&" \
+    #        "WIDTH="+WIDTH+"&HEIGHT="+HEIGHT
+
+    URL = SNAPSHOT_URL + "?REQUEST=GetSnapshot&" \
+            "TIME="+day.strftime("%Y-%m-%d")+"&" \
+            "BBOX="+extent+"&" \
+            "CRS=EPSG:4326&" \
+            "LAYERS=MODIS_"+sat+"_CorrectedReflectance_TrueColor,Reference_Labels_15m&" \
+            "FORMAT=image/jpeg&" \
+            "WIDTH="+width+"&HEIGHT="+height
+
+    return URL
+
+
+def frame_name(day, sat, extent, width, height):
+    """ cache file of a frame: date, satellite, bbox and size
+    """
+    # Since the Terra satellite passes over before Aqua
+    # we need to save it before Aqua (alphabetical order puts it in wrong order)
+    if sat == "Terra":
+        sat_order="1Terra"
+    if sat == "Aqua":
+        sat_order="2Aqua"
+
+    stringdate = datetime.strftime(day,"%Y-%m-%d")
+    dayofyear  = str(day.timetuple().tm_yday).zfill(3)
+    key = hashlib.sha1(('%s/%sx%s' % (extent, width, height)).encode()).hexdigest()[:8]
+
+    return cachedir + 'MODIS_TrueColor_'+stringdate+'_'+ dayofyear + '_' + sat_order + '_' + key + '.jpg'
+
+
+def download(url, target):
+    """ download url to target, retry with backoff on network and server errors
+    """
+    req = urllib.request.Request(url, headers={'User-Agent': 'wospi-satimage'})
+
+    for attempt in range(FETCH_RETRIES + 1):
+        try:
+            with urllib.request.urlopen(req, timeout=FETCH_TIMEOUT) as r, open(target, 'wb') as f:
+                while True:
+                    chunk = r.read(65536)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            return
+
+        except urllib.error.HTTPError as e:
+            # client errors do not get better
+            if e.code < 500 and e.code != 429:
+                raise
+            err = e
+        except (urllib.error.URLError, socket.timeout, ConnectionError) as e:
+            err = e
+
+        if attempt < FETCH_RETRIES:
+            wait = FETCH_BACKOFF * 2 ** attempt
+            print_dbg(True, 'WARN: %s, retry in %ss' % (err, wait))
+            time.sleep(wait)
+
+    raise err
+
+
+def fetch_frame(frame):
+    """ download, check and watermark one frame into the cache
+        returns 'cached', 'fetched', 'invalid' or 'failed'
+    """
+    day, sat, url, image_name = frame
+
+    if os.path.isfile(image_name):
+        print_dbg(DEBUG, 'DEBUG: File %s already present.' % (image_name))
+        return 'cached'
+
+    print_dbg(DEBUG, "DEBUG: requesting: %s" % (url))
+
+    tmpfile = image_name + '.tmp'
+    try:
+        download(url, tmpfile)
+
+    except Exception as e:
+        print_dbg(True, 'ERROR: URL: %s.' % (url))
+        print_dbg(True, 'ERROR: could not download %s: %s.' % (os.path.basename(image_name),e))
+        if os.path.isfile(tmpfile):
+            os.unlink(tmpfile)
+        return 'failed'
+
+    try:
+        valid = get_image_type(tmpfile) == 'jpeg'
+    except Exception:
+        valid = False
+
+    if not valid:
+        print_dbg(True, 'ERROR: URL: %s.' % (url))
+        print_dbg(True, "  %s is not a valid image file!" % os.path.basename(image_name))
+        # the service sends an error text instead of the image
+        f    = open(tmpfile, errors='replace')
+        ftxt = f.read()
+        print(ftxt)
+        f.close()
+        os.unlink(tmpfile)
+        return 'invalid'
+
+    # only complete frames get into the cache
+    add_watermark(tmpfile, sat+': '+day.strftime("%Y-%m-%d"), tmpfile)
+    os.replace(tmpfile, image_name)
+    print_dbg(True, "  " + os.path.basename(image_name))
+
+    return 'fetched'
+
+
+def fetch_frames(frames):
+    """ get all frames, the missing ones are downloaded in parallel
+        returns the status of each frame
+    """
+    if not os.path.isdir(cachedir):
+        os.makedirs(cachedir)
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        return list(pool.map(fetch_frame, frames))
+
+
+def prune_cache(keep):
+    """ remove the frames that are not in keep (older days, other bbox)
+    """
+    keep = set(os.path.basename(fn) for fn in keep)
+    for fn in os.listdir(cachedir):
+        if fnmatch(fn, 'MODIS_*') and fn not in keep:
+            print_dbg(True, "INFO: removing %s" % fn)
+            try:
+                os.remove(cachedir + fn)
+            except Exception as e:
+                print_dbg(True, 'ERROR: could not remove %s: %s.' % (fn,e))
+    return
+
 #-------------------------------------------------------------------------------
 
 def main():
@@ -216,83 +378,35 @@ def main():
     WIDTH  = "1772"
     HEIGHT = "976"
 
-    # abort counter
-    n=0
+    frames = []
     while end_date >= now:
-        year  = str(now.year)
-        month = str(now.month).zfill(2)
-        day   = str(now.day).zfill(2)
-        dayofyear = str(now.timetuple().tm_yday).zfill(3)
-        stringdate = datetime.strftime(now,"%Y-%m-%d")
-        print_dbg(DEBUG, "year     : %s" % year)
-        print_dbg(DEBUG, "dayofyear: %s" % dayofyear)
-
-        print_dbg(True, "INFO: working on %s ..." % (stringdate))
-
-
-        for sat in np.array(["Terra","Aqua"]):
-
-            #URL = "https://wvs.earthdata.nasa.gov/api/v1/snapshot?REQUEST=GetSnapshot&" \
-            #        "TIME="+year+"-"+month+"-"+day+"&" \
-            #        "BBOX="+EXTENT+"&" \
-            #        "CRS=EPSG:4326&" \
-            #        "LAYERS=MODIS_"+sat+"_CorrectedReflectance_TrueColor,Coastlines,MODIS_"+sat+"_Thermal_Anomalies_All&" \
-            #        "FORMAT=image/jpeg&" \
-            #        "WIDTH="+WIDTH+"&HEIGHT="+HEIGHT
-
-            URL = "https://wvs.earthdata.nasa.gov/api/v1/snapshot?REQUEST=GetSnapshot&" \
-                    "TIME="+year+"-"+month+"-"+day+"&" \
-                    "BBOX="+EXTENT+"&" \
-                    "CRS=EPSG:4326&" \
-                    "LAYERS=MODIS_"+sat+"_CorrectedReflectance_TrueColor,Reference_Labels_15m&" \
-                    "FORMAT=image/jpeg&" \
-                    "WIDTH="+WIDTH+"&HEIGHT="+HEIGHT
-
-            print_dbg(DEBUG, "DEBUG: requesting: %s" % (URL))
-
-            # Since the Terra satellite passes over before Aqua
-            # we need to save it before Aqua (alphabetical order puts it in wrong order)
-            if sat == "Terra":
-                sat_order="1Terra"
-            if sat == "Aqua":
-                sat_order="2Aqua"
-
-            image_name = 'MODIS_TrueColor_'+stringdate+'_'+ dayofyear + '_' + sat_order+'.jpg'
-
-            if not os.path.isfile(outdir+image_name):
-                try:
-                    urllib.request.urlretrieve(URL, outdir+image_name)
-
-                except Exception as e:
-                    print_dbg(True, 'ERROR: URL: %s.' % (URL))
-                    print_dbg(True, 'ERROR: could not download %s: %s.' % (image_name,e))
-                    sys.exit(1)
-
-                if get_image_type(outdir+image_name) == 'jpeg':
-                    add_watermark(outdir+image_name,sat+': '+stringdate,outdir+image_name)
-                    print_dbg(True, "  " + image_name)
-                else:
-                    n += 1
-                    print_dbg(True, 'ERROR: URL: %s.' % (URL))
-                    print_dbg(True, "  %s is not a valid image file!" % image_name)
-                    f    = open(outdir+image_name)
-                    ftxt = f.read()
-                    print(ftxt)
-                    f.close()
-                    if (os.path.isfile(outdir+image_name)):
-                        os.unlink(outdir+image_name)
-
-                    # abort, if too many errors occure
-                    if int(n) > abs(NUMDAYS):
-                        print_dbg(True, 'too many exceptions occured. Aborting...')
-                        sys.exit(2)
-
-            else:
-                print_dbg(True, 'INFO: File %s already present.' % (image_name))
+        print_dbg(DEBUG, "day      : %s" % now.strftime("%Y-%m-%d"))
+
+        for sat in ["Terra","Aqua"]:
+            frames.append((now, sat, frame_url(now, sat, EXTENT, WIDTH, HEIGHT),
+                                     frame_name(now, sat, EXTENT, WIDTH, HEIGHT)))
 
         now = now+timedelta(days=1)
 
-    animate_gif(outdir,"MODIS_*")
+    print_dbg(True, "INFO: working on %s to %s ..." % (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")))
+    status = fetch_frames(frames)
+    for st in ('cached', 'fetched', 'invalid', 'failed'):
+        print_dbg(True, "INFO: %d frame(s) %s" % (status.count(st), st))
+
+    # abort, if too many errors occure
+    n = status.count('invalid') + status.count('failed')
+    if int(n) > abs(NUMDAYS):
+        print_dbg(True, 'too many exceptions occured. Aborting...')
+        sys.exit(2)
+
+    images = [f[3] for f in frames if os.path.isfile(f[3])]
+    if not images:
+        print_dbg(True, 'ERROR: no frames to animate.')
+        sys.exit(1)
+
+    prune_cache(images)
+
+    animate_gif(images)
     uploadGIF(outgif)
 
 
@@ -15,6 +15,12 @@
 #
 #   modules:  windrose, numpy, matplotlib, pandas, PIL, sqlite3
 #
+# usage:
+#   python plotWind.py                 ... windrose of the last NBDAYS days
+#   python plotWind.py -y 2025         ... yearly windrose from the sqlite db
+#   python plotWind.py -y 2020-2025    ... multi-year windrose from the sqlite db
+#   python plotWind.py --migrate-db    ... add the indexed epoch column to the db, once
+#
 # Author:      Peter Lidauer <plix1014@gmail.com>
 #
 # Created:     10.12.2015
@@ -28,6 +34,7 @@
 #
 
 import sys,os, shutil
+import getopt
 
 CONFIG_HOME = os.environ.get('HOMEPATH')
 sys.path.append(CONFIG_HOME)
@@ -40,6 +47,9 @@ import pandas as pd
 import wospi
 from config import TMPPATH, HOMEPATH, CSVPATH, CSVFILESUFFIX, SCPTARGET, SCP
 
+# columnar wxdata archive
+from wxarchive import load_wx, read_wx_frame, wx_float, to_epoch
+
 # for resizing the image
 import PIL
 from PIL import Image
@@ -73,6 +83,14 @@ dbfile = HOMEPATH + '../db/wospi.db'
 # False ... sqlite3
 USE_CSV = True
 
+# yearly windrose: the db returns only the sector x speed class histogram
+# 16 sectors of 22.5 deg, speed classes in m/s, the last one is open
+WR_NSECTOR = 16
+WR_BINS    = [0, 1, 2, 3, 4, 5, 6, 7]
+
+# with csv files: read closed months from the columnar archive (wxarchive.py)
+USE_ARCHIVE = True
+
 # wind speed and direction variables, used by windrose
 wd=[]
 ws=[]
@@ -168,36 +186,18 @@ def prepareCSVData(fromMonth,fromYear):
 
 
 
-def stripNL(text):
-    """ remove the newline from the end of the string
-    """
-    try:
-        return float(text.strip())
-    except AttributeError:
-        return float(text)
-
-
 def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear,isgust=False):
     """ read wxdata into pandas dataformat
     """
     # sample data
     # 20.12.2015 19:04:35,4.0,98,3.9,1027.8,242,2.6,0.0,0,0.0,0.4,0.0,5.8,1.7,2.0,4.3,180
 
-    # rows to read
-    rows = [0, 5, 6, 15, 16]
+    # columns to read, compact dtypes (wxarchive.WX_DTYPES)
+    cols = ['present_wind_direction', 'present_wind_speed',
+            'ten_min_wind_gust_speed', 'ten_min_wind_gust_direction']
 
-    # read csv
-    data = pd.read_csv(wxin, header=None, usecols=rows, converters = {16 : stripNL})
-
-    # rename columns
-    data.rename(columns={ 0: 'timestamp',
-                          5: 'present_wind_direction',
-                          6: 'present_wind_speed',
-                         15: 'ten_min_wind_gust_speed',
-                         16: 'ten_min_wind_gust_direction'}, inplace=True)
-
-    # convert date string field to datetime
-    data['timestamp'] = pd.to_datetime(data['timestamp'], format = '%d.%m.%Y %H:%M:%S')
+    # read csv, same values as the archive path
+    data = wx_float(read_wx_frame(wxin, cols), cols)
 
     print_dbg(TRACE, data.head(2))
 
@@ -225,39 +225,112 @@ def read_wx_csv(wxin,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear,is
     return plotdata
 
 
+def read_wx_archive(fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear):
+    """ read wind columns from the columnar archive into pandas dataformat
+        returns the same columns as read_wx_csv
+    """
+    start_date = datetime(fromYear, fromMonth, fromDay, int(fromHour), 0, 0)
+    end_date   = datetime(toYear,   toMonth,   toDay,   int(fromHour), 0, 0)
+
+    print_dbg(DEBUG, "DEBUG: start: %s" % (start_date))
+    print_dbg(DEBUG, "DEBUG: end  : %s" % (end_date))
+
+    plotdata = load_wx(start_date, end_date, ['present_wind_direction', 'present_wind_speed',
+                                              'ten_min_wind_gust_speed', 'ten_min_wind_gust_direction'])
+
+    print_dbg(TRACE, "=== start of archive records ===")
+    print_dbg(TRACE, plotdata.head(2))
+    print_dbg(TRACE, "=== end of archive records ===")
+    print_dbg(TRACE, plotdata.tail(2))
+
+    return plotdata
+
+
 #-------------------------------------------------------------------------------
 # handle sqlite3 files
 
+# 'dd.mm.YYYY HH:MM:SS' -> seconds, same (naive) epoch as wxarchive.to_epoch
+SQL_EPOCH = ("CAST(strftime('%s', substr(timestamp,7,4) || '-' || substr(timestamp,4,2) || '-' || "
+             "substr(timestamp,1,2) || ' ' || substr(timestamp,12,8)) AS INTEGER)")
+
+def has_epoch(con):
+    """ True if vantage_wxdata has the epoch column of --migrate-db
+        an old sqlite without table_xinfo returns no rows
+    """
+    return 'epoch' in [r[1] for r in con.execute("PRAGMA table_xinfo(vantage_wxdata)")]
+
+
+def ensure_epoch(con):
+    """ add the indexed epoch column to vantage_wxdata
+        a virtual generated column, the writer and its inserts are not changed
+    """
+    cur  = con.cursor()
+
+    if not has_epoch(con):
+        print_dbg(True, "INFO : adding epoch column to vantage_wxdata")
+        cur.execute("ALTER TABLE vantage_wxdata ADD COLUMN epoch INTEGER "
+                    "GENERATED ALWAYS AS (" + SQL_EPOCH + ") VIRTUAL")
+
+    cur.execute("CREATE INDEX IF NOT EXISTS vantage_wxdata_epoch ON vantage_wxdata (epoch)")
+    con.commit()
+    return
+
+
+def migrate_db(dbfile):
+    """ one-time migration of the db, needs SQLite 3.31+ and write access
+        readers of the db must be able to handle the generated column
+    """
+    con = None
+    try:
+        con = db.connect(dbfile)
+        ensure_epoch(con)
+        print_dbg(True, "INFO : %s has an indexed epoch column" % dbfile)
+
+    except db.Error as e:
+        print_dbg(True, "Error %s:" % e.args[0])
+        sys.exit(1)
+
+    finally:
+        if con:
+            con.close()
+
+    return
+
+
 def read_wx_db(dbfile,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear,isgust=False):
     """ sql read wxdata into pandas dataformat
     """
     # sample data
     # 20.12.2015 19:04:35,4.0,98,3.9,1027.8,242,2.6,0.0,0,0.0,0.4,0.0,5.8,1.7,2.0,4.3,180
+    con = None
     try:
         con = db.connect(dbfile)
 
         # set time range
-        start_date = "%s.%s.%s %s:00:00" % (str(fromDay).zfill(2),str(fromMonth).zfill(2),fromYear,str(fromHour).zfill(2))
-        end_date   = "%s.%s.%s %s:00:00" % (str(toDay).zfill(2),  str(toMonth).zfill(2),  toYear,  str(fromHour).zfill(2))
+        start_date = datetime(fromYear, fromMonth, fromDay, int(fromHour), 0, 0)
+        end_date   = datetime(toYear,   toMonth,   toDay,   int(fromHour), 0, 0)
 
         print_dbg(DEBUG, "DEBUG: start: %s" % (start_date))
         print_dbg(DEBUG, "DEBUG: end  : %s" % (end_date))
 
         if isgust:
             sql  = "SELECT timestamp, ten_min_wind_gust_direction, ten_min_wind_gust_speed "
-            sql += "from vantage_wxdata "
-            sql += "where timestamp BETWEEN '%s' and '%s' "  % (start_date, end_date)
-            sql += "order by timestamp asc"
-
         else:
             sql  = "SELECT timestamp, present_wind_direction, present_wind_speed "
-            sql += "from vantage_wxdata "
-            sql += "where timestamp BETWEEN '%s' and '%s' "  % (start_date, end_date)
+
+        sql += "from vantage_wxdata "
+        if has_epoch(con):
+            sql += "where epoch BETWEEN ? and ? "
+            sql += "order by epoch asc"
+            params = [int(x) for x in to_epoch([start_date, end_date])]
+        else:
+            # not migrated, compare the timestamp strings
+            sql += "where timestamp BETWEEN ? and ? "
             sql += "order by timestamp asc"
-            #sql += " limit 6"
+            params = [d.strftime('%d.%m.%Y %H:%M:%S') for d in (start_date, end_date)]
 
         #table = pd.read_sql_query(sql, con)
-        table = pd.read_sql(sql, con, index_col=None)
+        table = pd.read_sql(sql, con, index_col=None, params=params)
 
         print_dbg(TRACE, "=== start of db records ===")
         print_dbg(TRACE, table.head(2))
@@ -276,6 +349,55 @@ def read_wx_db(dbfile,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear,i
 
     return
 
+
+def read_wr_hist(dbfile,start_date,end_date,isgust=False):
+    """ windrose histogram from the db, binned by sqlite
+        returns counts [speed class, sector] of start_date <= t < end_date
+    """
+    if isgust:
+        dcol, scol = 'ten_min_wind_gust_direction', 'ten_min_wind_gust_speed'
+    else:
+        dcol, scol = 'present_wind_direction', 'present_wind_speed'
+
+    # sector 0 is centered on north
+    width  = 360.0 / WR_NSECTOR
+    sector = "CAST((%s + %r) / %r AS INTEGER) %% %d" % (dcol, width / 2, width, WR_NSECTOR)
+    speed  = "CASE " + " ".join("WHEN %s >= %r THEN %d" % (scol, b, i)
+                                for i, b in reversed(list(enumerate(WR_BINS)))) + " ELSE 0 END"
+
+    con = None
+    try:
+        con = db.connect(dbfile)
+
+        # not migrated: parse every timestamp, no index
+        epoch = 'epoch' if has_epoch(con) else SQL_EPOCH
+
+        sql  = "SELECT %s AS sector, %s AS class, count(*) " % (sector, speed)
+        sql += "from vantage_wxdata "
+        sql += "where %s >= ? and %s < ? " % (epoch, epoch)
+        sql += "and %s IS NOT NULL and %s IS NOT NULL " % (dcol, scol)
+        sql += "group by sector, class"
+
+        print_dbg(DEBUG, "DEBUG: %s" % sql)
+
+        table = np.zeros((len(WR_BINS), WR_NSECTOR), dtype=np.int64)
+        for sec, cls, n in con.execute(sql, [int(x) for x in to_epoch([start_date, end_date])]):
+            table[cls, sec] = n
+
+        print_dbg(TRACE, table)
+
+        return table
+
+    except db.Error as e:
+        print_dbg(True, "Error %s:" % e.args[0])
+        sys.exit(1)
+
+    finally:
+        if con:
+            con.close()
+
+    return
+
 #-------------------------------------------------------------------------------
 # plot functions
 
@@ -380,6 +502,55 @@ def mk_windrose(prefix,plotBar=False):
     return
 
 
+def mk_windrose_hist(prefix,table,label):
+    """ stacked windrose in percent from a histogram [speed class, sector]
+    """
+    if (prefix == "current"):
+        typ = 'Present wind'
+    else:
+        typ = 'Wind gust'
+
+    total = table.sum()
+    print_dbg(True, "plotting Wind distribution %s %s from %d data points" % (prefix, label, total))
+    if total == 0:
+        print_dbg(True, "WARN : no wind data for %s" % label)
+        return
+
+    table = table * 100.0 / total
+
+    fig = plt.figure(figsize=(8, 8), dpi=80, facecolor='w', edgecolor='w')
+    ax  = fig.add_axes([0.1, 0.1, 0.8, 0.8], projection='polar', facecolor='w')
+    ax.set_theta_zero_location('N')
+    ax.set_theta_direction(-1)
+    ax.set_xticks(np.radians(arange(0, 360, 45)))
+    ax.set_xticklabels(['N', 'N-E', 'E', 'S-E', 'S', 'S-W', 'W', 'N-W'])
+
+    angles = np.radians(arange(WR_NSECTOR) * 360.0 / WR_NSECTOR)
+    width  = 0.8 * 2 * np.pi / WR_NSECTOR
+    colors = cm.jet(np.linspace(0, 1, len(WR_BINS)))
+    edges  = WR_BINS[1:] + [np.inf]
+    offset = np.zeros(WR_NSECTOR)
+    for i in range(len(WR_BINS)):
+        ax.bar(angles, table[i], width=width, bottom=offset, color=colors[i], edgecolor='white',
+               label='[%.1f : %0.1f)' % (WR_BINS[i], edges[i]))
+        offset += table[i]
+
+    set_legend(ax)
+    img_name = TMPPATH + 'wr_' + prefix + '_' + label + '_1_stacked.png'
+
+    plt.text(0.5, 1.1, typ + " distribution (%)\n\n", weight="bold", fontsize=12,
+            transform=plt.gca().transAxes, ha='center')
+    plt.text(0.5, 1.1, "Data from %s" % label, weight="light", fontsize=10,
+            transform=plt.gca().transAxes, ha='center')
+
+    fig.set_size_inches(5.5, 5.5, forward=True)
+    fig.savefig(img_name, dpi=80, bbox_inches="tight", pad_inches=0.1)
+    plt.close(fig)
+    uploadPNG(img_name)
+
+    return
+
+
 def uploadPNG(png):
     """ copies the png file to the website
     """
@@ -401,11 +572,71 @@ def uploadPNG(png):
 
 #-------------------------------------------------------------------------------
 
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-y yyyy[-yyyy]] [--migrate-db]\n\n"
+    msg += "\t\t-y --year    :\t yearly or multi-year windrose from the sqlite db\n"
+    msg += "\t\t--migrate-db :\t add the indexed epoch column to the sqlite db, run once\n"
+    msg += "\n"
+    msg += "\twithout options the windrose of the last %d days is plotted\n" % NBDAYS
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+
+def main_years(years):
+    """ windrose of whole years, binned by the db
+    """
+    errStat = 0
+
+    try:
+        y = [int(x) for x in years.split('-')]
+        fromYear, toYear = y[0], y[-1]
+    except ValueError:
+        print_dbg(True, "ERROR: year expected, got '%s'" % years)
+        usage()
+
+    label = str(fromYear) if fromYear == toYear else "%s-%s" % (fromYear, toYear)
+    start = datetime(fromYear, 1, 1)
+    end   = datetime(toYear + 1, 1, 1)
+
+    try:
+        mk_windrose_hist("current", read_wr_hist(dbfile, start, end), label)
+        mk_windrose_hist("gust", read_wr_hist(dbfile, start, end, True), label)
+
+    except Exception as e:
+        print_dbg(True, 'ERROR: run with exception(s): %s.' % e)
+        errStat = 1
+
+    if(errStat == 0):
+        print_dbg(True, 'INFO: Done.')
+
+
 def main():
     errStat = 0
     global wd
     global ws
 
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hy:", ["help", "year=", "migrate-db"])
+    except getopt.GetoptError as err:
+        print_dbg(True, "ERROR: %s" % err)
+        usage()
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-y", "--year"):
+            main_years(a)
+            return
+        elif o == "--migrate-db":
+            migrate_db(dbfile)
+            return
+        else:
+            assert False, "unhandled option"
+
     d2 = datetime.now()
     d1 = d2 + timedelta(days = -1 * NBDAYS)
 
@@ -420,7 +651,10 @@ def main():
     fromHour  = d1.hour
 
     try:
-        if USE_CSV:
+        if USE_CSV and USE_ARCHIVE:
+            wx = read_wx_archive(fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear)
+            wr = wx
+        elif USE_CSV:
             prepareCSVData(fromMonth,fromYear)
             wr = read_wx_csv(tmpwrdata,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear)
         else:
@@ -432,7 +666,9 @@ def main():
         print_dbg(DEBUG, "DEBUG: Nb of Data points: %s/%s" % (len(wd),len(ws)))
         mk_windrose("current")
 
-        if USE_CSV:
+        if USE_CSV and USE_ARCHIVE:
+            wr = wx
+        elif USE_CSV:
             wr = read_wx_csv(tmpwrdata,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear,True)
         else:
             wr = read_wx_db(dbfile,fromDay,fromMonth,fromYear,fromHour,toDay,toMonth,toYear,True)
@@ -36,6 +36,7 @@ from datetime import datetime, date
 import re, time
 #from config import CSVPATH, HOMEPATH, INTFILE, MINMAXFILE, TEMPERATUREFILE, read_txtfile
 from config import CSVPATH, INTFILE, MINMAXFILE, TEMPERATUREFILE, read_txtfile
+from csvindex import update_index
 #import Adafruit_DHT
 
 #CSVOUT = CSVPATH + 'internal.csv'
@@ -82,6 +83,8 @@ def save2CSV(csv,atTime,IntVal):
         fout.write(new_rec)
         fout.close()
 
+        update_index(csv)
+
     except Exception as e:
         print('Exception occured in function save2CSV. Check your code: %s' % e)
 
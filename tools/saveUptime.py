@@ -29,6 +29,7 @@ sys.path.append(CONFIG_HOME)
 from datetime import timedelta, datetime, date
 from time import time
 from config import CSVPATH
+from csvindex import update_index
 
 UPTIMEFILE  = CSVPATH + 'uptime.csv'
 
@@ -42,6 +43,8 @@ def save2CSV(csv,atTime,upTime):
         fout.write(new_rec)
         fout.close()
 
+        update_index(csv)
+
     except Exception as e:
         print('Exception occured in function save2CSV. Check your code: %s' % e)
 
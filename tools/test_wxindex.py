@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+#-------------------------------------------------------------------------------
+# Name:        test_wxindex.py
+# Purpose:     check wxindex.py against the scalar formulas of weather-tool.py
+#
+#   Every vectorized function is compared with the scalar one of
+#   weather-tool.py, element by element, on random readings and at the
+#   edges of the formulas (heat index limit, humidity limits, 0°C), in
+#   celsius and fahrenheit.
+#
+# usage:       python -m pytest tools/test_wxindex.py
+#
+# depends on:  numpy, pytest
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+
+import importlib.util
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+TOOLSDIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, TOOLSDIR)
+
+import wxindex
+
+# weather-tool.py cannot be imported by name
+spec = importlib.util.spec_from_file_location('weather_tool', os.path.join(TOOLSDIR, 'weather-tool.py'))
+wt = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(wt)
+
+# random readings per test
+N = 2000
+
+rng = np.random.default_rng(1014)
+
+#-------------------------------------------------------------------------------
+
+def scalar(func, *args):
+    """ the scalar function applied to every element
+    """
+    return np.array([func(*a) for a in zip(*[np.asarray(x).tolist() for x in args])])
+
+
+def check(vfunc, sfunc, *args):
+    np.testing.assert_allclose(vfunc(*args), scalar(sfunc, *args), rtol=1e-12, atol=1e-9)
+
+
+def readings(celsius):
+    """ random temperature, humidity, wind (km/h or mph) and dewpoint
+        plus the edges of the formulas
+    """
+    if celsius:
+        temp  = np.r_[rng.uniform(-40, 45, N), [-0.1, 0.0, 0.1, 23.9, 24.0, 24.1]]
+    else:
+        temp  = np.r_[rng.uniform(-40, 113, N), [31.9, 32.0, 32.1, 74.9, 75.0, 75.1]]
+    n = len(temp)
+
+    rhum  = rng.uniform(-5, 105, n)
+    rhum[-6:] = [0.0, 1.0, 50.0, 100.0, 101.0, 99.9]
+    wind  = rng.uniform(0, 120, n)
+    wind[-6:] = [0.0, 0.1, 4.8, 10.0, 50.0, 120.0]
+    dewp  = temp - rng.uniform(-2, 30, n)
+    dewp[-6:] = temp[-6:]
+
+    return temp, rhum, wind, dewp
+
+#-------------------------------------------------------------------------------
+# base formulas
+
+@pytest.mark.parametrize('celsius', [True, False])
+def test_base_formulas(celsius):
+    temp, rhum, wind, dewp = readings(celsius)
+
+    check(wxindex.c_to_f, wt.c_to_f, temp)
+    check(wxindex.f_to_c, wt.f_to_c, temp)
+    check(wxindex.rh_limit, wt.rh_limit, rhum)
+    check(wxindex.THW_f, wt.THW_f, temp, rhum, wind)
+    check(wxindex.SSI_f, wt.SSI_f, temp, rhum)
+
+
+def test_celsius_formulas():
+    temp, rhum, wind, dewp = readings(True)
+
+    check(wxindex.heat_c, wt.heat_c, temp, rhum)
+    check(wxindex.humidex, wt.humidex, temp, rhum)
+    check(wxindex.dewpoint_c, wt.dewpoint_c, temp, rhum)
+    check(wxindex.dewpoint_magnus, wt.dewpoint_magnus, temp, rhum)
+    check(wxindex.windchill_c, wt.windchill_c, temp, wind)
+    check(wxindex.humidity_c, wt.humidity_c, temp, dewp)
+    check(wxindex.humidity_eq_c, wt.humidity_eq_c, temp, dewp)
+
+
+def test_fahrenheit_formulas():
+    temp, rhum, wind, dewp = readings(False)
+
+    check(wxindex.heat_f, wt.heat_f, temp, rhum)
+    check(wxindex.windchill_f, wt.windchill_f, temp, wind)
+
+#-------------------------------------------------------------------------------
+# calc_* interface
+
+@pytest.mark.parametrize('celsius', [True, False])
+def test_calc(celsius):
+    temp, rhum, wind, dewp = readings(celsius)
+
+    def unit(f):
+        return lambda *a: f(*a, CELSIUS=celsius)
+
+    check(unit(wxindex.calc_THW), unit(wt.calc_THW), temp, rhum, wind)
+    check(unit(wxindex.calc_humidex), unit(wt.calc_humidex), temp, rhum)
+    check(unit(wxindex.calc_dewpoint), unit(wt.calc_dewpoint), temp, rhum)
+    check(unit(wxindex.calc_windchill), unit(wt.calc_windchill), temp, wind)
+    check(unit(wxindex.calc_humidity), unit(wt.calc_humidity), temp, dewp)
+    check(unit(wxindex.calc_heatindex), unit(wt.calc_heatindex), temp, rhum)
+    check(unit(wxindex.calc_SSI), unit(wt.calc_SSI), temp, rhum)
+
+
+@pytest.mark.parametrize('celsius', [True, False])
+def test_feels_like(celsius):
+    """ windchill when cold and windy, heat index when hot, built from the scalar formulas
+    """
+    temp, rhum, wind, dewp = readings(celsius)
+
+    def feels_like(t, rh, v):
+        tc = t if celsius else wt.f_to_c(t)
+        if tc <= wxindex.FEELS_WC_TEMP and v > wxindex.FEELS_WC_WIND:
+            fl = wt.windchill_c(tc, v)
+        elif tc >= wxindex.FEELS_HI_TEMP:
+            fl = wt.heat_c(tc, rh)
+        else:
+            fl = tc
+        return fl if celsius else wt.c_to_f(fl)
+
+    check(lambda *a: wxindex.calc_feels_like(*a, CELSIUS=celsius), feels_like, temp, rhum, wind)
+
+#-------------------------------------------------------------------------------
+# csv batch mode
+
+def test_batch_missing_values():
+    """ empty, invalid and missing cells give nan, the other rows are calculated
+    """
+    fin  = io.StringIO('temp,rhum,wind\n30,,10\n30,50,x\n25,60,5\n20,70\n')
+    fout = io.StringIO()
+    wxindex.batch(fin, fout, ['heatindex', 'thw'])
+
+    lines = fout.getvalue().splitlines()
+    assert lines[0] == 'temp,rhum,wind,heatindex,thw'
+    assert lines[1] == '30,,10,nan,nan'
+    assert lines[2] == '30,50,x,%s,nan' % (wxindex.FLOAT_FORMAT % wt.calc_heatindex(30, 50))
+    assert lines[3] == '25,60,5,%s,%s' % (wxindex.FLOAT_FORMAT % wt.calc_heatindex(25, 60),
+                                          wxindex.FLOAT_FORMAT % wt.calc_THW(25, 60, 5))
+    assert lines[4] == '20,70,%s,nan' % (wxindex.FLOAT_FORMAT % wt.calc_heatindex(20, 70))
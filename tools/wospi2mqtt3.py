@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 #
-# triggers mqtt publish after four updates to the wxdata.xml
+# publishes wxdata.xml to mqtt once the updates have settled, only changed topics
 # New Version with Category JSON & HA-friendly keys
 #
 # Created:     18.08.2018
@@ -16,6 +16,7 @@
 
 import time
 import os
+import asyncio
 from xml.etree import ElementTree as ET
 import paho.mqtt.client as mqtt
 import json
@@ -31,6 +32,9 @@ WXIN      = os.environ.get('WXIN', '/var/tmp/wxdata.xml')
 MQTT_HOST = os.environ.get('MQTT_HOST', '192.168.20.74')
 MQTT_PORT = int(os.environ.get('MQTT_PORT', '1883'))
 MQTT_BASE = os.environ.get('MQTT_TOPIC_BASE', 'athome/eg/wospi')
+# events within SETTLE seconds are parsed once, but not later than MAX_WAIT after the first
+MQTT_SETTLE   = float(os.environ.get('MQTT_SETTLE', '1.0'))
+MQTT_MAX_WAIT = float(os.environ.get('MQTT_MAX_WAIT', '5.0'))
 
 # Category topics
 TOPIC_OUTDOOR  = f"{MQTT_BASE}/outdoor"
@@ -58,8 +62,6 @@ def parse_xml(path):
         print_dbg(INFO, f"WARN File does not exist: {path}")
         return {}
 
-    time.sleep(0.2)  # avoid file-write race condition
-
     try:
         tree = ET.parse(path)
         root = tree.getroot()
@@ -121,20 +123,73 @@ def build_category_payloads(wx):
     return outdoor, indoor, rain, pressure, system
 
 
-def publish_categories(client, wx):
-    """Publish all five category JSON documents + master JSON."""
+def publish_categories(client, wx, last=None):
+    """Publish the five category JSON documents + master JSON.
+    With last (topic -> previous payload) only changed topics are published."""
 
     outdoor, indoor, rain, pressure, system = build_category_payloads(wx)
 
-    client.publish(TOPIC_OUTDOOR,  json.dumps(outdoor),  MQTT_QOS)
-    client.publish(TOPIC_INDOOR,   json.dumps(indoor),   MQTT_QOS)
-    client.publish(TOPIC_RAIN,     json.dumps(rain),     MQTT_QOS)
-    client.publish(TOPIC_PRESSURE, json.dumps(pressure), MQTT_QOS)
-    client.publish(TOPIC_SYSTEM,   json.dumps(system),   MQTT_QOS)
+    payloads = [
+        (TOPIC_OUTDOOR,  json.dumps(outdoor)),
+        (TOPIC_INDOOR,   json.dumps(indoor)),
+        (TOPIC_RAIN,     json.dumps(rain)),
+        (TOPIC_PRESSURE, json.dumps(pressure)),
+        (TOPIC_SYSTEM,   json.dumps(system)),
+        # master JSON (raw XML tags + HA names)
+        (TOPIC_ALL,      json.dumps(wx)),
+    ]
+
+    published = 0
+    for topic, payload in payloads:
+        if last is not None and last.get(topic) == payload:
+            continue
+        client.publish(topic, payload, MQTT_QOS)
+        if last is not None:
+            last[topic] = payload
+        published += 1
+
+    print_dbg(DEBUG, f"Published {published} of {len(payloads)} topics to MQTT")
+    return published
+
+
+class Publisher:
+    """Debounce file events on the asyncio loop, parse once per burst."""
+
+    def __init__(self, loop, client, path):
+        self.loop = loop
+        self.client = client
+        self.path = path
+        self.timer = None
+        self.first = None
+        self.events = 0
+        self.last = {}
+
+    def touch(self):
+        """Called for every file event, (re)starts the settle window"""
+        now = self.loop.time()
+        if self.first is None:
+            self.first = now
+        self.events += 1
+
+        if self.timer:
+            self.timer.cancel()
+        delay = min(MQTT_SETTLE, max(0.0, self.first + MQTT_MAX_WAIT - now))
+        self.timer = self.loop.call_later(delay, self.flush)
+
+    def flush(self):
+        """Parse the file and publish the changed topics"""
+        print_dbg(DEBUG, f"Parsing {self.path} after {self.events} event(s)")
+        self.timer = None
+        self.first = None
+        self.events = 0
+
+        wx = parse_xml(self.path)
+        if wx:
+            publish_categories(self.client, wx, self.last)
 
-    # Publish master JSON (raw XML tags + HA names)
-    client.publish(TOPIC_ALL, json.dumps(wx), MQTT_QOS)
-    print_dbg(DEBUG, "Published updated weather data to MQTT")
+    def reset(self):
+        """Publish everything with the next update (e.g. after reconnect)"""
+        self.last.clear()
 
 
 def on_connect(client, userdata, flags, rc):
@@ -142,6 +197,10 @@ def on_connect(client, userdata, flags, rc):
     Connected = True
     print_dbg(INFO, f"Connected to MQTT with result code {rc}")
 
+    # runs in the paho thread; the broker may have lost everything
+    if userdata is not None:
+        userdata.loop.call_soon_threadsafe(userdata.reset)
+
 
 def on_disconnect(client, userdata, rc):
     global Connected
@@ -181,12 +240,11 @@ def smart_add_watch(wm, path, mask, rec=False):
 
 
 class Handler(pyinotify.ProcessEvent):
-    def __init__(self, wm, path, mask, client):
+    def __init__(self, wm, path, mask, publisher):
         self.wm = wm
         self.path = path
         self.mask = mask
-        self.client = client
-        self.delayCounter = 0
+        self.publisher = publisher
         self.watches = {}
         super().__init__()
 
@@ -199,28 +257,17 @@ class Handler(pyinotify.ProcessEvent):
                 if 'file' not in self.watches or not self.watches['file']:
                     self.watches['file'] = self.wm.add_watch(self.path, self.mask, rec=False)
                     print_dbg(INFO, f"Added file watch: {self.path}")
-                    
-                    # Publish initial data from the new file
-                    wx = parse_xml(self.path)
-                    if wx:
-                        publish_categories(self.client, wx)
-                        print_dbg(INFO, "Published initial data from newly created file")
             except Exception as e:
                 print_dbg(INFO, f"Error adding file watch: {e}")
 
+            # Publish data from the new file once it has settled
+            self.publisher.touch()
+
     def process_IN_CLOSE_WRITE(self, event):
         """Handle file write completion"""
         if event.pathname == self.path:
-            self.delayCounter += 1
-            print_dbg(INFO, f"File modified: {event.pathname} (count: {self.delayCounter})")
-            
-            # Only process every 2nd update (like the old version)
-            if self.delayCounter >= 2:
-                wx = parse_xml(self.path)
-                if wx:
-                    publish_categories(self.client, wx)
-                    print_dbg(DEBUG, f"Published weather data (update #{self.delayCounter})")
-                self.delayCounter = 0
+            print_dbg(DEBUG, f"File modified: {event.pathname}")
+            self.publisher.touch()
 
 
 def main():
@@ -238,8 +285,13 @@ def main():
     else:
         print_dbg(INFO, "Input file does not exist at startup - waiting for it to be created")
     
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
     # Initialize MQTT client
     mqttc = mqtt.Client()
+    publisher = Publisher(loop, mqttc, WXIN)
+    mqttc.user_data_set(publisher)
     mqttc.on_connect = on_connect
     mqttc.on_disconnect = on_disconnect
 
@@ -268,27 +320,24 @@ def main():
     mask = pyinotify.IN_CLOSE_WRITE | pyinotify.IN_CREATE
     
     # Create handler
-    handler = Handler(wm=wm, path=WXIN, mask=pyinotify.IN_CLOSE_WRITE, client=mqttc)
+    handler = Handler(wm=wm, path=WXIN, mask=pyinotify.IN_CLOSE_WRITE, publisher=publisher)
     
     # Setup watches using smart_add_watch
     wdd = smart_add_watch(wm, WXIN, pyinotify.IN_CLOSE_WRITE, rec=False)
     handler.watches = wdd  # Store watches in handler
     
-    # Create notifier
-    notifier = pyinotify.Notifier(wm, handler)
+    # Create notifier, inotify events are read by the asyncio loop
+    notifier = pyinotify.AsyncioNotifier(wm, loop, default_proc_fun=handler)
     
     # If file exists at startup, publish initial data
     if os.path.exists(WXIN):
-        wx = parse_xml(WXIN)
-        if wx:
-            publish_categories(mqttc, wx)
-            print_dbg(INFO, "Published initial weather data")
+        publisher.flush()
+        print_dbg(INFO, "Published initial weather data")
     
     print_dbg(INFO, "Monitoring for changes...")
     
     try:
-        # Use the standard notifier loop - this is the key change
-        notifier.loop()
+        loop.run_forever()
         
     except KeyboardInterrupt:
         print_dbg(INFO, "Shutting down by user request...")
@@ -296,6 +345,8 @@ def main():
         print_dbg(INFO, f"Error in notifier loop: {e}")
     finally:
         print_dbg(INFO, "Cleaning up...")
+        notifier.stop()
+        loop.close()
         mqttc.disconnect()
         mqttc.loop_stop()
 
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+#-------------------------------------------------------------------------------
+# Name:        wxindex.py
+# Purpose:     vectorized versions of the weather-tool.py indices
+#
+#   The formulas are the same as in weather-tool.py, but take numpy arrays
+#   (or anything array-like) and return arrays, so a derived series can be
+#   calculated over a whole archive in one call, e.g.
+#
+#     from wxarchive import load_wx
+#     from wxindex import calc_feels_like
+#     df = load_wx(start, end, ['outside_air_temp','outside_rel_hum','present_wind_speed'])
+#     fl = calc_feels_like(df.outside_air_temp, df.outside_rel_hum, df.present_wind_speed*3.6)
+#
+#   Called as a program it reads a csv file and writes the results as csv.
+#
+# usage:       wxindex.py -r <type>[,<type>...] [-i infile] [-o outfile] [-x] [-u c|f]
+#
+# depends on:  numpy
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+
+import getopt
+import sys
+import csv
+
+import numpy as np
+
+
+# C is default unit
+CELSIUS = True
+
+# DEBUG
+DEBUG=False
+
+# input columns of a csv file with header, same as the weather-tool.py options
+COL_TEMP  = 'temp'
+COL_RHUM  = 'rhum'
+COL_DEWP  = 'dewpoint'
+COL_WIND  = 'wind'
+
+# columns of YYYY-MM-wxdata.csv (-x), see wxarchive.WX_COLUMNS
+WX_TEMP  = 1
+WX_RHUM  = 2
+WX_DEWP  = 3
+WX_WIND  = 6
+
+# wind speed of the wxdata.csv is in m/s, the formulas expect km/h
+MS2KMH = 3.6
+
+# feels like: windchill below, heat index above
+FEELS_WC_TEMP = 10.0
+FEELS_WC_WIND = 4.8
+FEELS_HI_TEMP = 27.0
+
+# output format
+FLOAT_FORMAT = '%.1f'
+
+#----------------------------------------------------------------------
+# functions
+#----------------------------------------------------------------------
+
+def _arr(x):
+    """ array-like to float array
+    """
+    return np.asarray(x, dtype=np.float64)
+
+def _cell(row, i):
+    """ float of a csv cell, NaN if it is empty, missing or not a number
+    """
+    try:
+        return float(row[i])
+    except (IndexError, ValueError):
+        return np.nan
+
+def _col(rows, i):
+    """ float array of csv column i
+    """
+    return _arr([_cell(r, i) for r in rows])
+
+def c_to_f(to_f):
+    """ celsius to fahrenheit conversion
+    """
+    return _arr(to_f) * 9.0/5.0 + 32.0
+
+def f_to_c(to_c):
+    """ fahrenheit to celsius conversion
+    """
+    return (_arr(to_c) - 32.0) * 5.0/9.0
+
+def c2kelvin(T):
+    """ convert temperatur to Kelvin
+    """
+    return _arr(T) + 273.15
+
+def ln(n):
+    """ natural logarithm, log(0) replaced like in weather-tool.py
+    """
+    n = _arr(n)
+    return np.log(np.where(n == 0, 0.000000001, n))
+
+def rh_limit(rh):
+    """ limit relative humidity
+        to valid borders
+    """
+    return np.clip(_arr(rh), 1, 100)
+
+#----------------------------------------------------------------------
+
+def heat_c(h_tf,h_rh):
+    """ calculate heatindex for celsius deg
+    """
+    h_tf = _arr(h_tf)
+    h_rh = rh_limit(h_rh)
+
+    hi = (-8.784695 + 1.61139411 * h_tf
+          + 2.338549 * h_rh
+          - 0.14611605 * h_tf * h_rh
+          - (1.2308094 * 10**(-2)) * (h_tf**(2))
+          - (1.6424828 * 10**(-2)) * (h_rh**(2))
+          + (2.211732 * 10**(-3)) * (h_tf**(2)) * h_rh
+          + (7.2546 * 10**(-4)) * h_tf * (h_rh**(2))
+          - (3.582 * 10**(-6)) * (h_tf**(2.0)) * (h_rh**(2.0)))
+
+    return np.where(h_tf >= 24, hi, h_tf)
+
+
+def heat_f(h_tf,h_rh):
+    """ calculate heatindex for fahrenheit deg
+    """
+    h_tf = _arr(h_tf)
+    h_rh = rh_limit(h_rh)
+
+    hi = (-42.379 + 2.04901523 * h_tf
+          + 10.14333127 * h_rh
+          - 0.22475541 * h_tf * h_rh
+          - (6.83783 * 10**(-3)) * (h_tf**(2))
+          - (5.481717 * 10**(-2)) * (h_rh**(2))
+          + (1.22874 * 10**(-3)) * (h_tf**(2)) * h_rh
+          + (8.5282 * 10**(-4)) * h_tf * (h_rh**(2))
+          - (1.99 * 10**(-6)) * (h_tf**(2)) * (h_rh**(2)))
+
+    return np.where(h_tf >= 75, hi, h_tf)
+
+
+def humidex(tair,rhum):
+    """ calculates the Humidex
+        http://www.csgnetwork.com/canhumidexcalc.html
+    """
+    tair = _arr(tair)
+    rhum = rh_limit(rhum)
+
+    t_kelvin = c2kelvin(tair)
+    y = (-2937.4/t_kelvin)-4.9283 * np.log(t_kelvin)/np.log(10) + 23.5471
+    eTs = 10**y
+    eTd = eTs * rhum/100.0
+
+    hidx = (tair + (eTd - 10) * 5.0/9.0)
+
+    return np.maximum(hidx, tair)
+
+
+def THW_f(tair,rhum,wind):
+    """ calc the temp/hum/wind index
+        HI ... in F
+        W  ... in miles/h
+    """
+    return heat_f(tair,rhum) - 1.072 * _arr(wind)
+
+
+def dewpoint_c(tair,rhum):
+    """ dewpoint calculated
+        by Davis Vantage weather stations
+    """
+    tair = _arr(tair)
+    rhum = rh_limit(rhum)
+
+    K1 = 6.112
+    K2 = 17.62
+    K3 = 243.12
+
+    y = K2*tair/(tair + K3)
+
+    vp     = rhum * 0.01 * K1*np.exp(y)
+    lnvp   = ln(vp)
+
+    return (K3*lnvp - 440.1)/(19.43 - lnvp)
+
+
+def dewpoint_magnus(tair,rhum):
+    """ dewpoint calculated
+        based by Magnus-Equation
+        http://www.schweizer-fn.de/lueftung/feuchte/feuchte.php
+    """
+    tair = _arr(tair)
+    rhum = rh_limit(rhum)
+
+    above = tair > 0.0
+    c2 = np.where(above, 17.08085, 17.84362)
+    c3 = np.where(above, 234.175, 245.425)
+
+    y    = c2*tair/(c3 + tair)
+    lnrh = ln(rhum/100)
+
+    return (c3*(lnrh + y)/(c2 - lnrh - y))
+
+
+def windchill_c(T,V):
+    """ windchill calculated
+        by Davis Vantage weather stations
+    """
+    T = _arr(T)
+    V = _arr(V)
+
+    K1 = 13.12
+    K2 = 0.6215
+    K3 = 11.37
+    K4 = 0.3965
+
+    vx = V**0.16
+
+    WCT = K1 + K2*T - K3*vx + K4*T*vx
+
+    # windchill temp cannot be higher than air temperature
+    return np.minimum(WCT, T)
+
+
+def windchill_f(T,V):
+    """ windchill calculated
+        by Davis Vantage weather stations
+    """
+    T = _arr(T)
+    V = _arr(V)
+
+    K1 = 35.74
+    K2 = 0.6215
+    K3 = 35.75
+    K4 = 0.4275
+
+    vx = V**0.16
+
+    return K1 + K2*T - K3*vx + K4*T*vx
+
+
+def humidity_c(T,TD):
+    """ humidity from temp. and dewpoint
+        http://www.wetterochs.de/wetter/feuchte.html
+    """
+    T  = _arr(T)
+    # Td cannot be higher then T
+    TD = np.minimum(_arr(TD), T)
+
+    a = np.where(T >= 0.0, 7.5, 7.6)
+    b = np.where(T >= 0.0, 237.3, 240.7)
+
+    vpt = 6.1078 * 10**((a*T)/(b+T))
+    vpd = 6.1078 * 10**((a*TD)/(b+TD))
+
+    return 100 * vpd / vpt
+
+
+def humidity_eq_c(T,TD):
+    """ humidity from temp. and dewpoint with different equation
+        http://www.theweatherprediction.com/habyhints/186/
+    """
+    T  = _arr(T)
+    TD = np.minimum(_arr(TD), T)
+
+    L = 2.453 * 10**6
+    R = 461.401
+
+    et  = L/R*(1/273 - 1/c2kelvin(T)) - np.log(6.11)
+    etd = L/R*(1/273 - 1/c2kelvin(TD)) - np.log(6.11)
+
+    return 100 * np.exp(etd) / np.exp(et)
+
+
+def SSI_f(tair,rhum):
+    """ Summer Simmer Index (fahrenheit)
+        http://myscope.net/hitzeindex-gefuehle-temperatur/
+    """
+    tair = _arr(tair)
+    rhum = rh_limit(rhum)
+
+    return 1.98 * (tair - (0.55 - 0.0055 * rhum) * (tair - 58)) - 56.83
+
+
+#----------------------------------------------------------------------
+# same interface as the calc_* functions of weather-tool.py
+
+def calc_THW(TAIR,RHUM,WIND,CELSIUS=True):
+    if CELSIUS:
+        return f_to_c(THW_f(c_to_f(TAIR),RHUM,WIND))
+    return THW_f(TAIR,RHUM,WIND)
+
+
+def calc_humidex(TAIR,RHUM,CELSIUS=True):
+    if CELSIUS:
+        return humidex(TAIR,RHUM)
+    return c_to_f(humidex(f_to_c(TAIR),RHUM))
+
+
+def calc_dewpoint(TAIR,RHUM,CELSIUS=True):
+    if CELSIUS:
+        return dewpoint_c(TAIR,RHUM)
+    return c_to_f(dewpoint_c(f_to_c(TAIR),RHUM))
+
+
+def calc_dewpoint_magnus(TAIR,RHUM,CELSIUS=True):
+    if CELSIUS:
+        return dewpoint_magnus(TAIR,RHUM)
+    return c_to_f(dewpoint_magnus(f_to_c(TAIR),RHUM))
+
+
+def calc_windchill(TAIR,WIND,CELSIUS=True):
+    if CELSIUS:
+        return windchill_c(TAIR,WIND)
+    return windchill_f(TAIR,WIND)
+
+
+def calc_humidity(TAIR,TDEWP,CELSIUS=True):
+    if CELSIUS:
+        return humidity_c(TAIR,TDEWP)
+    return c_to_f(humidity_c(f_to_c(TAIR),f_to_c(TDEWP)))
+
+
+def calc_heatindex(TAIR,RHUM,CELSIUS=True):
+    if CELSIUS:
+        return heat_c(TAIR,RHUM)
+    return heat_f(TAIR,RHUM)
+
+
+def calc_SSI(TAIR,RHUM,CELSIUS=True):
+    if CELSIUS:
+        return f_to_c(SSI_f(c_to_f(TAIR),RHUM))
+    return SSI_f(TAIR,RHUM)
+
+
+def calc_feels_like(TAIR,RHUM,WIND,CELSIUS=True):
+    """ apparent temperature: windchill when cold and windy,
+        heat index when hot, otherwise the air temperature
+        WIND in km/h
+    """
+    tc = _arr(TAIR) if CELSIUS else f_to_c(TAIR)
+    wind = _arr(WIND)
+
+    fl = np.where((tc <= FEELS_WC_TEMP) & (wind > FEELS_WC_WIND), windchill_c(tc,wind),
+         np.where(tc >= FEELS_HI_TEMP, heat_c(tc,RHUM), tc))
+
+    return fl if CELSIUS else c_to_f(fl)
+
+
+# result type -> (function, input columns)
+RESULTS = {
+    'heatindex' : (calc_heatindex,       (COL_TEMP, COL_RHUM)),
+    'humidex'   : (calc_humidex,         (COL_TEMP, COL_RHUM)),
+    'ssi'       : (calc_SSI,             (COL_TEMP, COL_RHUM)),
+    'thw'       : (calc_THW,             (COL_TEMP, COL_RHUM, COL_WIND)),
+    'dewpoint'  : (calc_dewpoint,        (COL_TEMP, COL_RHUM)),
+    'magnus'    : (calc_dewpoint_magnus, (COL_TEMP, COL_RHUM)),
+    'humidity'  : (calc_humidity,        (COL_TEMP, COL_DEWP)),
+    'windchill' : (calc_windchill,       (COL_TEMP, COL_WIND)),
+    'feelslike' : (calc_feels_like,      (COL_TEMP, COL_RHUM, COL_WIND)),
+}
+
+
+def calc(result, columns, CELSIUS=True):
+    """ calculate one result type from a dict of input columns
+    """
+    func, inputs = RESULTS[result]
+    missing = [c for c in inputs if c not in columns]
+    if missing:
+        raise KeyError("missing column(s) for '%s': %s" % (result, ', '.join(missing)))
+
+    return func(*[columns[c] for c in inputs], CELSIUS=CELSIUS)
+
+
+#----------------------------------------------------------------------
+# csv batch mode
+
+def read_csv(fin, wxdata=False):
+    """ read the input columns, empty or invalid cells are NaN
+        returns (header, rows, dict of float arrays)
+    """
+    reader = csv.reader(fin)
+
+    if wxdata:
+        header = None
+        rows = [r for r in reader if r]
+        columns = {
+            COL_TEMP : _col(rows, WX_TEMP),
+            COL_RHUM : _col(rows, WX_RHUM),
+            COL_DEWP : _col(rows, WX_DEWP),
+            COL_WIND : _col(rows, WX_WIND) * MS2KMH,
+        }
+    else:
+        header = next(reader)
+        rows = [r for r in reader if r]
+        columns = {}
+        for i, name in enumerate(header):
+            if name in (COL_TEMP, COL_RHUM, COL_DEWP, COL_WIND):
+                columns[name] = _col(rows, i)
+
+    return header, rows, columns
+
+
+def batch(fin, fout, results, wxdata=False, CELSIUS=True):
+    """ csv in, csv out
+        the result columns are appended to the input rows,
+        for wxdata.csv only the timestamp and the results are written
+    """
+    header, rows, columns = read_csv(fin, wxdata)
+
+    values = [calc(r, columns, CELSIUS) for r in results]
+
+    writer = csv.writer(fout, lineterminator='\n')
+    if wxdata:
+        writer.writerow(['timestamp'] + results)
+        rows = [[r[0]] for r in rows]
+    else:
+        writer.writerow(header + results)
+
+    fmt = [np.char.mod(FLOAT_FORMAT, v) for v in values]
+    for i, row in enumerate(rows):
+        writer.writerow(row + [f[i] for f in fmt])
+
+    if DEBUG:
+        print("%d records, %s" % (len(rows), ','.join(results)), file=sys.stderr)
+
+    return len(rows)
+
+
+def usage(EL=10):
+    """ usage for this program
+    """
+    print(" select result type(s), comma separated")
+    print("  -r (result) {type}     ... result of calculation")
+    print("        %s\n" % ', '.join(RESULTS))
+
+    print(" input/output")
+    print("  -i (input)  {file}     ... csv with header '%s,%s,%s,%s' (default stdin)" % (COL_TEMP, COL_RHUM, COL_DEWP, COL_WIND))
+    print("  -o (output) {file}     ... result csv (default stdout)")
+    print("  -x (wxdata)            ... input is a YYYY-MM-wxdata.csv\n")
+
+    print("  -u (unit) {c|f}        ... [c]elsius (is default) or [f]ahrenheit")
+    print("  -h (help)              ... this help screen\n")
+
+    sys.exit(EL)
+    return
+
+
+#----------------------------------------------------------------------
+# main
+#----------------------------------------------------------------------
+def main():
+    """ main program.  Evaluate commandline
+    """
+    results = []
+    infile  = None
+    outfile = None
+    wxdata  = False
+    celsius = CELSIUS
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hr:i:o:xu:", ["help", "result=", "input=", "output=", "wxdata", "unit="])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-r", "--result"):
+            results = [r.strip().lower() for r in a.split(',') if r.strip()]
+        elif o in ("-i", "--input"):
+            infile = a
+        elif o in ("-o", "--output"):
+            outfile = a
+        elif o in ("-x", "--wxdata"):
+            wxdata = True
+        elif o in ("-u", "--unit"):
+            if a.lower() == "f":
+                celsius = False
+            elif a.lower() == "c":
+                celsius = True
+            else:
+                print("ERROR: invalid parameter '%s' for '-u'" % a)
+                usage()
+        else:
+            assert False, "unhandled option"
+
+    if not results:
+        print("ERROR: mandatory parameter '-r' is missing")
+        usage(12)
+
+    for r in results:
+        if r not in RESULTS:
+            print("ERROR: invalid parameter '%s' for '-r'" % r)
+            usage()
+
+    fin  = open(infile, newline='') if infile else sys.stdin
+    fout = open(outfile, 'w', newline='') if outfile else sys.stdout
+
+    try:
+        batch(fin, fout, results, wxdata, celsius)
+    except KeyError as err:
+        print("ERROR: %s" % err.args[0])
+        sys.exit(12)
+    finally:
+        if infile:
+            fin.close()
+        if outfile:
+            fout.close()
+
+
+if __name__ == "__main__":
+    main()
+
+#
+# END
+#
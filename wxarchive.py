@@ -0,0 +1,490 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        wxarchive.py
+# Purpose:     columnar binary archive of the monthly wxdata csv files
+#
+# Every closed month (YYYY-MM-wxdata.csv) is converted once into a directory
+#
+#   ARCHIVEPATH/YYYY-MM/
+#       timestamp.npy       int64,   seconds since epoch (local time, no TZ)
+#       <column>.npy        float32, one file per sensor column
+#       meta.json           rows and mtime of the source csv
+#
+# The column files are opened as memmap, so a script only reads the columns
+# and the rows it asks for. The current month stays csv, it is parsed
+# incrementally by wxingest.py (only lines appended since the last run).
+#
+# usage:
+#   from wxarchive import load_wx
+#   df = load_wx(start, end, ['outside_air_temp', 'UV_index'])
+#
+#   from wxarchive import read_wx_frame
+#   df = read_wx_frame(wxin, ['UV_index'])     ... one csv, compact dtypes
+#
+#   python wxarchive.py        ... convert all closed months (e.g. daily cron)
+#
+# Configuration options in config.py
+#   ARCHIVEPATH  ... optional, defaults to CSVPATH + 'archive/'
+#
+# depends on:  WOSPi, numpy, pandas
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import config
+import os, sys, shutil
+import getopt
+import json
+import time
+from datetime import datetime
+
+# from local module
+from wxtools import print_dbg, timed, lazy_module
+
+# numpy and panda for data structure, imported on first use
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+#-------------------------------------------------------------------------------
+
+ARCHIVEPATH = getattr(config, 'ARCHIVEPATH', config.CSVPATH + 'archive/')
+
+# column layout of YYYY-MM-wxdata.csv
+# 01.02.2016 00:05:19,3.9,90,2.2,1012.5,237,1.7,0.0,0,0.0,0.0,0.0,0.0,1.5,1.7,6.1,135
+WX_COLUMNS = [ 'timestamp',
+               'outside_air_temp',
+               'outside_rel_hum',
+               'outside_dew_point_temp',
+               'barometic_pressure',
+               'present_wind_direction',
+               'present_wind_speed',
+               'UV_index',
+               'solar_radiation',
+               'rain_rate',
+               'daily_rain',
+               'daily_ET',
+               'monthly_ET',
+               'ten_min_avg_wind_speed',
+               'two_min_avg_wind_speed',
+               'ten_min_wind_gust_speed',
+               'ten_min_wind_gust_direction' ]
+
+WX_TIMEFORMAT = '%d.%m.%Y %H:%M:%S'
+
+# compact dtypes of the sensor columns, enough for the station resolution
+# integer columns are read as float32 if a field is empty or broken
+WX_DTYPES = { 'outside_air_temp':            'float32',
+              'outside_rel_hum':             'uint8',
+              'outside_dew_point_temp':      'float32',
+              'barometic_pressure':          'float32',
+              'present_wind_direction':      'uint16',
+              'present_wind_speed':          'float32',
+              'UV_index':                    'float32',
+              'solar_radiation':             'uint16',
+              'rain_rate':                   'float32',
+              'daily_rain':                  'float32',
+              'daily_ET':                    'float32',
+              'monthly_ET':                  'float32',
+              'ten_min_avg_wind_speed':      'float32',
+              'two_min_avg_wind_speed':      'float32',
+              'ten_min_wind_gust_speed':     'float32',
+              'ten_min_wind_gust_direction': 'uint16' }
+
+# record used for months without any data
+DUMMY_TIME   = '00:06:30'
+DUMMY_RECORD = [0,0,0,1000.0,0,0.0,0.0,0,0.0,0.0,0.0,0.0,0.0,0.0,0.0,0]
+
+# float32 is exact enough for the station resolution, values are rounded
+# to this number of decimals when loaded, so results match the csv path
+ARCHIVE_DECIMALS = 4
+
+# read the current month through the incremental ingest journal (wxingest.py)
+USE_INGEST = True
+
+# time ranges within the last days are read from the ring buffer (wxring.py)
+USE_RING = getattr(config, 'USE_RING', True)
+
+# keep the months read in memory, for resident processes (wxsched.py)
+WX_CACHE = getattr(config, 'WX_CACHE', False)
+WX_CACHE_MONTHS = getattr(config, 'WX_CACHE_MONTHS', 36)
+
+_month_cache = {}
+
+DEBUG = False
+
+#-------------------------------------------------------------------------------
+# helper
+
+def csv_name(yymm):
+    """ monthly wxdata csv for 'YYYY-MM'
+    """
+    return config.CSVPATH + yymm + '-' + config.CSVFILESUFFIX
+
+
+def archive_dir(yymm):
+    """ archive directory for 'YYYY-MM'
+    """
+    return ARCHIVEPATH + yymm + '/'
+
+
+def month_range(start, end):
+    """ list of 'YYYY-MM' from start to end (both included)
+    """
+    months = []
+    y, m = start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        months.append('%d-%s' % (y, str(m).zfill(2)))
+        m += 1
+        if m > 12:
+            y, m = y + 1, 1
+    return months
+
+
+def is_closed(yymm):
+    """ month is finished and will not get new records
+    """
+    return yymm < time.strftime('%Y-%m')
+
+
+def to_epoch(values):
+    """ datetime, Timestamp or datetime64 array to int64 seconds
+    """
+    return np.asarray(values, dtype='datetime64[s]').astype(np.int64)
+
+
+def wx_columns(columns=None):
+    """ check requested sensor columns, keep the csv order
+    """
+    if columns is None:
+        return WX_COLUMNS[1:]
+
+    unknown = [c for c in columns if c not in WX_COLUMNS]
+    if unknown:
+        raise ValueError('unknown wxdata column(s): %s' % ', '.join(unknown))
+
+    return [c for c in WX_COLUMNS[1:] if c in columns]
+
+
+#-------------------------------------------------------------------------------
+# csv and archive
+
+def read_wx_frame(wxin, columns=None):
+    """ read a wxdata csv with the compact dtypes (WX_DTYPES)
+        columns ... sensor columns to load, None for all, the other
+                    columns are skipped by the parser (usecols)
+        returns a DataFrame with 'timestamp' (datetime64) and the columns
+        in csv order, lines with an invalid timestamp are dropped
+    """
+    columns = wx_columns(columns)
+    names   = ['timestamp'] + columns
+
+    try:
+        dtypes = dict((c, WX_DTYPES[c]) for c in columns)
+        dtypes['timestamp'] = str
+        data = pd.read_csv(wxin, header=None, names=WX_COLUMNS, usecols=names, dtype=dtypes,
+                           skipinitialspace=True, on_bad_lines='skip')
+
+    except (ValueError, OverflowError) as e:
+        # empty or broken field, parse it the slow way
+        print_dbg(DEBUG, 'DEBUG: compact read failed, using float32: %s' % e)
+        if hasattr(wxin, 'seek'):
+            wxin.seek(0)
+        data = pd.read_csv(wxin, header=None, names=WX_COLUMNS, usecols=names, dtype=str,
+                           skipinitialspace=True, on_bad_lines='skip')
+        for col in columns:
+            data[col] = pd.to_numeric(data[col], errors='coerce').astype(np.float32)
+
+    data['timestamp'] = pd.to_datetime(data['timestamp'], format=WX_TIMEFORMAT, errors='coerce')
+
+    return data.dropna(subset=['timestamp']).reset_index(drop=True)
+
+
+def wx_float(data, columns=None):
+    """ sensor columns of a compact frame as float64, rounded like load_wx
+    """
+    for col in wx_columns(columns):
+        if col in data.columns:
+            data[col] = np.round(data[col].values.astype(np.float64), ARCHIVE_DECIMALS)
+
+    return data
+
+
+def parse_csv(wxin):
+    """ read a wxdata csv into a dict of sorted numpy arrays
+    """
+    data = read_wx_frame(wxin)
+
+    epoch = to_epoch(data['timestamp'].values)
+    order = np.argsort(epoch, kind='stable')
+
+    block = {'timestamp': epoch[order]}
+    for col in WX_COLUMNS[1:]:
+        block[col] = data[col].values.astype(np.float32)[order]
+
+    return block
+
+
+def archive_month(yymm, force=False):
+    """ convert one closed month into the columnar archive
+        returns True if the archive is usable
+    """
+    wxin = csv_name(yymm)
+    adir = archive_dir(yymm)
+    meta = read_meta(yymm)
+
+    if not os.path.isfile(wxin):
+        return meta is not None
+
+    mtime = os.path.getmtime(wxin)
+    if meta is not None and not force and meta['mtime'] >= mtime:
+        return True
+
+    print_dbg(True, 'INFO : archiving %s' % yymm)
+    block = parse_csv(wxin)
+
+    # write into a temp dir first, a half written month is never visible
+    tmpdir = ARCHIVEPATH + '.' + yymm + '.tmp/'
+    if os.path.isdir(tmpdir):
+        shutil.rmtree(tmpdir)
+    os.makedirs(tmpdir)
+
+    for col, val in block.items():
+        np.save(tmpdir + col + '.npy', val)
+
+    with open(tmpdir + 'meta.json', 'w') as f:
+        json.dump({'rows': len(block['timestamp']), 'mtime': mtime}, f)
+
+    if os.path.isdir(adir):
+        shutil.rmtree(adir)
+    os.rename(tmpdir, adir)
+
+    return True
+
+
+def read_meta(yymm):
+    """ meta data of an archived month, None if not archived
+    """
+    try:
+        with open(archive_dir(yymm) + 'meta.json', 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def read_archive(yymm, columns):
+    """ memmap the requested columns of an archived month
+    """
+    adir  = archive_dir(yymm)
+    block = {'timestamp': np.load(adir + 'timestamp.npy', mmap_mode='r')}
+    for col in columns:
+        block[col] = np.load(adir + col + '.npy', mmap_mode='r')
+    return block
+
+
+def read_month(yymm, columns):
+    """ one month as dict of arrays, archive for closed months,
+        ingest journal or csv for the current month
+        returns None if there is no data for this month
+    """
+    if WX_CACHE:
+        return cached_month(yymm, columns)
+
+    return read_month_files(yymm, columns)
+
+
+def read_month_files(yymm, columns):
+    """ read_month without the cache
+    """
+    if is_closed(yymm):
+        try:
+            if archive_month(yymm):
+                return read_archive(yymm, columns)
+        except Exception as e:
+            print_dbg(True, 'WARN : archive %s not usable, using csv: %s' % (yymm, e))
+
+    if USE_INGEST and not is_closed(yymm):
+        try:
+            from wxingest import read_current, purge
+            purge()
+            return read_current(yymm, columns)
+        except Exception as e:
+            print_dbg(True, 'WARN : ingest %s failed, using csv: %s' % (yymm, e))
+
+    wxin = csv_name(yymm)
+    if os.path.isfile(wxin):
+        block = parse_csv(wxin)
+        return dict((k, block[k]) for k in ['timestamp'] + columns)
+
+    return None
+
+
+def cached_month(yymm, columns):
+    """ read_month from the memory cache, only columns not read before are loaded
+        a month is read again when its csv was changed
+    """
+    try:
+        st = os.stat(csv_name(yymm))
+        stamp = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        stamp = None
+
+    entry = _month_cache.pop(yymm, None)
+    if entry is None or entry['stamp'] != stamp:
+        entry = {'stamp': stamp, 'block': {}}
+
+    missing = [c for c in columns if c not in entry['block']]
+    if missing or not entry['block']:
+        block = read_month_files(yymm, missing)
+        if block is None:
+            return None
+        # copy out of the memmaps, the journal of the current month is rewritten
+        for k, v in block.items():
+            entry['block'][k] = np.array(v)
+
+    # most recently used last, the oldest months are dropped
+    _month_cache[yymm] = entry
+    while len(_month_cache) > WX_CACHE_MONTHS:
+        del _month_cache[next(iter(_month_cache))]
+
+    return dict((k, entry['block'][k]) for k in ['timestamp'] + columns)
+
+
+def dummy_month(yymm, columns):
+    """ single dummy record for a month without data
+    """
+    dummy = datetime.strptime(yymm + '-01 ' + DUMMY_TIME, '%Y-%m-%d %H:%M:%S')
+    block = {'timestamp': to_epoch([dummy])}
+    for col in columns:
+        val = DUMMY_RECORD[WX_COLUMNS.index(col) - 1]
+        block[col] = np.array([val], dtype=np.float32)
+    return block
+
+
+@timed('load')
+def load_wx(start, end, columns=None, fill_missing=False):
+    """ load wxdata between start and end (both included)
+        columns      ... list of sensor columns, None for all
+        fill_missing ... add a dummy record for months without data
+        returns a DataFrame with a 'timestamp' column and the sensor columns
+    """
+    columns = wx_columns(columns)
+
+    t0 = to_epoch(start)
+    t1 = to_epoch(end)
+
+    parts = []
+    if USE_RING and not fill_missing:
+        # the last days come from the shared memory ring (wxring.py)
+        try:
+            from wxring import read_ring
+            block = read_ring(t0, t1, columns)
+            if block is not None:
+                print_dbg(DEBUG, 'DEBUG: ring: %s records' % len(block['timestamp']))
+                parts.append(block)
+        except Exception as e:
+            print_dbg(True, 'WARN : ring buffer not usable, using files: %s' % e)
+
+    for yymm in (month_range(start, end) if not parts else []):
+        block = read_month(yymm, columns)
+
+        if block is None:
+            if not fill_missing:
+                print_dbg(DEBUG, 'DEBUG: no data for %s' % yymm)
+                continue
+            print_dbg(True, 'WARN : missing data for %s, adding dummy record' % yymm)
+            block = dummy_month(yymm, columns)
+
+        ts = block['timestamp']
+        i0 = np.searchsorted(ts, t0, 'left')
+        i1 = np.searchsorted(ts, t1, 'right')
+        print_dbg(DEBUG, 'DEBUG: %s: %s of %s records' % (yymm, i1 - i0, len(ts)))
+
+        parts.append(dict((k, np.asarray(v[i0:i1])) for k, v in block.items()))
+
+    data = {}
+    if parts:
+        data['timestamp'] = pd.to_datetime(np.concatenate([p['timestamp'] for p in parts]), unit='s')
+        for col in columns:
+            val = np.concatenate([p[col] for p in parts]).astype(np.float64)
+            data[col] = np.round(val, ARCHIVE_DECIMALS)
+    else:
+        data['timestamp'] = pd.to_datetime(np.array([], dtype=np.int64), unit='s')
+        for col in columns:
+            data[col] = np.array([], dtype=np.float64)
+
+    return pd.DataFrame(data)
+
+
+def archive_all(force=False):
+    """ convert all closed months found in CSVPATH
+    """
+    suffix = '-' + config.CSVFILESUFFIX
+    months = sorted(fn[:7] for fn in os.listdir(config.CSVPATH) if fn.endswith(suffix))
+
+    for yymm in months:
+        if is_closed(yymm):
+            try:
+                archive_month(yymm, force)
+            except Exception as e:
+                print_dbg(True, 'ERROR: archiving %s: %s' % (yymm, e))
+
+    return
+
+
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-f] [-m YYYY-MM]\n\n"
+    msg += "\t\t-f --force   :\t rebuild archive even if csv is unchanged\n"
+    msg += "\t\t-m --month   :\t archive only month YYYY-MM\n"
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+
+#-------------------------------------------------------------------------------
+
+def main():
+    force = False
+    month = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hfm:", ["help", "force", "month="])
+    except getopt.GetoptError as err:
+        print_dbg(True, "ERROR: %s" % err)
+        usage()
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-f", "--force"):
+            force = True
+        elif o in ("-m", "--month"):
+            month = a
+        else:
+            assert False, "unhandled option"
+
+    if month:
+        if not is_closed(month):
+            print_dbg(True, "ERROR: month %s is not closed yet" % month)
+            usage()
+        archive_month(month, force)
+    else:
+        archive_all(force)
+
+    print_dbg(True, 'INFO : Done.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,670 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        wxbench.py
+# Purpose:     offline benchmark of the hot paths with synthetic station data
+#
+# Generates N years of realistic wxdata, rain, SoC, uptime and sunrise/sunset
+# csv files (ending today) into a work directory, points config/wospi at it
+# and times the main entry points of the addon scripts:
+#
+#   load_and_combine_files, calculate_sunshine   (plotSunshine)
+#   read_wx_csv, temp_stats, rain_stats          (plotStatistics)
+#   uv_stats                                     (plotUV)
+#   prepareSunData                               (plotSun)
+#   windrose data preparation                    (plotWind)
+#   archive build, load_wx, read_window          (wxarchive, csvindex)
+#
+# and the startup (interpreter, imports, --help) of the cron entry points.
+#
+# Cases whose module can not be imported (e.g. no wospi, ephem or windrose)
+# are skipped and recorded as such. The results are written as json, with
+# -c a previous result is compared and slower cases are reported.
+#
+# usage:
+#   python wxbench.py -y 3 -i 5 -o bench.json
+#   python wxbench.py -n -d /tmp/wxbench -c bench.json -o new.json
+#
+# depends on:  numpy, pandas; the scripts of this repo
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import os, sys
+import io
+import getopt
+import json
+import time
+import platform
+import tempfile
+import shutil
+import subprocess
+import contextlib
+from datetime import date, datetime, timedelta
+
+# numpy and panda for data structure
+import numpy as np
+import pandas as pd
+
+#-------------------------------------------------------------------------------
+
+# the scripts live in sub directories of the repo, on the station in HOMEPATH
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTDIRS = ['plotsun', 'plotstatistics', 'plotuv', 'tools']
+
+# defaults, see usage()
+NB_YEARS  = 2
+INTERVAL  = 5
+REPEAT    = 3
+SEED      = 42
+
+# station used for the synthetic solar radiation
+LATITUDE  = 48.2
+LONGITUDE = 16.3
+
+# entry points whose startup is timed with -h
+STARTUP = ['plotsun/plotSunshine.py', 'plotstatistics/plotStatistics.py', 'plotuv/plotUV.py',
+           'wxarchive.py', 'wxrollup.py']
+
+# a case is reported as regression if it is slower by this factor
+MAX_RATIO = 1.25
+
+DEBUG = False
+
+#-------------------------------------------------------------------------------
+# synthetic data
+
+def gen_wxdata(rng, start, end, interval):
+    """ wxdata records from start to end every interval minutes
+        returns a DataFrame in the YYYY-MM-wxdata.csv column order
+    """
+    step = interval * 60
+    t0 = int(pd.Timestamp(start).timestamp())
+    t1 = int(pd.Timestamp(end).timestamp())
+
+    # the console does not write exactly on the minute
+    epoch = np.arange(t0, t1, step) + rng.integers(0, 60, (t1 - t0 + step - 1) // step)
+    ts    = pd.to_datetime(epoch, unit='s')
+    n     = len(ts)
+
+    doy  = ts.dayofyear.values.astype(np.float64)
+    hour = ts.hour.values + ts.minute.values / 60.0
+    day  = (epoch - t0) // 86400
+    ndays = int(day[-1]) + 1 if n else 0
+
+    # weather of the day: temperature anomaly, cloudiness, rain, pressure
+    anomaly = np.convolve(rng.normal(0, 2.5, ndays + 6), np.ones(7) / 7 ** 0.5, 'valid')[:ndays]
+    clouds  = rng.beta(1.2, 1.5, ndays)
+    wet     = rng.random(ndays) < 0.3
+    baro    = 1013 + np.cumsum(rng.normal(0, 3, ndays)) * 0.3
+    baro    = 1013 + (baro - baro.mean()) * 0.8
+
+    temp = (10 - 11 * np.cos(2 * np.pi * (doy - 15) / 365)
+            + (4 + 3 * (1 - clouds[day])) * np.sin(2 * np.pi * (hour - 9) / 24)
+            + anomaly[day] + rng.normal(0, 0.3, n))
+    hum  = np.clip(75 - 2.2 * (temp - temp.mean()) * 0.5 + 15 * clouds[day] + rng.normal(0, 4, n), 15, 100)
+
+    # Magnus formula
+    gamma = np.log(hum / 100) + 17.62 * temp / (243.12 + temp)
+    dewp  = 243.12 * gamma / (17.62 - gamma)
+
+    # clear sky radiation, reduced by the clouds
+    decl = 0.409 * np.sin(2 * np.pi / 365 * doy - 1.39)
+    lat  = np.radians(LATITUDE)
+    cos_z = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(np.radians(15 * (hour - 12)))
+    solar = np.maximum(0, 1050 * cos_z * 0.75 ** (1 / np.maximum(cos_z, 0.05)))
+    solar = solar * (1 - 0.8 * clouds[day] * rng.random(n))
+    solar = np.round(solar).astype(np.int64)
+    uv    = np.round(solar / 90.0, 1)
+
+    wspeed = np.round(rng.gamma(1.6, 1.2, n), 1)
+    wdir   = (np.round(rng.normal(290, 60, n)) % 360).astype(np.int64)
+    gust   = np.round(wspeed * rng.uniform(1.2, 2.2, n), 1)
+    gdir   = ((wdir + rng.integers(-20, 21, n)) % 360).astype(np.int64)
+
+    # rain in the afternoon of wet days, daily sum resets at midnight
+    rate = np.where(wet[day] & (hour > 12) & (hour < 18) & (rng.random(n) < 0.4),
+                    np.round(rng.exponential(2.0, n), 1), 0.0)
+    rain = np.round(rate * interval / 60.0, 1)
+    daily_rain = np.round(pd.Series(rain).groupby(day).cumsum().values, 1)
+
+    return pd.DataFrame({
+        'timestamp':                   ts.strftime('%d.%m.%Y %H:%M:%S'),
+        'outside_air_temp':            np.round(temp, 1),
+        'outside_rel_hum':             np.round(hum).astype(np.int64),
+        'outside_dew_point_temp':      np.round(dewp, 1),
+        'barometic_pressure':          np.round(baro[day] + rng.normal(0, 0.2, n), 1),
+        'present_wind_direction':      wdir,
+        'present_wind_speed':          wspeed,
+        'UV_index':                    uv,
+        'solar_radiation':             solar,
+        'rain_rate':                   rate,
+        'daily_rain':                  daily_rain,
+        'daily_ET':                    0.0,
+        'monthly_ET':                  0.0,
+        'ten_min_avg_wind_speed':      np.round(wspeed * 0.9, 1),
+        'two_min_avg_wind_speed':      wspeed,
+        'ten_min_wind_gust_speed':     gust,
+        'ten_min_wind_gust_direction': gdir })
+
+
+def write_monthly(df, csvpath, suffix):
+    """ split the records into YYYY-MM-<suffix> files
+    """
+    yymm = df['timestamp'].str[6:10] + '-' + df['timestamp'].str[3:5]
+    for key, part in df.groupby(yymm.values, sort=True):
+        part.to_csv(csvpath + key + '-' + suffix, header=False, index=False)
+
+
+def write_rain(df, csvpath, suffix):
+    """ daily rain files YYYY-MM.<suffix>: day, day sum, month sum, year sum
+    """
+    days  = pd.to_datetime(df['timestamp'].str[:10], format='%d.%m.%Y')
+    daily = df['daily_rain'].groupby(days.values).max()
+    idx   = pd.DatetimeIndex(daily.index)
+
+    dd = daily.values
+    mm = daily.groupby([idx.year, idx.month]).cumsum().values
+    yy = daily.groupby(idx.year).cumsum().values
+
+    rain = pd.DataFrame({'day': idx.strftime('%d.%m.%Y'),
+                         'dd': ['%.1f' % v for v in dd],
+                         'mm': ['%.1f' % v for v in mm],
+                         'yy': ['%.1f' % v for v in yy]})
+    key = idx.strftime('%Y-%m')
+    for yymm, part in rain.groupby(key.values, sort=True):
+        with open(csvpath + yymm + '.' + suffix, 'w') as f:
+            for r in part.itertuples(index=False):
+                f.write('%s, %s, %s, %s\n' % r)
+
+
+def write_soc(rng, start, end, socfile):
+    """ yearly YYYY-soc.csv, SoC temperature every 5 minutes
+    """
+    ts = pd.date_range(start, end, freq='5min', inclusive='left')
+    soc = 48 + 6 * np.sin(2 * np.pi * (ts.hour.values - 9) / 24) + rng.normal(0, 1.5, len(ts))
+    df = pd.DataFrame({'ts': ts.strftime('%d.%m.%Y %H:%M:%S'), 'soc': np.round(soc, 1)})
+    for year, part in df.groupby(ts.year.values):
+        part.to_csv(os.path.dirname(socfile) + '/' + str(year) + '-' + os.path.basename(socfile),
+                    header=False, index=False)
+
+
+def write_uptime(rng, start, end, uptimefile):
+    """ uptime.csv, hours since boot every 15 minutes, a reboot now and then
+    """
+    ts = pd.date_range(start, end, freq='15min', inclusive='left')
+    boot = rng.random(len(ts)) < 0.002
+    grp = np.cumsum(boot)
+    up = (pd.Series(np.full(len(ts), 0.25)).groupby(grp).cumsum().values - 0.25)
+    pd.DataFrame({'ts': ts.strftime('%d.%m.%Y %H:%M:%S'), 'up': ['%.2f' % v for v in up]}) \
+      .to_csv(uptimefile, header=False, index=False)
+
+
+def write_suntimes(start, end, suntimefile):
+    """ sunrise and sunset like store_sunrise_set_times.sh writes them
+    """
+    days = pd.date_range(start, end, freq='D')
+    doy  = days.dayofyear.values
+    decl = 0.409 * np.sin(2 * np.pi / 365 * doy - 1.39)
+    lat  = np.radians(LATITUDE)
+    half = np.degrees(np.arccos(np.clip(-np.tan(lat) * np.tan(decl), -1, 1))) / 15.0
+    noon = 12 + 1 - LONGITUDE / 15.0
+
+    with open(suntimefile, 'w') as f:
+        f.write('Date       Sunrise  Sunset\n')
+        for d, rise, sset in zip(days.strftime('%d.%m.%Y'), noon - half, noon + half):
+            f.write('%s %02d:%02d %02d:%02d\n' % (d, int(rise), int(rise % 1 * 60), int(sset), int(sset % 1 * 60)))
+
+
+def generate(workdir, years, interval, seed):
+    """ write all synthetic files for the last 'years' years until now
+    """
+    rng   = np.random.default_rng(seed)
+    end   = datetime.now().replace(second=0, microsecond=0)
+    start = datetime(end.year - years + 1, 1, 1)
+
+    csvpath = workdir + 'csv/'
+    os.makedirs(csvpath, exist_ok=True)
+    os.makedirs(workdir + 'tmp/', exist_ok=True)
+
+    print("generating %d year(s) every %d minutes: %s - %s" % (years, interval, start, end))
+    t = time.perf_counter()
+    wx = gen_wxdata(rng, start, end, interval)
+    write_monthly(wx, csvpath, 'wxdata.csv')
+    write_rain(wx, csvpath, 'rain')
+    write_soc(rng, start, end, csvpath + 'soc.csv')
+    write_uptime(rng, start, end, csvpath + 'uptime.csv')
+    write_suntimes(start, end, csvpath + 'suntimes.csv')
+    print("  %d wxdata records in %.1fs" % (len(wx), time.perf_counter() - t))
+
+    return {'start': str(start), 'end': str(end), 'records': len(wx)}
+
+
+def setup_env(workdir, interval):
+    """ point config (and wospi, if available) at the work directory
+        has to run before any of the scripts is imported
+    """
+    for d in SCRIPTDIRS:
+        if os.path.isdir(os.path.join(BASEDIR, d)):
+            sys.path.append(os.path.join(BASEDIR, d))
+    sys.path.insert(0, BASEDIR)
+
+    paths = { 'CSVPATH':        workdir + 'csv/',
+              'CSVFILESUFFIX':  'wxdata.csv',
+              'TMPPATH':        workdir + 'tmp/',
+              'HOMEPATH':       workdir,
+              'ARCHIVEPATH':    workdir + 'csv/archive/',
+              'INDEXPATH':      workdir + 'csv/index/',
+              'RINGPATH':       workdir + 'ring/',
+              'UPLOADMANIFEST': workdir + 'upload_manifest.json',
+              'SUNTIMEFILE':    workdir + 'csv/suntimes.csv',
+              'SOCFILE':        workdir + 'csv/soc.csv',
+              'UPTIMEFILE':     workdir + 'csv/uptime.csv',
+              'CSVINTERVAL':    interval,
+              'SCP':            'true' }
+
+    import config
+    for k, v in paths.items():
+        setattr(config, k, v)
+
+    try:
+        import wospi
+        for k, v in paths.items():
+            setattr(wospi, k, v)
+    except Exception as e:
+        print("wospi not available, depending cases are skipped: %s" % e)
+
+    return
+
+#-------------------------------------------------------------------------------
+# cases: name -> function returning (setup, run), run returns the number of rows
+
+def quiet():
+    """ the scripts are chatty, keep the benchmark output readable
+    """
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def stats_year(meta):
+    """ last complete year of the data, the current one if there is none
+    """
+    start = datetime.fromisoformat(meta['start'])
+    end   = datetime.fromisoformat(meta['end'])
+    return end.year - 1 if end.year > start.year else end.year
+
+
+def case_load_and_combine_files(meta):
+    import plotSunshine as sun
+    import config
+    def run():
+        with quiet():
+            return len(sun.load_and_combine_files(config.CSVPATH))
+    return None, run
+
+
+def case_calculate_sunshine(meta):
+    import plotSunshine as sun
+    import config
+    with quiet():
+        df = sun.solar_frame(sun.load_and_combine_files(config.CSVPATH), sun.solar_col_idx)
+    def run():
+        with quiet():
+            sun.calculate_sunshine(df.copy(), LATITUDE, LONGITUDE, 120, None)
+        return len(df)
+    return None, run
+
+
+def case_read_wx_csv(meta):
+    import plotStatistics as ps
+    year = stats_year(meta)
+    ps.KEEP_TMP = True
+    def setup():
+        with quiet():
+            ps.prepareCSVData(1, year, ps.statdata)
+    def run():
+        with quiet():
+            return len(ps.read_wx_csv(ps.statdata, 1, 1, year, '00', 31, 12, year, False))
+    return setup, run
+
+
+def case_temp_stats(meta):
+    import plotStatistics as ps
+    year = stats_year(meta)
+    ps.KEEP_TMP = True
+    with quiet():
+        ps.prepareCSVData(1, year, ps.statdata)
+        wr = ps.read_wx_csv(ps.statdata, 1, 1, year, '00', 31, 12, year, False)
+    def run():
+        with quiet():
+            ps.temp_stats(wr.copy(), str(year), 1, 12, False)
+        return len(wr)
+    return None, run
+
+
+def case_rain_stats(meta):
+    import plotStatistics as ps
+    year = stats_year(meta)
+    ps.KEEP_TMP = True
+    with quiet():
+        ps.prepareCSVDataRain(1, year, ps.statdata_r)
+        wr = ps.read_rx_csv(ps.statdata_r, 1, 1, year, '00', 31, 12, year, False)
+    def run():
+        with quiet():
+            ps.rain_stats(wr.copy(), str(year), 1, 12, False)
+        return len(wr)
+    return None, run
+
+
+def case_uv_stats(meta):
+    import plotUV as pu
+    year = stats_year(meta)
+    pu.KEEP_TMP = True
+    with quiet():
+        pu.prepareCSVData(1, year, pu.statdata)
+        wr = pu.read_wx_csv(pu.statdata, 1, 1, year, '00', 31, 12, year, False)
+    def run():
+        with quiet():
+            pu.uv_stats(wr.copy(), str(year), 1, 12, False)
+        return len(wr)
+    return None, run
+
+
+def case_prepareSunData(meta):
+    import plotSun
+    d2 = datetime.now()
+    d1 = d2 - timedelta(days=plotSun.NB_DAYS)
+    plotSun.KEEP_TMP = True
+    def run():
+        with quiet():
+            plotSun.prepareSunData(d1.day, d1.month, d1.year, d2.day, d2.month, d2.year, 'sun_full')
+        with open(plotSun.wospi.TMPPATH + 'plotsun_full.tmp') as f:
+            return sum(1 for _ in f)
+    return None, run
+
+
+def case_windrose_prep(meta):
+    import plotWind as pw
+    d2 = datetime.now()
+    d1 = d2 - timedelta(days=pw.NBDAYS)
+    args = (d1.day, d1.month, d1.year, d1.hour, d2.day, d2.month, d2.year)
+    def run():
+        with quiet():
+            if pw.USE_ARCHIVE:
+                wr = pw.read_wx_archive(*args)
+            else:
+                pw.prepareCSVData(d1.month, d1.year)
+                wr = pw.read_wx_csv(pw.tmpwrdata, *args)
+        # the present and the gust arrays of plotWind.main
+        current = (wr["present_wind_direction"].tolist(), wr["present_wind_speed"].tolist())
+        gust    = (wr["ten_min_wind_gust_direction"].tolist(), wr["ten_min_wind_gust_speed"].tolist())
+        return len(current[0]) + len(gust[0])
+    return None, run
+
+
+def case_archive_build(meta):
+    import wxarchive
+    def run():
+        with quiet():
+            wxarchive.archive_all(force=True)
+        return meta['records']
+    return None, run
+
+
+def case_load_wx(meta):
+    import wxarchive
+    start = datetime.fromisoformat(meta['start'])
+    end   = datetime.fromisoformat(meta['end'])
+    with quiet():
+        wxarchive.archive_all()
+    def run():
+        with quiet():
+            return len(wxarchive.load_wx(start, end))
+    return None, run
+
+
+def case_read_window(meta):
+    import config
+    from csvindex import read_window, update_index
+    update_index(config.UPTIMEFILE)
+    since = date.today() - timedelta(days=7)
+    def run():
+        return len(read_window(config.UPTIMEFILE, since))
+    return None, run
+
+
+def startup_case(script):
+    """ case for the startup of a script: interpreter, imports and -h
+        the script runs in a new interpreter with the same sys.path
+    """
+    def case(meta):
+        path = os.path.join(BASEDIR, script)
+        if not os.path.isfile(path):
+            raise ImportError('%s not found' % script)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in sys.path if p))
+        def run():
+            # usage() exits with 10, anything else is a broken script
+            res = subprocess.run([sys.executable, path, '-h'], env=env,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if res.returncode not in (0, 10):
+                err = res.stderr.decode(errors='replace').strip().splitlines()
+                raise RuntimeError('%s -h exit code %d: %s' % (script, res.returncode, err[-1] if err else ''))
+            return 0
+        return None, run
+    return case
+
+
+CASES = [ ('load_and_combine_files', case_load_and_combine_files),
+          ('calculate_sunshine',     case_calculate_sunshine),
+          ('read_wx_csv',            case_read_wx_csv),
+          ('temp_stats',             case_temp_stats),
+          ('rain_stats',             case_rain_stats),
+          ('uv_stats',               case_uv_stats),
+          ('prepareSunData',         case_prepareSunData),
+          ('windrose_prep',          case_windrose_prep),
+          ('archive_build',          case_archive_build),
+          ('load_wx',                case_load_wx),
+          ('read_window',            case_read_window) ]
+
+CASES += [ ('startup_' + os.path.splitext(os.path.basename(s))[0], startup_case(s)) for s in STARTUP ]
+
+#-------------------------------------------------------------------------------
+# run and compare
+
+def run_case(name, func, meta, repeat):
+    """ time one case, returns the result dict
+    """
+    try:
+        setup, run = func(meta)
+    except ImportError as e:
+        print("  %-24s skipped: %s" % (name, e))
+        return {'skipped': str(e)}
+
+    wall = []
+    cpu  = []
+    rows = 0
+    try:
+        for i in range(repeat):
+            if setup is not None:
+                setup()
+            w0, c0 = time.perf_counter(), time.process_time()
+            rows = run()
+            wall.append(time.perf_counter() - w0)
+            cpu.append(time.process_time() - c0)
+    except Exception as e:
+        print("  %-24s failed: %s" % (name, e))
+        return {'error': str(e)}
+
+    res = { 'rows':   rows,
+            'wall':   wall,
+            'min':    min(wall),
+            'median': float(np.median(wall)),
+            'cpu':    float(np.median(cpu)) }
+    print("  %-24s %9.4fs  (median %.4fs, cpu %.4fs, %d rows)" % (name, res['min'], res['median'], res['cpu'], rows))
+
+    return res
+
+
+def compare(old, new, max_ratio):
+    """ print the ratio new/old of the fastest runs
+        returns the names of the cases slower than max_ratio
+    """
+    slower = []
+    print("\n%-24s %10s %10s %7s" % ('case', 'before', 'now', 'ratio'))
+    for name, res in new['results'].items():
+        prev = old.get('results', {}).get(name, {})
+        if 'min' not in res or 'min' not in prev:
+            continue
+        ratio = res['min'] / prev['min'] if prev['min'] > 0 else float('inf')
+        flag = ''
+        if ratio > max_ratio:
+            slower.append(name)
+            flag = '  <-- slower'
+        print("%-24s %9.4fs %9.4fs %6.2fx%s" % (name, prev['min'], res['min'], ratio, flag))
+
+    return slower
+
+
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-y years] [-i minutes] [-r repeat] [-s seed] [-d dir] [-n] [-k]\n"
+    msg += "                  [-t case,...] [-o out.json] [-c previous.json] [-m ratio]\n\n"
+    msg += "\t\t-y --years    :\t years of synthetic data (%d)\n" % NB_YEARS
+    msg += "\t\t-i --interval :\t minutes between records (%d)\n" % INTERVAL
+    msg += "\t\t-r --repeat   :\t runs per case, the fastest counts (%d)\n" % REPEAT
+    msg += "\t\t-s --seed     :\t random seed (%d)\n" % SEED
+    msg += "\t\t-d --dir      :\t work directory (default: new temp directory)\n"
+    msg += "\t\t-n --nogen    :\t reuse the data in the work directory\n"
+    msg += "\t\t-k --keep     :\t keep the work directory\n"
+    msg += "\t\t-t --cases    :\t run only these cases (%s)\n" % ','.join(c for c, f in CASES)
+    msg += "\t\t-o --output   :\t write the results as json\n"
+    msg += "\t\t-c --compare  :\t compare with a previous json result\n"
+    msg += "\t\t-m --maxratio :\t slower by this factor is a regression (%.2f)\n" % MAX_RATIO
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+
+#-------------------------------------------------------------------------------
+
+def main():
+    years     = NB_YEARS
+    interval  = INTERVAL
+    repeat    = REPEAT
+    seed      = SEED
+    workdir   = None
+    nogen     = False
+    keep      = False
+    cases     = None
+    outfile   = None
+    prevfile  = None
+    max_ratio = MAX_RATIO
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hy:i:r:s:d:nkt:o:c:m:",
+                                   ["help", "years=", "interval=", "repeat=", "seed=", "dir=", "nogen", "keep",
+                                    "cases=", "output=", "compare=", "maxratio="])
+    except getopt.GetoptError as err:
+        print(str(err))
+        usage()
+
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-y", "--years"):
+            years = int(a)
+        elif o in ("-i", "--interval"):
+            interval = int(a)
+        elif o in ("-r", "--repeat"):
+            repeat = int(a)
+        elif o in ("-s", "--seed"):
+            seed = int(a)
+        elif o in ("-d", "--dir"):
+            workdir = os.path.join(a, '')
+        elif o in ("-n", "--nogen"):
+            nogen = True
+        elif o in ("-k", "--keep"):
+            keep = True
+        elif o in ("-t", "--cases"):
+            cases = a.split(',')
+        elif o in ("-o", "--output"):
+            outfile = a
+        elif o in ("-c", "--compare"):
+            prevfile = a
+        elif o in ("-m", "--maxratio"):
+            max_ratio = float(a)
+        else:
+            assert False, "unhandled option"
+
+    if cases:
+        unknown = [c for c in cases if c not in dict(CASES)]
+        if unknown:
+            print("unknown case(s): %s" % ', '.join(unknown))
+            usage()
+
+    if workdir is None:
+        if nogen:
+            print("-n needs a work directory (-d)")
+            usage()
+        workdir = os.path.join(tempfile.mkdtemp(prefix='wxbench.'), '')
+
+    metafile = workdir + 'wxbench_data.json'
+    if nogen:
+        with open(metafile) as f:
+            meta = json.load(f)
+        interval = meta['interval']
+    else:
+        meta = generate(workdir, years, interval, seed)
+        meta.update({'years': years, 'interval': interval, 'seed': seed})
+        with open(metafile, 'w') as f:
+            json.dump(meta, f)
+
+    setup_env(workdir, interval)
+
+    result = { 'created':  datetime.now().isoformat(timespec='seconds'),
+               'host':     platform.node(),
+               'machine':  platform.machine(),
+               'python':   platform.python_version(),
+               'numpy':    np.__version__,
+               'pandas':   pd.__version__,
+               'data':     meta,
+               'repeat':   repeat,
+               'results':  {} }
+
+    print("\nrunning cases (%d runs each):" % repeat)
+    for name, func in CASES:
+        if cases and name not in cases:
+            continue
+        result['results'][name] = run_case(name, func, meta, repeat)
+
+    if outfile:
+        with open(outfile, 'w') as f:
+            json.dump(result, f, indent=2)
+        print("\nresults written to %s" % outfile)
+
+    slower = []
+    if prevfile:
+        with open(prevfile) as f:
+            slower = compare(json.load(f), result, max_ratio)
+
+    if not keep and not nogen:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if slower:
+        print("\nslower than %.2fx: %s" % (max_ratio, ', '.join(slower)))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        wxingest.py
+# Purpose:     incremental, append-only ingest of the current wxdata csv
+#
+# WOSPi only appends to the csv of the current month. For every csv the
+# byte offset, the last timestamp and the number of rows already parsed are
+# kept in a small state file. A run only parses the lines appended since the
+# last run and appends them to a binary journal:
+#
+#   ARCHIVEPATH/ingest/YYYY-MM.bin     int64 timestamp + float32 columns
+#   ARCHIVEPATH/ingest/YYYY-MM.json    offset, last timestamp, rows, inode
+#
+# If the csv was rewritten (smaller than the offset or new inode) the
+# journal is rebuilt. Journals of closed months are removed, these months
+# are read from the columnar archive (wxarchive.py).
+# The plot scripts ingest from cron and wxsched.py at the same time, a
+# lock file per month lets only one process update the journal at a time.
+#
+# usage:
+#   from wxingest import read_current
+#   block = read_current('2026-10', ['outside_air_temp'])
+#
+#   python wxingest.py        ... ingest the current month
+#
+# depends on:  WOSPi, numpy, pandas
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import os, sys
+import fcntl
+import getopt
+import io
+import json
+import time
+
+# numpy for data structure
+import numpy as np
+
+# from local module
+from wxtools import print_dbg
+from wxarchive import ARCHIVEPATH, WX_COLUMNS, csv_name, is_closed, parse_csv
+
+#-------------------------------------------------------------------------------
+
+INGESTPATH = ARCHIVEPATH + 'ingest/'
+
+# one journal record
+JOURNAL_DTYPE = np.dtype([('timestamp', '<i8')] + [(col, '<f4') for col in WX_COLUMNS[1:]])
+
+DEBUG = False
+
+#-------------------------------------------------------------------------------
+
+def journal_name(yymm):
+    return INGESTPATH + yymm + '.bin'
+
+
+def state_name(yymm):
+    return INGESTPATH + yymm + '.json'
+
+
+def lock_name(yymm):
+    return INGESTPATH + yymm + '.lock'
+
+
+class ingest_lock:
+    """ one process updates the journal of a month at a time
+    """
+    def __init__(self, yymm):
+        self.yymm = yymm
+
+    def __enter__(self):
+        if not os.path.isdir(INGESTPATH):
+            os.makedirs(INGESTPATH)
+        self.f = open(lock_name(self.yymm), 'w')
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+        return False
+
+
+def read_state(yymm):
+    """ ingest state of a month, None if nothing was ingested yet
+    """
+    try:
+        with open(state_name(yymm), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(yymm, state):
+    """ replace the state file atomically
+    """
+    tmpfile = state_name(yymm) + '.tmp'
+    with open(tmpfile, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmpfile, state_name(yymm))
+    return
+
+
+def reset(yymm):
+    """ forget everything ingested for this month
+    """
+    for fn in (journal_name(yymm), state_name(yymm)):
+        if os.path.isfile(fn):
+            os.unlink(fn)
+    return
+
+
+def ingest(yymm):
+    """ parse the lines appended to the csv since the last run
+        returns the current state, None if there is no csv
+    """
+    wxin = csv_name(yymm)
+    if not os.path.isfile(wxin):
+        return None
+
+    with ingest_lock(yymm):
+        return update(yymm, wxin)
+
+
+def update(yymm, wxin):
+    """ ingest with the lock of the month held, returns the state
+    """
+    st    = os.stat(wxin)
+    state = read_state(yymm)
+
+    # csv was replaced or truncated, start again
+    if state is not None and (state['inode'] != st.st_ino or state['offset'] > st.st_size):
+        print_dbg(True, 'WARN : %s was rewritten, rebuilding journal' % wxin)
+        reset(yymm)
+        state = None
+
+    if state is None:
+        state = {'offset': 0, 'last_ts': None, 'rows': 0, 'inode': st.st_ino}
+
+    # drop records of an interrupted run, they are parsed again
+    journal = journal_name(yymm)
+    if os.path.isfile(journal) and os.path.getsize(journal) != state['rows'] * JOURNAL_DTYPE.itemsize:
+        with open(journal, 'r+b') as f:
+            f.truncate(state['rows'] * JOURNAL_DTYPE.itemsize)
+
+    if state['offset'] == st.st_size:
+        return state
+
+    with open(wxin, 'rb') as f:
+        f.seek(state['offset'])
+        chunk = f.read(st.st_size - state['offset'])
+
+    # wospi may still be writing, only use complete lines
+    end = chunk.rfind(b'\n') + 1
+    if end == 0:
+        return state
+    chunk = chunk[:end]
+
+    block = parse_csv(io.BytesIO(chunk))
+    rows  = len(block['timestamp'])
+
+    if rows:
+        rec = np.empty(rows, dtype=JOURNAL_DTYPE)
+        for col in JOURNAL_DTYPE.names:
+            rec[col] = block[col]
+        with open(journal, 'ab') as f:
+            rec.tofile(f)
+        state['last_ts'] = max(int(rec['timestamp'][-1]), state['last_ts'] or 0)
+
+    print_dbg(DEBUG, 'DEBUG: %s: %s new records from offset %s' % (yymm, rows, state['offset']))
+
+    state['offset'] += end
+    state['rows']   += rows
+    write_state(yymm, state)
+
+    return state
+
+
+def purge():
+    """ remove journals of closed months
+    """
+    if not os.path.isdir(INGESTPATH):
+        return
+
+    for fn in os.listdir(INGESTPATH):
+        yymm = fn[:7]
+        if fn.endswith('.json') and is_closed(yymm):
+            print_dbg(DEBUG, 'DEBUG: removing journal %s' % yymm)
+            with ingest_lock(yymm):
+                reset(yymm)
+            try:
+                os.unlink(lock_name(yymm))
+            except OSError:
+                pass
+    return
+
+
+def read_current(yymm, columns):
+    """ ingest new lines and return the month as dict of sorted arrays
+        returns None if there is no csv for this month
+    """
+    state = ingest(yymm)
+    if state is None:
+        return None
+
+    if state['rows'] == 0:
+        rec = np.empty(0, dtype=JOURNAL_DTYPE)
+    else:
+        rec = np.memmap(journal_name(yymm), dtype=JOURNAL_DTYPE, mode='r', shape=(state['rows'],))
+
+    ts = np.asarray(rec['timestamp'])
+    block = {'timestamp': ts}
+    for col in columns:
+        block[col] = np.asarray(rec[col])
+
+    # csv lines are appended in time order, sort only if needed
+    if len(ts) > 1 and (np.diff(ts) < 0).any():
+        order = np.argsort(ts, kind='stable')
+        block = dict((k, v[order]) for k, v in block.items())
+
+    return block
+
+
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-r] [-m YYYY-MM]\n\n"
+    msg += "\t\t-r --rebuild :\t drop the journal and ingest the whole csv again\n"
+    msg += "\t\t-m --month   :\t ingest month YYYY-MM, default current month\n"
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+
+#-------------------------------------------------------------------------------
+
+def main():
+    rebuild = False
+    month   = time.strftime('%Y-%m')
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hrm:", ["help", "rebuild", "month="])
+    except getopt.GetoptError as err:
+        print_dbg(True, "ERROR: %s" % err)
+        usage()
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-r", "--rebuild"):
+            rebuild = True
+        elif o in ("-m", "--month"):
+            month = a
+        else:
+            assert False, "unhandled option"
+
+    if rebuild:
+        with ingest_lock(month):
+            reset(month)
+
+    state = ingest(month)
+    if state is None:
+        print_dbg(True, 'WARN : no csv for %s' % month)
+    else:
+        print_dbg(True, 'INFO : %s: %s records ingested' % (month, state['rows']))
+
+    purge()
+
+    print_dbg(True, 'INFO : Done.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        wxring.py
+# Purpose:     ring buffer of the last days of wxdata in shared memory
+#
+# The short range plots (last hours and days) read the same few days again
+# every few minutes. The last RING_DAYS days are kept in a fixed size
+# array in shared memory (tmpfs), every process maps the same file:
+#
+#   RINGPATH/wxring.bin     RING_SIZE records, int64 timestamp + float32 columns
+#   RINGPATH/wxring.json    csv path, month and offset, write position, rows
+#
+# Like wxingest.py the csv is tailed, every update only parses the lines
+# appended since the last one; the oldest records are overwritten. The
+# first fill only reads the csv from the first day of the window on
+# (csvindex.py). A reader updates the ring before it reads, so there is
+# no process to keep running. If the csv was rewritten, or the ring was
+# filled from another CSVPATH, the ring is filled again.
+#
+# wxarchive.load_wx uses the ring for time ranges it covers (USE_RING).
+#
+# usage:
+#   from wxring import read_ring
+#   block = read_ring(t0, t1, ['outside_air_temp'])
+#
+#   python wxring.py        ... update the ring and show what it holds
+#
+# depends on:  WOSPi, numpy, pandas
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import config
+import os, sys
+import fcntl
+import getopt
+import io
+import json
+import time
+from datetime import date, datetime, timedelta
+
+# numpy for data structure
+import numpy as np
+
+# from local module
+from wxtools import print_dbg
+from wxarchive import WX_COLUMNS, csv_name, parse_csv, to_epoch
+from csvindex import window_offset
+
+#-------------------------------------------------------------------------------
+
+# tmpfs, the ring is never written to the sd card
+RINGPATH  = getattr(config, 'RINGPATH', '/dev/shm/wospi/')
+
+# days kept, the window starts at midnight
+RING_DAYS = getattr(config, 'RING_DAYS', 7)
+
+# records, enough for one record per minute
+RING_SIZE = getattr(config, 'RING_SIZE', (RING_DAYS + 1) * 1440)
+
+# one ring record, same layout as the ingest journal
+RING_DTYPE = np.dtype([('timestamp', '<i8')] + [(col, '<f4') for col in WX_COLUMNS[1:]])
+
+DEBUG = False
+
+#-------------------------------------------------------------------------------
+
+def ring_name():
+    return RINGPATH + 'wxring.bin'
+
+
+def state_name():
+    return RINGPATH + 'wxring.json'
+
+
+def read_state():
+    """ state of the ring, None if there is none
+    """
+    try:
+        with open(state_name(), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_state(state):
+    """ replace the state file atomically
+    """
+    tmpfile = state_name() + '.tmp'
+    with open(tmpfile, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmpfile, state_name())
+    return
+
+
+def open_ring(mode='r+'):
+    """ memmap of the ring records
+    """
+    return np.memmap(ring_name(), dtype=RING_DTYPE, mode=mode, shape=(RING_SIZE,))
+
+
+def append(ring, state, block):
+    """ write the records of a parsed block at the write position
+    """
+    rows = len(block['timestamp'])
+    if rows == 0:
+        return
+
+    # more than fits, only the newest are kept
+    skip = max(0, rows - RING_SIZE)
+    idx  = (state['head'] + np.arange(rows - skip)) % RING_SIZE
+    for col in RING_DTYPE.names:
+        ring[col][idx] = block[col][skip:]
+
+    state['head']  = int((state['head'] + rows - skip) % RING_SIZE)
+    state['rows']  = min(state['rows'] + rows - skip, RING_SIZE)
+    state['last']  = max(int(block['timestamp'][-1]), state['last'] or 0)
+
+    # once the ring is full the oldest record is the start of the window
+    if state['rows'] == RING_SIZE:
+        state['since'] = max(state['since'], int(ring['timestamp'][state['head']]))
+
+    return
+
+
+def tail(ring, state):
+    """ append the lines written to the csv of state['yymm'] since the last update
+        returns False if the csv was rewritten
+    """
+    wxin = csv_name(state['yymm'])
+    if not os.path.isfile(wxin):
+        return True
+
+    st = os.stat(wxin)
+    if state['inode'] is None:
+        state['inode'] = st.st_ino
+    elif state['inode'] != st.st_ino or state['offset'] > st.st_size:
+        return False
+
+    if state['offset'] == st.st_size:
+        return True
+
+    with open(wxin, 'rb') as f:
+        f.seek(state['offset'])
+        chunk = f.read(st.st_size - state['offset'])
+
+    # wospi may still be writing, only use complete lines
+    end = chunk.rfind(b'\n') + 1
+    if end == 0:
+        return True
+
+    block = parse_csv(io.BytesIO(chunk[:end]))
+
+    # first fill: the start day of the window may have earlier lines
+    keep  = block['timestamp'] >= state['since']
+    block = dict((k, v[keep]) for k, v in block.items())
+    append(ring, state, block)
+
+    print_dbg(DEBUG, 'DEBUG: %s: %s records from offset %s' % (state['yymm'], len(block['timestamp']), state['offset']))
+    state['offset'] += end
+
+    return True
+
+
+def fill():
+    """ create the ring and read the window from the csv files
+        returns the state
+    """
+    if not os.path.isdir(RINGPATH):
+        os.makedirs(RINGPATH)
+
+    first = date.today() - timedelta(days=RING_DAYS)
+    state = { 'size':   RING_SIZE,
+              'source': config.CSVPATH,
+              'since':  int(to_epoch([datetime(first.year, first.month, first.day)])[0]),
+              'head':   0,
+              'rows':   0,
+              'last':   None,
+              'yymm':   first.strftime('%Y-%m'),
+              'offset': 0,
+              'inode':  None }
+
+    open_ring('w+').flush()
+    ring = open_ring()
+
+    # start month: seek to the first day of the window
+    if os.path.isfile(csv_name(state['yymm'])):
+        state['offset'] = window_offset(csv_name(state['yymm']), first)
+
+    while True:
+        tail(ring, state)
+        if state['yymm'] >= time.strftime('%Y-%m'):
+            break
+        state['yymm']   = next_month(state['yymm'])
+        state['offset'] = 0
+        state['inode']  = None
+
+    ring.flush()
+    write_state(state)
+
+    print_dbg(True, 'INFO : ring filled with %s records since %s' % (state['rows'], first))
+    return state
+
+
+def next_month(yymm):
+    y, m = int(yymm[:4]), int(yymm[5:7])
+    return '%04d-%02d' % (y + m // 12, m % 12 + 1)
+
+
+def update():
+    """ bring the ring up to date, call with the lock held
+        returns the state
+    """
+    state = read_state()
+    if state is None or state['size'] != RING_SIZE or not os.path.isfile(ring_name()):
+        return fill()
+
+    # same RINGPATH, other csv files
+    if state.get('source') != config.CSVPATH:
+        print_dbg(True, 'WARN : ring was filled from %s, filling ring again' % state.get('source'))
+        return fill()
+
+    ring = open_ring()
+
+    # finish the last month, then go on with the current one
+    while True:
+        if not tail(ring, state):
+            print_dbg(True, 'WARN : %s was rewritten, filling ring again' % csv_name(state['yymm']))
+            del ring
+            return fill()
+        if state['yymm'] >= time.strftime('%Y-%m'):
+            break
+        state['yymm']   = next_month(state['yymm'])
+        state['offset'] = 0
+        state['inode']  = None
+
+    ring.flush()
+    write_state(state)
+
+    return state
+
+
+class ring_lock:
+    """ one process updates the ring at a time
+    """
+    def __enter__(self):
+        if not os.path.isdir(RINGPATH):
+            os.makedirs(RINGPATH)
+        self.f = open(RINGPATH + 'wxring.lock', 'w')
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+        self.f.close()
+        return False
+
+
+def read_ring(t0, t1, columns):
+    """ records with t0 <= timestamp <= t1 (epoch seconds) as dict of sorted arrays
+        returns None if the ring does not go back to t0
+    """
+    with ring_lock():
+        state = update()
+        if state['rows'] == 0 or t0 < state['since']:
+            return None
+
+        ring = open_ring('r')
+        ts   = np.asarray(ring['timestamp'])
+        sel  = np.flatnonzero((ts >= t0) & (ts <= t1))
+        if state['rows'] < RING_SIZE:
+            sel = sel[sel < state['rows']]
+
+        # ring order is csv order, sorted like a month of the archive
+        order = sel[np.argsort(ts[sel], kind='stable')]
+        block = {'timestamp': ts[order]}
+        for col in columns:
+            block[col] = np.asarray(ring[col][order])
+
+    return block
+
+
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-r]\n\n"
+    msg += "\t\t-r --rebuild :\t fill the ring again from the csv files\n"
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+
+#-------------------------------------------------------------------------------
+
+def main():
+    rebuild = False
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hr", ["help", "rebuild"])
+    except getopt.GetoptError as err:
+        print_dbg(True, "ERROR: %s" % err)
+        usage()
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-r", "--rebuild"):
+            rebuild = True
+        else:
+            assert False, "unhandled option"
+
+    with ring_lock():
+        state = fill() if rebuild else update()
+
+    last = np.datetime64(state['last'], 's') if state['last'] else None
+    print_dbg(True, 'INFO : %s records from %s to %s' % (state['rows'], np.datetime64(state['since'], 's'), last))
+    print_dbg(True, 'INFO : Done.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        wxrollup.py
+# Purpose:     single pass daily/monthly rollup of the wxdata columns
+#
+# All aggregates of a grouping (min, max, sum, count, mean) are computed in
+# one sorted pass with numpy reduceat, for all requested columns at once.
+#
+# The daily summary of every closed month is persisted next to the archive
+#
+#   ARCHIVEPATH/YYYY-MM/daily.npy   one record per day, for every sensor
+#                                   column: _min, _max, _sum, _count
+#                                   outside_air_temp_am/_pm for trope nights
+#
+# so the statistics scripts read a few hundred daily records instead of
+# the raw 5 minute data. The summary of the current month is kept next to
+# the ingest journal (wxingest.py)
+#
+#   ARCHIVEPATH/ingest/YYYY-MM.daily.npy    daily records
+#   ARCHIVEPATH/ingest/YYYY-MM.daily.json   journal rows already rolled up
+#
+# and only the days with new records (usually today) are rolled up again.
+#
+# trope night: last night was a trope night if between 06:00pm and 06:00am
+# Tmin >= 20degC. outside_air_temp_am is the min of 00:00-06:59 and
+# outside_air_temp_pm the min of 18:00-23:59, trope of day D is
+# min(am[D], pm[D-1]), same window as the 6h time shift in plotStatistics.
+#
+# usage:
+#   from wxrollup import load_daily
+#   daily = load_daily(start, end, ['outside_air_temp'], fill_missing=True)
+#
+#   python wxrollup.py        ... refresh all daily summaries (e.g. cron)
+#
+# depends on:  WOSPi, numpy, pandas
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import config
+import os, sys
+import getopt
+import json
+from datetime import datetime
+
+# from local module
+from wxtools import print_dbg, timed, lazy_module
+from wxarchive import ARCHIVE_DECIMALS, USE_INGEST, WX_COLUMNS, archive_dir, archive_all, \
+                      is_closed, month_range, read_month, dummy_month, to_epoch, wx_columns
+
+# numpy and panda for data structure, imported on first use
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+#-------------------------------------------------------------------------------
+
+# aggregates kept in the daily summary
+DAILY_AGGS = ['min', 'max', 'sum', 'count']
+
+# trope night window, hours of the calendar day
+TROPE_AM = (0, 6)
+TROPE_PM = (18, 23)
+
+DAILY_DTYPE = ([('day', '<i8')] +
+               [(col + '_' + agg, '<f8') for col in WX_COLUMNS[1:] for agg in DAILY_AGGS] +
+               [('outside_air_temp_am', '<f8'), ('outside_air_temp_pm', '<f8')])
+
+DEBUG = False
+
+#-------------------------------------------------------------------------------
+# engine
+
+def kahan_reduceat(vals, starts):
+    """ sums of the groups starting at starts, for every array in vals
+        Kahan summation in record order, like the pandas group sum, so the
+        sums round the same way; NaN is skipped
+        returns array groups x len(vals)
+    """
+    n, k  = len(vals[0]), len(vals)
+    lens  = np.diff(np.r_[starts, n])
+    group = np.repeat(np.arange(len(starts)), lens)
+    pos   = np.arange(n) - starts[group]
+
+    # position in the group x group x column, one step per position
+    pad = np.full((lens.max(), len(starts), k), np.nan)
+    for i, val in enumerate(vals):
+        pad[pos, group, i] = val
+
+    tot = np.zeros((len(starts), k))
+    cmp = np.zeros((len(starts), k))
+    for x in pad:
+        ok  = ~np.isnan(x)
+        y   = x - cmp
+        t   = tot + y
+        cmp = np.where(ok, (t - tot) - y, cmp)
+        tot = np.where(ok, t, tot)
+
+    return tot
+
+
+def group_reduce(keys, values, aggs):
+    """ reduce values by group key in one pass
+        keys   ... int array, group key per record
+        values ... dict column -> array
+        aggs   ... dict column -> list of 'min','max','sum','count','mean'
+        returns unique keys and a dict '<column>_<agg>' -> array
+        NaN is skipped like pandas does (sum of an empty group is 0)
+    """
+    keys = np.asarray(keys)
+
+    # data is almost always in time order, sort only if needed
+    order = None
+    if len(keys) > 1 and (keys[1:] < keys[:-1]).any():
+        order = np.argsort(keys, kind='stable')
+        keys  = keys[order]
+
+    out = {}
+    if len(keys) == 0:
+        for col in aggs:
+            for agg in aggs[col]:
+                out[col + '_' + agg] = np.array([], dtype=np.float64)
+        return keys, out
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+    vals = {}
+    for col in aggs:
+        vals[col] = np.asarray(values[col], dtype=np.float64)
+        if order is not None:
+            vals[col] = vals[col][order]
+
+    # sum and mean of all columns in one pass
+    sums   = {}
+    summed = [col for col in aggs if 'sum' in aggs[col] or 'mean' in aggs[col]]
+    if summed:
+        tot  = kahan_reduceat([vals[col] for col in summed], starts)
+        sums = dict((col, tot[:, i]) for i, col in enumerate(summed))
+
+    for col in aggs:
+        val = vals[col]
+        nan = np.isnan(val)
+        cnt = np.add.reduceat(~nan, starts).astype(np.float64)
+        tot = sums.get(col)
+
+        for agg in aggs[col]:
+            if agg == 'min':
+                res = np.fmin.reduceat(val, starts)
+            elif agg == 'max':
+                res = np.fmax.reduceat(val, starts)
+            elif agg == 'sum':
+                res = tot
+            elif agg == 'count':
+                res = cnt
+            elif agg == 'mean':
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    res = np.where(cnt > 0, tot / cnt, np.nan)
+            else:
+                raise ValueError('unknown aggregate: %s' % agg)
+            out[col + '_' + agg] = res
+
+    return keys[starts], out
+
+
+def day_keys(epoch):
+    """ days since epoch for int64 seconds
+    """
+    return np.asarray(epoch) // 86400
+
+
+def month_keys(epoch):
+    """ year*12 + month-1 for int64 seconds
+    """
+    m = np.asarray(epoch, dtype='datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    return m + 1970 * 12
+
+
+def daily_rollup(epoch, values, columns, aggs=DAILY_AGGS, trope=False):
+    """ daily aggregates of raw records
+        epoch  ... int64 seconds
+        values ... dict column -> array
+        trope  ... add outside_air_temp_am/_pm
+        returns day keys and dict of arrays
+    """
+    days, out = group_reduce(day_keys(epoch), values, dict((c, aggs) for c in columns))
+
+    if trope:
+        hour  = (np.asarray(epoch) % 86400) // 3600
+        temp  = np.asarray(values['outside_air_temp'], dtype=np.float64)
+        for part, (h0, h1) in (('am', TROPE_AM), ('pm', TROPE_PM)):
+            sel = (hour >= h0) & (hour <= h1)
+            k, r = group_reduce(day_keys(epoch)[sel], {'t': temp[sel]}, {'t': ['min']})
+            col = np.full(len(days), np.nan)
+            col[np.searchsorted(days, k)] = r['t_min']
+            out['outside_air_temp_' + part] = col
+
+    return days, out
+
+
+def to_frame(days, out, columns, fill_range=True):
+    """ daily records as DataFrame with a daily DatetimeIndex
+        adds <column>_mean from sum and count if available
+        fill_range ... add NaN rows for days without data, like resample('D')
+    """
+    data = dict(out)
+    for col in columns:
+        if col + '_sum' in data and col + '_count' in data:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                data[col + '_mean'] = np.where(data[col + '_count'] > 0,
+                                               data[col + '_sum'] / data[col + '_count'], np.nan)
+
+    idx = pd.to_datetime(np.asarray(days, dtype=np.int64) * 86400, unit='s')
+    df  = pd.DataFrame(data, index=idx)
+    df.index.name = 'timestamp'
+
+    if fill_range and len(df):
+        df = df.reindex(pd.date_range(df.index[0], df.index[-1], freq='D', name='timestamp'))
+
+    return df
+
+
+def rollup_frame(pdin, columns, aggs=DAILY_AGGS, trope=False):
+    """ daily rollup of a raw DataFrame with timestamp index
+    """
+    epoch  = to_epoch(pdin.index.values)
+    values = dict((c, pdin[c].values) for c in columns)
+    if trope and 'outside_air_temp' not in values:
+        values['outside_air_temp'] = pdin['outside_air_temp'].values
+
+    days, out = daily_rollup(epoch, values, columns, aggs, trope)
+    df = to_frame(days, out, columns)
+    if trope:
+        df = add_trope(df)
+    return df
+
+
+def add_trope(df):
+    """ trope night minimum, min(am[D], pm[D-1])
+        the evening before the first day is not part of the range
+    """
+    pm = df['outside_air_temp_pm'].shift(1, freq='D').reindex(df.index)
+    df['outside_air_temp_trope'] = np.fmin(df['outside_air_temp_am'].values, pm.values)
+    return df
+
+
+def monthly_rollup(daily, agg):
+    """ monthly aggregates (month start index) of a daily DataFrame
+        agg ... dict column -> 'min','max','sum','count','mean'
+                or a list of them, the result columns are then <column>_<agg>
+    """
+    epoch = to_epoch(daily.index.values)
+    aggs  = dict((c, [a] if isinstance(a, str) else list(a)) for c, a in agg.items())
+    keys, out = group_reduce(month_keys(epoch), dict((c, daily[c].values) for c in agg), aggs)
+
+    # sum and count of a month without records is 0, like resample
+    # and they keep an integer column integer
+    data, counts = {}, {}
+    for c, a in aggs.items():
+        for x in a:
+            name = c if isinstance(agg[c], str) else c + '_' + x
+            data[name] = out[c + '_' + x]
+            if x == 'count' or (x == 'sum' and daily[c].dtype.kind in 'biu'):
+                counts[name] = np.int64
+            elif x == 'sum':
+                counts[name] = np.float64
+
+    idx = pd.to_datetime(['%d-%02d-01' % (k // 12, k % 12 + 1) for k in keys])
+    df  = pd.DataFrame(data, index=idx)
+    if len(df):
+        df = df.reindex(pd.date_range(df.index[0], df.index[-1], freq='MS'))
+    for name, dtype in counts.items():
+        df[name] = df[name].fillna(0).astype(dtype)
+    df.index.name = 'timestamp'
+
+    return df
+
+
+def fill_days(df, days, columns):
+    """ add a zero record (00:00, value 0) for each day in days, like the
+        fill records of the 'f' option in the raw data, and extend the
+        daily range to the last of them
+    """
+    days = [d for d in days if len(df) == 0 or d > df.index[-1]]
+    if not days:
+        return df
+
+    row = {}
+    for col in columns:
+        row.update({col + '_min': 0.0, col + '_max': 0.0, col + '_mean': 0.0,
+                    col + '_sum': 0.0, col + '_count': 1.0})
+    if 'outside_air_temp_trope' in df.columns:
+        row.update({'outside_air_temp_am': 0.0, 'outside_air_temp_trope': 0.0})
+
+    fill = pd.DataFrame([row] * len(days), index=pd.DatetimeIndex(days, name='timestamp'))
+    df   = pd.concat([df, fill[[c for c in fill.columns if c in df.columns]]])
+    return df.reindex(pd.date_range(df.index[0], df.index[-1], freq='D', name='timestamp'))
+
+
+#-------------------------------------------------------------------------------
+# persisted daily summary
+
+def daily_name(yymm):
+    return archive_dir(yymm) + 'daily.npy'
+
+
+def rollup_month(yymm, block):
+    """ full daily summary record array of one month block
+    """
+    # same rounding as load_wx, so the summary matches the raw data path
+    values = dict((c, np.round(np.asarray(block[c], dtype=np.float64), ARCHIVE_DECIMALS))
+                  for c in WX_COLUMNS[1:])
+    days, out = daily_rollup(block['timestamp'], values, WX_COLUMNS[1:], DAILY_AGGS, trope=True)
+
+    rec = np.empty(len(days), dtype=DAILY_DTYPE)
+    rec['day'] = days
+    for name, typ in DAILY_DTYPE[1:]:
+        rec[name] = out[name]
+    return rec
+
+
+def read_daily_current(yymm):
+    """ daily summary of the current month from the ingest journal
+        only days with records added since the last run are rolled up
+        returns None if there is no csv for this month
+    """
+    from wxingest import INGESTPATH, JOURNAL_DTYPE, ingest, journal_name, purge
+
+    purge()
+    state = ingest(yymm)
+    if state is None:
+        return None
+
+    dfile = INGESTPATH + yymm + '.daily.npy'
+    sfile = INGESTPATH + yymm + '.daily.json'
+
+    rows = state['rows']
+    if rows == 0:
+        return np.empty(0, dtype=DAILY_DTYPE)
+    jrec = np.memmap(journal_name(yymm), dtype=JOURNAL_DTYPE, mode='r', shape=(rows,))
+
+    # summary is only valid for the same journal, check the last rolled up record
+    try:
+        with open(sfile, 'r') as f:
+            done = json.load(f)
+        prev = np.load(dfile)
+        if done['inode'] != state['inode'] or done['rows'] > rows or \
+           (done['rows'] and int(jrec['timestamp'][done['rows'] - 1]) != done['last_ts']):
+            prev = None
+    except (OSError, ValueError, KeyError):
+        prev = None
+
+    if prev is None:
+        done = {'rows': 0}
+        prev = np.empty(0, dtype=DAILY_DTYPE)
+    elif done['rows'] == rows:
+        return prev
+
+    # new records usually belong to today, roll up from the first dirty day
+    dirty = int(day_keys(jrec['timestamp'][done['rows']:].min()))
+    ts    = np.asarray(jrec['timestamp'])
+    sel   = np.flatnonzero(ts >= dirty * 86400)
+    order = sel[np.argsort(ts[sel], kind='stable')]
+
+    block = dict((c, np.asarray(jrec[c])[order]) for c in WX_COLUMNS)
+    print_dbg(DEBUG, 'DEBUG: %s: rolling up %s records from day %s' % (yymm, len(order), dirty))
+
+    rec = np.concatenate([prev[prev['day'] < dirty], rollup_month(yymm, block)])
+
+    np.save(dfile + '.tmp.npy', rec)
+    os.replace(dfile + '.tmp.npy', dfile)
+    with open(sfile + '.tmp', 'w') as f:
+        json.dump({'rows': rows, 'last_ts': int(jrec['timestamp'][rows - 1]), 'inode': state['inode']}, f)
+    os.replace(sfile + '.tmp', sfile)
+
+    return rec
+
+
+def read_daily_month(yymm, fill_missing=False):
+    """ daily summary of one month, persisted for closed months,
+        incremental for the current month
+        returns None if there is no data
+    """
+    dfile = daily_name(yymm)
+    meta  = archive_dir(yymm) + 'meta.json'
+
+    if is_closed(yymm) and os.path.isfile(dfile) and os.path.isfile(meta) \
+       and os.path.getmtime(dfile) >= os.path.getmtime(meta):
+        return np.load(dfile)
+
+    if USE_INGEST and not is_closed(yymm):
+        try:
+            rec = read_daily_current(yymm)
+            if rec is not None:
+                return rec
+        except Exception as e:
+            print_dbg(True, 'WARN : daily summary %s failed, using csv: %s' % (yymm, e))
+
+    block = read_month(yymm, WX_COLUMNS[1:])
+    if block is None:
+        if not fill_missing:
+            return None
+        print_dbg(True, 'WARN : missing data for %s, adding dummy record' % yymm)
+        return rollup_month(yymm, dummy_month(yymm, WX_COLUMNS[1:]))
+
+    rec = rollup_month(yymm, block)
+
+    # archive exists now for a closed month, keep the summary
+    if is_closed(yymm) and os.path.isfile(meta):
+        print_dbg(DEBUG, 'DEBUG: saving daily summary %s' % yymm)
+        np.save(dfile, rec)
+
+    return rec
+
+
+@timed('load')
+def load_daily(start, end, columns=None, fill_missing=False):
+    """ daily summary between start and end (days, both included)
+        returns a DataFrame with daily index and for every column
+        <column>_min, _max, _mean, _sum, _count
+        outside_air_temp_trope if outside_air_temp is requested
+    """
+    columns = wx_columns(columns)
+
+    d0 = day_keys(to_epoch(datetime(start.year, start.month, start.day)))
+    d1 = day_keys(to_epoch(datetime(end.year, end.month, end.day)))
+
+    parts = []
+    for yymm in month_range(start, end):
+        rec = read_daily_month(yymm, fill_missing)
+        if rec is not None:
+            parts.append(rec[(rec['day'] >= d0) & (rec['day'] <= d1)])
+
+    rec = np.concatenate(parts) if parts else np.empty(0, dtype=DAILY_DTYPE)
+
+    names = [c + '_' + a for c in columns for a in DAILY_AGGS]
+    trope = 'outside_air_temp' in columns
+    if trope:
+        names += ['outside_air_temp_am', 'outside_air_temp_pm']
+
+    df = to_frame(rec['day'], dict((n, rec[n]) for n in names), columns)
+
+    if trope:
+        df = add_trope(df)
+
+    return df
+
+
+def refresh_all():
+    """ daily summaries of all closed months found in CSVPATH and the current month
+    """
+    archive_all()
+
+    suffix = '-' + config.CSVFILESUFFIX
+    months = sorted(fn[:7] for fn in os.listdir(config.CSVPATH) if fn.endswith(suffix))
+    for yymm in months:
+        try:
+            read_daily_month(yymm)
+        except Exception as e:
+            print_dbg(True, 'ERROR: daily summary %s: %s' % (yymm, e))
+
+    return
+
+
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-m YYYY-MM]\n\n"
+    msg += "\t\t-m --month   :\t refresh only month YYYY-MM, default all months\n"
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+
+#-------------------------------------------------------------------------------
+
+def main():
+    month = None
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hm:", ["help", "month="])
+    except getopt.GetoptError as err:
+        print_dbg(True, "ERROR: %s" % err)
+        usage()
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-m", "--month"):
+            month = a
+        else:
+            assert False, "unhandled option"
+
+    if month:
+        rec = read_daily_month(month)
+        print_dbg(True, 'INFO : %s: %s days' % (month, 0 if rec is None else len(rec)))
+    else:
+        refresh_all()
+
+    print_dbg(True, 'INFO : Done.')
+
+
+if __name__ == '__main__':
+    main()
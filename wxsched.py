@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        wxsched.py
+# Purpose:     resident scheduler for the plot scripts
+#
+# Runs the plot scripts of the addon on their intervals in one process,
+# instead of one cron process per script. wospi, numpy, pandas and
+# matplotlib are imported once and the months read by wxarchive.load_wx
+# stay in memory (WX_CACHE), so a job only pays for its own work.
+#
+# A job is the script as it is called by cron: the module is (re)loaded
+# with sys.argv set to its arguments and main() is called, the old scripts
+# without main() run when they are loaded. The scripts are not changed,
+# cron can still call them directly, e.g. while the scheduler is stopped.
+#
+# Jobs run one after the other. A job is due at midnight + offset +
+# n * interval (minutes, local time); a job that is late runs once.
+# The jobs can be set in config.py:
+#
+#   SCHED_JOBS = [ (name, script, [args], interval, offset), ... ]
+#
+# usage:
+#   python wxsched.py                 ... run the scheduler
+#   python wxsched.py -l              ... list the jobs and the next runs
+#   python wxsched.py -r plotUV,...   ... run the jobs once now and exit
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import config
+import os, sys
+import gc
+import getopt
+import importlib
+import signal
+import time
+import traceback
+from datetime import datetime, timedelta
+
+# the months of the jobs are kept in memory, before wxarchive is imported
+config.WX_CACHE = getattr(config, 'WX_CACHE', True)
+
+# from local module
+import wxtools
+from wxtools import print_dbg
+
+#-------------------------------------------------------------------------------
+
+# the scripts live in sub directories of the repo, on the station in HOMEPATH
+BASEDIR = os.path.dirname(os.path.abspath(__file__))
+
+# name, script, arguments, interval and offset in minutes
+SCHED_JOBS = getattr(config, 'SCHED_JOBS', [
+    ('plot24',         'plot24/testPlot.py',               [],                     10,    0),
+    ('plotBaroWeek',   'plotbaroweek/plotBaroWeek.py',     [],                     60,    2),
+    ('plotSoCTemp',    'plotsoc/plotSoCTemp.py',           [],                     60,    4),
+    ('plotUptime',     'plotuptime/plotUptime.py',         [],                     60,    6),
+    ('plotInternal',   'plotinternal/plotInternal.py',     [],                     60,    8),
+    ('plotMinMaxTemp', 'plotminmaxtemp/plotMinMaxTemp.py', [],                     1440,  15),
+    ('plotSolar',      'plotsolar/plotSolar.py',           [],                     1440,  17),
+    ('plotTempSolar',  'plottempsolar/plotTempSolar.py',   [],                     1440,  19),
+    ('plotAnnualWind', 'plotannualwind/plotAnnualWind.py', [],                     1440,  21),
+    ('plotUV',         'plotuv/plotUV.py',                 ['-c', '-i', 'y'],      1440,  23),
+    ('plotStatistics', 'plotstatistics/plotStatistics.py', ['-c', '-f', '-i', 'y'], 1440, 25),
+    ('plotSunshine',   'plotsun/plotSunshine.py',          ['-a', 'y'],            1440,  30),
+])
+
+# longest sleep, the clock is checked again after it (e.g. after a suspend)
+MAX_SLEEP = 60
+
+INFO  = True
+DEBUG = False
+
+_stop = False
+
+#-------------------------------------------------------------------------------
+
+def script_path(script):
+    """ the script in HOMEPATH (station) or in its repo sub directory
+    """
+    flat = os.path.join(BASEDIR, os.path.basename(script))
+    if os.path.isfile(flat):
+        return flat
+    return os.path.join(BASEDIR, script)
+
+
+def next_run(job, now):
+    """ next time the job is due after now
+    """
+    name, script, args, interval, offset = job
+
+    t = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(minutes=offset)
+    while t <= now:
+        t += timedelta(minutes=interval)
+    return t
+
+
+def run_job(job):
+    """ run one job in this process, returns 0 if ok
+    """
+    name, script, args, interval, offset = job
+
+    path = script_path(script)
+    if not os.path.isfile(path):
+        print_dbg(True, "ERROR: %s: script %s not found" % (name, path))
+        return 1
+
+    # the script and its local modules are imported from its directory
+    sdir = os.path.dirname(path)
+    if sdir not in sys.path:
+        sys.path.append(sdir)
+
+    modname = os.path.splitext(os.path.basename(path))[0]
+    argv = sys.argv
+    sys.argv = [path] + list(args)
+    wxtools.resetTiming()
+
+    print_dbg(INFO, "INFO : start %s %s" % (name, ' '.join(args)))
+    t0 = time.time()
+    el = 0
+    try:
+        # load again, the module level settings and dates are fresh for every run
+        if modname in sys.modules:
+            module = importlib.reload(sys.modules[modname])
+        else:
+            module = importlib.import_module(modname)
+
+        if hasattr(module, 'main'):
+            module.main()
+
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print_dbg(True, "ERROR: %s exit with %s" % (name, e.code))
+            el = 1
+    except Exception as e:
+        print_dbg(True, "ERROR: %s: %s" % (name, e))
+        print_dbg(DEBUG, traceback.format_exc())
+        el = 1
+
+    finally:
+        # what cron runs get at exit
+        wxtools.flushUploads()
+        wxtools.writeTiming()
+        sys.argv = argv
+
+        if 'matplotlib.pyplot' in sys.modules:
+            sys.modules['matplotlib.pyplot'].close('all')
+        gc.collect()
+
+    print_dbg(INFO, "INFO : done  %s in %.1fs" % (name, time.time() - t0))
+    return el
+
+
+def preload():
+    """ import the heavy modules once, while no job is waiting
+    """
+    for name in ['wospi', 'numpy', 'pandas', 'matplotlib.pyplot']:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print_dbg(True, "WARN : preload %s: %s" % (name, e))
+    return
+
+
+def stop(signum, frame):
+    """ finish the running job, then exit
+    """
+    global _stop
+
+    print_dbg(INFO, "INFO : signal %d, stopping" % signum)
+    _stop = True
+    return
+
+
+def schedule(jobs):
+    """ run the jobs on their intervals until SIGTERM or SIGINT
+    """
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    preload()
+
+    now = datetime.now()
+    due = dict((job[0], next_run(job, now)) for job in jobs)
+    print_dbg(INFO, "INFO : %d jobs scheduled" % len(jobs))
+
+    while not _stop:
+        now = datetime.now()
+        for job in jobs:
+            if _stop:
+                break
+            if due[job[0]] <= now:
+                run_job(job)
+                due[job[0]] = next_run(job, datetime.now())
+
+        if _stop:
+            break
+
+        wait = (min(due.values()) - datetime.now()).total_seconds()
+        if wait > 0:
+            time.sleep(min(wait, MAX_SLEEP))
+
+    print_dbg(INFO, "INFO : Done.")
+    return
+
+
+def list_jobs(jobs):
+    """ print the jobs and their next run
+    """
+    now = datetime.now()
+    print("%-16s %-36s %-14s %8s %6s  %s" % ('name', 'script', 'args', 'interval', 'offset', 'next run'))
+    for job in jobs:
+        name, script, args, interval, offset = job
+        print("%-16s %-36s %-14s %8d %6d  %s" % (name, script, ' '.join(args), interval, offset,
+                                                   next_run(job, now).strftime('%d.%m.%Y %H:%M')))
+    return
+
+
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-l] [-r job,...]\n\n"
+    msg += "\t\t-l --list    :\t list the jobs and their next run\n"
+    msg += "\t\t-r --run     :\t run these jobs now and exit\n"
+    msg += "\n"
+    msg += "\twithout options the jobs are run on their intervals until SIGTERM\n"
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+#-------------------------------------------------------------------------------
+
+def main():
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hlr:", ["help", "list", "run="])
+    except getopt.GetoptError as err:
+        print_dbg(True, "ERROR: %s" % err)
+        usage()
+
+    jobs = [tuple(job) for job in SCHED_JOBS]
+    names = [job[0] for job in jobs]
+
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-l", "--list"):
+            list_jobs(jobs)
+            return
+        elif o in ("-r", "--run"):
+            unknown = [n for n in a.split(',') if n not in names]
+            if unknown:
+                print_dbg(True, "ERROR: unknown job(s): %s" % ', '.join(unknown))
+                usage()
+            el = 0
+            for n in a.split(','):
+                el |= run_job(jobs[names.index(n)])
+            sys.exit(el)
+        else:
+            assert False, "unhandled option"
+
+    schedule(jobs)
+
+
+if __name__ == '__main__':
+    main()
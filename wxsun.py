@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf8 -*-
+#-------------------------------------------------------------------------------
+# Name:        wxsun.py
+# Purpose:     sunrise, sunset, solar noon and solar elevation, offline
+#
+# The sun times of a whole year are computed in one vectorized call with
+# the NOAA solar equations (Meeus), accurate to about a minute for the
+# years the station is running. No web service and no ephem is needed.
+#
+#   sun_year(year)              ... dict of arrays, one entry per day:
+#       date        datetime64[D]
+#       sunrise     local time in hours, NaN in polar night/day
+#       sunset      local time in hours, NaN in polar night/day
+#       noon        local time of the solar noon in hours
+#       daylength   hours, refraction and sun disc included
+#       elevation   elevation of the sun at noon in degrees
+#
+# A year is computed once per site and kept in memory (the scheduler runs
+# the sun plots in one process). The times are local time of the station,
+# like the times wospi writes to SUNTIMEFILE, or SUN_UTCOFFSET hours from
+# UTC if it is set in config.py.
+#
+# usage:
+#   from wxsun import sun_range, solar_elevation
+#   sun = sun_range(date(2026, 1, 1), date.today())
+#   elev = solar_elevation(epoch)              ... epoch seconds (UTC)
+#
+#   python wxsun.py [-y yyyy]     ... print the sun times of a year
+#
+# Configuration options in config.py
+#   MYPOSITION     ... position of the station, e.g. "N 48*20.29'  E 016*03.30'"
+#   SUN_UTCOFFSET  ... optional, fixed offset of the times in hours
+#
+# depends on:  numpy
+#
+# used for:
+#   WOSPi by Torkel M. Jodalen <tmj@bitwrap.no>
+#   http://www.annoyingdesigns.com  -  http://www.bitwrap.no
+#
+# Author:      Peter Lidauer <plix1014@gmail.com>
+#
+# Created:     17.10.2026
+# Copyright:   (c) Peter Lidauer 2026
+# Licence:     CC BY-NC-SA http://creativecommons.org/licenses/by-nc-sa/4.0/
+#-------------------------------------------------------------------------------
+# Changes:
+
+import config
+import sys
+import getopt
+import re
+import time
+from datetime import date
+
+# from local module
+from wxtools import print_dbg, lazy_module
+
+# numpy, imported on first use
+np = lazy_module('numpy')
+
+#-------------------------------------------------------------------------------
+
+MYPOSITION    = getattr(config, 'MYPOSITION', '')
+
+# None: local time of the station (with daylight saving time)
+SUN_UTCOFFSET = getattr(config, 'SUN_UTCOFFSET', None)
+
+# zenith of sunrise and sunset: refraction and radius of the sun disc
+SUN_ZENITH = 90.833
+
+# julian day of 1970-01-01 00:00 UTC
+JD_EPOCH = 2440587.5
+
+DEBUG = False
+
+# (latitude, longitude, year, utc offset) -> sun times of the year
+_SUN_CACHE = {}
+
+#-------------------------------------------------------------------------------
+
+def parse_position(position_str):
+    """ MYPOSITION string to decimal degrees, (48.0, 16.0) if it cannot be parsed
+    """
+    position_str = position_str.upper().strip()
+
+    # Pattern for: N 48*00.12'  E 016*00.101'
+    pattern = r'([NS])\s*([\d.]+)[\*°]\s*([\d.]+)?\'?\s*([EW])\s*([\d.]+)[\*°]\s*([\d.]+)?\'?'
+    match = re.search(pattern, position_str)
+
+    if match:
+        lat_dir, lat_deg, lat_min, lon_dir, lon_deg, lon_min = match.groups()
+
+        lat_deg = float(lat_deg) if lat_deg else 0
+        lat_min = float(lat_min) if lat_min else 0
+        lon_deg = float(lon_deg) if lon_deg else 0
+        lon_min = float(lon_min) if lon_min else 0
+
+        latitude = lat_deg + lat_min/60.0
+        if lat_dir == 'S':
+            latitude = -latitude
+
+        longitude = lon_deg + lon_min/60.0
+        if lon_dir == 'W':
+            longitude = -longitude
+
+        return latitude, longitude
+
+    # Default fallback
+    return 48.0, 16.0
+
+
+def site():
+    """ latitude and longitude of the station
+    """
+    return parse_position(MYPOSITION)
+
+
+def sun_position(jd):
+    """ declination (radians), equation of time (minutes) and apparent
+        longitude (degrees) of the sun at julian days jd (array)
+    """
+    T = (jd - 2451545.0) / 36525.0
+
+    L0 = np.radians((280.46646 + T * (36000.76983 + T * 0.0003032)) % 360)
+    M  = np.radians(357.52911 + T * (35999.05029 - T * 0.0001537))
+    e  = 0.016708634 - T * (0.000042037 + T * 0.0000001267)
+
+    # equation of center, true and apparent longitude
+    C = (np.sin(M) * (1.914602 - T * (0.004817 + T * 0.000014))
+         + np.sin(2 * M) * (0.019993 - T * 0.000101)
+         + np.sin(3 * M) * 0.000289)
+    omega    = np.radians(125.04 - 1934.136 * T)
+    app_long = np.degrees(L0) + C - 0.00569 - 0.00478 * np.sin(omega)
+
+    # obliquity of the ecliptic
+    eps0 = 23 + (26 + (21.448 - T * (46.815 + T * (0.00059 - T * 0.001813))) / 60) / 60
+    eps  = np.radians(eps0 + 0.00256 * np.cos(omega))
+
+    decl = np.arcsin(np.sin(eps) * np.sin(np.radians(app_long)))
+
+    y = np.tan(eps / 2) ** 2
+    eqtime = 4 * np.degrees(y * np.sin(2 * L0)
+                            - 2 * e * np.sin(M)
+                            + 4 * e * y * np.sin(M) * np.cos(2 * L0)
+                            - 0.5 * y * y * np.sin(4 * L0)
+                            - 1.25 * e * e * np.sin(2 * M))
+
+    return decl, eqtime, app_long % 360
+
+
+def hour_angle(lat, decl, zenith=SUN_ZENITH):
+    """ hour angle of the sun at zenith in degrees, NaN if it does not get there
+    """
+    lat = np.radians(lat)
+    cos_ha = (np.cos(np.radians(zenith)) / (np.cos(lat) * np.cos(decl))
+              - np.tan(lat) * np.tan(decl))
+    with np.errstate(invalid='ignore'):
+        return np.degrees(np.arccos(cos_ha)), cos_ha
+
+
+def utc_offsets(days):
+    """ utc offset (seconds) of the local time at noon of the days (days since epoch)
+        the offset only changes at the dst switches, a day per week is looked up
+        and the switch is searched only in the weeks where it changed
+    """
+    n = len(days)
+    if SUN_UTCOFFSET is not None:
+        return np.full(n, int(float(SUN_UTCOFFSET) * 3600), dtype=np.int64)
+
+    def gmtoff(i):
+        return time.localtime(int(days[i]) * 86400 + 43200).tm_gmtoff
+
+    probe = sorted(set(range(0, n, 7)) | {n - 1})
+    off   = np.empty(n, dtype=np.int64)
+    for a, b in zip(probe[:-1], probe[1:]):
+        oa, ob = gmtoff(a), gmtoff(b)
+        off[a:b + 1] = oa
+        if oa != ob:
+            # first day with the new offset
+            lo, hi = a, b
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if gmtoff(mid) == oa:
+                    lo = mid
+                else:
+                    hi = mid
+            off[hi:b + 1] = ob
+    if n == 1:
+        off[0] = gmtoff(0)
+
+    return off
+
+
+def sun_times(lat, lon, days):
+    """ sun times of the days (days since epoch, array), see sun_year
+    """
+    days = np.asarray(days, dtype=np.int64)
+    jd0  = days + JD_EPOCH
+
+    # solar noon, the sun at noon of the day and again at the noon found
+    decl, eqtime, _ = sun_position(jd0 + 0.5 - lon / 360.0)
+    noon = 720 - 4 * lon - eqtime
+    decl, eqtime, _ = sun_position(jd0 + noon / 1440.0)
+    noon = 720 - 4 * lon - eqtime
+
+    # sunrise and sunset (minutes UTC), the sun at the first guess of each
+    ha, cos_ha = hour_angle(lat, decl)
+    ha = np.nan_to_num(ha)
+    decl_r, eqtime_r, _ = sun_position(jd0 + (noon - 4 * ha) / 1440.0)
+    decl_s, eqtime_s, _ = sun_position(jd0 + (noon + 4 * ha) / 1440.0)
+    rise = 720 - 4 * (lon + hour_angle(lat, decl_r)[0]) - eqtime_r
+    sset = 720 - 4 * (lon - hour_angle(lat, decl_s)[0]) - eqtime_s
+
+    # polar day or night
+    daylength = (sset - rise) / 60.0
+    daylength = np.where(np.isnan(daylength), np.where(cos_ha < 0, 24.0, 0.0), daylength)
+
+    local = utc_offsets(days) / 60.0
+
+    return { 'date':      days.astype('datetime64[D]'),
+             'sunrise':   (rise + local) / 60.0,
+             'sunset':    (sset + local) / 60.0,
+             'noon':      (noon + local) / 60.0,
+             'daylength': daylength,
+             'elevation': 90.0 - np.abs(lat - np.degrees(decl)) }
+
+
+def sun_year(year, lat=None, lon=None):
+    """ sun times of every day of the year at the station (or lat, lon)
+        computed once per site and year
+    """
+    if lat is None or lon is None:
+        lat, lon = site()
+
+    key = (lat, lon, year, SUN_UTCOFFSET)
+    if key not in _SUN_CACHE:
+        first = np.datetime64('%04d-01-01' % year, 'D').astype(np.int64)
+        last  = np.datetime64('%04d-01-01' % (year + 1), 'D').astype(np.int64)
+        _SUN_CACHE[key] = sun_times(lat, lon, np.arange(first, last))
+        print_dbg(DEBUG, "DEBUG: sun times of %s at %.4f, %.4f" % (year, lat, lon))
+
+    return _SUN_CACHE[key]
+
+
+def sun_range(start, end, lat=None, lon=None):
+    """ sun times of the days from start to end (dates, inclusive)
+    """
+    years = [sun_year(y, lat, lon) for y in range(start.year, end.year + 1)]
+    sun   = dict((k, np.concatenate([s[k] for s in years])) for k in years[0])
+
+    sel = (sun['date'] >= np.datetime64(start, 'D')) & (sun['date'] <= np.datetime64(end, 'D'))
+    return dict((k, v[sel]) for k, v in sun.items())
+
+
+def solar_elevation(epoch, lat=None, lon=None):
+    """ elevation of the sun in degrees at epoch (seconds UTC, array),
+        geometric, without refraction
+    """
+    if lat is None or lon is None:
+        lat, lon = site()
+
+    epoch = np.asarray(epoch, dtype=np.float64)
+    decl, eqtime, _ = sun_position(epoch / 86400.0 + JD_EPOCH)
+
+    # true solar time in minutes and hour angle
+    tst = (epoch % 86400) / 60.0 + eqtime + 4 * lon
+    ha  = np.radians(tst / 4.0 - 180.0)
+
+    lat = np.radians(lat)
+    cos_zen = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(ha)
+
+    return 90.0 - np.degrees(np.arccos(np.clip(cos_zen, -1, 1)))
+
+
+def seasons(before):
+    """ dates (UTC) of the last spring equinox, summer solstice, autumnal
+        equinox and winter solstice before the date
+    """
+    last = np.datetime64(before, 'D').astype(np.int64)
+    days = np.arange(last - 366, last + 1)
+    _, _, app_long = sun_position(days + JD_EPOCH)
+
+    # quarter of the ecliptic at 0h UTC, the event is on the day before a change
+    quarter = (app_long // 90).astype(np.int64)
+    change  = np.flatnonzero(quarter[1:] != quarter[:-1])
+
+    found = {}
+    for i in change:
+        found[int(quarter[i + 1])] = days[i]
+
+    # spring starts at 0°, summer at 90°, ...
+    return [found[q].astype('datetime64[D]').item() for q in (0, 1, 2, 3)]
+
+
+def hhmm(hours):
+    """ hours to 'HH:MM', '--:--' if there is no time
+    """
+    if hours != hours:
+        return '--:--'
+    minutes = int(round(hours * 60))
+    return '%02d:%02d' % (minutes // 60, minutes % 60)
+
+
+def usage():
+    """ show all options
+    """
+    msg  = "\nusage: " + __file__ + " [-y yyyy]\n\n"
+    msg += "\t\t-y --year    :\t year of the sun times, default current year\n"
+    msg += "\n"
+
+    print(msg)
+    sys.exit(10)
+    return
+
+#-------------------------------------------------------------------------------
+
+def main():
+    year = date.today().year
+
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "hy:", ["help", "year="])
+    except getopt.GetoptError as err:
+        print_dbg(True, "ERROR: %s" % err)
+        usage()
+    for o, a in opts:
+        if o in ("-h", "--help"):
+            usage()
+        elif o in ("-y", "--year"):
+            if not a.isdigit():
+                usage()
+            year = int(a)
+        else:
+            assert False, "unhandled option"
+
+    lat, lon = site()
+    sun = sun_year(year)
+
+    print("# %.4f, %.4f" % (lat, lon))
+    print("Date       Sunrise Sunset Noon   Length Elevation")
+    for i, d in enumerate(sun['date'].tolist()):
+        print("%s %s   %s  %s  %5.2f  %5.1f" % (d.strftime('%d.%m.%Y'),
+              hhmm(sun['sunrise'][i]), hhmm(sun['sunset'][i]), hhmm(sun['noon'][i]),
+              sun['daylength'][i], sun['elevation'][i]))
+
+    print("# spring, summer, autumn, winter: %s" % ' '.join(str(d) for d in seasons(date.today())))
+
+
+if __name__ == '__main__':
+    main()
@@ -23,10 +23,17 @@
 
 import config
 import os, sys
+import atexit
+import functools
+import hashlib
+import importlib
+import json
+import resource
 import subprocess
 import shutil
 import re
 import time
+import types
 from datetime import date, timedelta, datetime
 
 
@@ -64,52 +71,336 @@ def print_dbg(level,msg):
     return
 
 
-def runGnuPlot(plt, KEEP_TMP=False, LEVEL1=False, LEVEL2=False):
-    """ run gnuplot
-        TODO: parse output
+#-------------------------------------------------------------------------------
+# lazy imports
+#
+# numpy, pandas and matplotlib take seconds to import on a Pi. The cron
+# scripts bind them with
+#
+#   pd = lazy_module('pandas')
+#
+# and the import happens on the first attribute access, so --help, argument
+# errors and runs without data do not pay for it.
+
+class lazy_module(types.ModuleType):
+    """ stand-in for a module, imported on first use
     """
-    # full error message
-    re_stderr = re.compile(r'^.*,\s+(line\s+\d+):\s+(.*)')
-    el = 0
+    def __init__(self, name):
+        super().__init__(name)
 
-    inFile = config.TMPPATH + 'plot' + plt + '.plt'
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # later lookups are found without __getattr__
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
 
-    gnuplot = '/usr/bin/gnuplot'
 
-    if os.path.exists(gnuplot):
-        print_dbg(LEVEL1,"runGnuPlot: plot png " + plt)
-        try:
-            proc_out = subprocess.Popen([gnuplot, inFile], stdout=subprocess.PIPE,stderr=subprocess.PIPE)
-
-            output = proc_out.stdout.readlines()
-            outerr = proc_out.stderr.readlines()
-
-            for line in outerr:
-                line = line.decode('latin1').strip()
-                m = re.search(re_stderr, line)
-                if m:
-                    print_dbg(True, "STDERR: %s" % line)
-                    if re.search("warning:",line):
-                        # we ignore warning errors
-                        pass
-                    else:
-                        raise ValueError('syntax or plot error in gnuplot file')
-                    el = 1
-
-            if LEVEL2:
-                for n in output:
-                    print_dbg(True, "STDOUT: %s" % n.strip())
-                for n in outerr:
-                    print_dbg(True, "STDERR: %s" % n.strip())
+#-------------------------------------------------------------------------------
+# timing
+#
+# phases of a run (load, compute, plot, upload) are measured with
+#
+#   with timed('load', 'wxdata'):           @timed('compute')
+#       ...                                 def temp_stats(...):
+#
+# at exit one json line per run is appended to TIMINGLOG:
+#   script, args, start, wall/cpu seconds, child cpu (gnuplot, scp),
+#   peak rss in kB, the wall time per phase and the single spans
 
-        except Exception as e:
-            print_dbg(True, 'WARN : GnuPlot done with exception(s): %s.' % e)
-            el = 1
+USE_TIMING   = getattr(config, 'USE_TIMING', True)
+TIMINGLOG    = getattr(config, 'TIMINGLOG', config.TMPPATH + 'wxtiming.log')
 
-    else:
-        print_dbg(True,"ERROR: gnuplot command '%s' not found." % gnuplot)
+# the log is moved to TIMINGLOG.1 when it gets larger
+TIMINGLOG_MAX = 1024 * 1024
+
+# print every span when it ends
+TIMING_TRACE = False
+
+_spans = []
+_active = []
+
+def _usage():
+    """ wall, cpu, child cpu and peak rss (kB) of the process so far
+    """
+    me = resource.getrusage(resource.RUSAGE_SELF)
+    ch = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.time(), me.ru_utime + me.ru_stime, ch.ru_utime + ch.ru_stime, me.ru_maxrss
+
+
+class timed:
+    """ timing span, context manager or decorator
+        phase ... 'load', 'compute', 'plot', 'upload' or any other name
+        name  ... what was done, the function name for a decorator
+    """
+    def __init__(self, phase, name=None):
+        self.phase = phase
+        self.name  = name
+
+    def __enter__(self):
+        self.parents = [s.phase for s in _active]
+        _active.append(self)
+        self.start = _usage()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = _usage()
+        _active.remove(self)
+
+        span = { 'phase':  self.phase,
+                 'name':   self.name,
+                 'depth':  len(self.parents),
+                 'nested': self.phase in self.parents,
+                 'wall':   round(end[0] - self.start[0], 4),
+                 'cpu':    round(end[1] - self.start[1], 4),
+                 'child':  round(end[2] - self.start[2], 4),
+                 'maxrss': end[3] }
+        if exc_type is not None:
+            span['error'] = exc_type.__name__
+
+        # repeated calls (e.g. one load per month) are one span with a count
+        last = _spans[-1] if _spans else None
+        if last is not None and 'error' not in span and 'error' not in last and \
+           all(last[k] == span[k] for k in ('phase', 'name', 'depth', 'nested')):
+            for k in ('wall', 'cpu', 'child'):
+                last[k] = round(last[k] + span[k], 4)
+            last['maxrss'] = span['maxrss']
+            last['count']  = last.get('count', 1) + 1
+        else:
+            _spans.append(span)
+
+        print_dbg(TIMING_TRACE, "TIME : %-8s %-30s wall %.3fs, cpu %.3fs, maxrss %d kB"
+                  % (self.phase, self.name, span['wall'], span['cpu'], span['maxrss']))
+        return False
+
+    def __call__(self, func):
+        name = self.name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.phase, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+_run_start = _usage()
+
+def writeTiming():
+    """ append the timing of this run to TIMINGLOG
+    """
+    if not USE_TIMING or not TIMINGLOG:
+        return
+
+    end = _usage()
+
+    # wall time per phase, a span inside a span of the same phase is counted once
+    phases = {}
+    for span in _spans:
+        if not span['nested']:
+            phases[span['phase']] = round(phases.get(span['phase'], 0.0) + span['wall'], 4)
+
+    run = { 'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python',
+            'args':   sys.argv[1:],
+            'pid':    os.getpid(),
+            'start':  datetime.fromtimestamp(_run_start[0]).strftime('%Y-%m-%d %H:%M:%S'),
+            'wall':   round(end[0] - _run_start[0], 4),
+            'cpu':    round(end[1] - _run_start[1], 4),
+            'child':  round(end[2] - _run_start[2], 4),
+            'maxrss': end[3],
+            'phases': phases,
+            'spans':  _spans }
+
+    try:
+        if os.path.isfile(TIMINGLOG) and os.path.getsize(TIMINGLOG) > TIMINGLOG_MAX:
+            os.replace(TIMINGLOG, TIMINGLOG + '.1')
+
+        # one line per run, cron jobs may write at the same time
+        with open(TIMINGLOG, 'a') as f:
+            f.write(json.dumps(run) + '\n')
+
+    except Exception as e:
+        print_dbg(True, 'WARN : cannot write timing log %s: %s' % (TIMINGLOG, e))
+
+    return
+
+
+def resetTiming():
+    """ start a new run, for processes with more than one run (wxsched.py)
+    """
+    global _run_start
+
+    del _spans[:]
+    _run_start = _usage()
+    return
+
+# registered first, so it runs after the exit handlers of the plots and uploads
+if USE_TIMING:
+    atexit.register(writeTiming)
+
+
+def timingReport(logfile=TIMINGLOG):
+    """ summary of the timing log per script: runs, wall, cpu and rss
+    """
+    runs = {}
+    with open(logfile, 'r') as f:
+        for line in f:
+            try:
+                run = json.loads(line)
+            except ValueError:
+                continue
+            runs.setdefault(run['script'], []).append(run)
+
+    print("%-24s %5s %9s %9s %9s %9s %10s  %s" % ('script', 'runs', 'wall', 'max wall', 'cpu', 'child', 'maxrss kB', 'phases (avg wall)'))
+    for script in sorted(runs, key=lambda k: -sum(r['cpu'] + r['child'] for r in runs[k])):
+        rr = runs[script]
+        n  = len(rr)
+        phases = {}
+        for r in rr:
+            for k, v in r['phases'].items():
+                phases[k] = phases.get(k, 0.0) + v
+        print("%-24s %5d %8.2fs %8.2fs %8.2fs %8.2fs %10d  %s" % (script, n,
+              sum(r['wall'] for r in rr) / n, max(r['wall'] for r in rr),
+              sum(r['cpu'] for r in rr) / n, sum(r['child'] for r in rr) / n,
+              max(r['maxrss'] for r in rr),
+              ', '.join('%s %.2fs' % (k, v / n) for k, v in sorted(phases.items()))))
+
+    return
+
+
+#-------------------------------------------------------------------------------
+# gnuplot
+
+GNUPLOT = '/usr/bin/gnuplot'
+
+# keep one gnuplot process for all plots of a run instead of one per plot
+USE_GNUPLOT_SERVER = True
+
+# gnuplot error message: "file.plt", line 12: ...
+RE_GNUPLOT_ERR = re.compile(r'^.*,?\s+(line\s+\d+):\s+(.*)')
+
+
+class GnuPlotServer:
+    """ long running gnuplot, scripts are loaded over a pipe
+        '-' keeps gnuplot in interactive mode, an error in a script
+        does not terminate the process
+    """
+    MARK = '__WXTOOLS_PLOT_DONE__'
+
+    def __init__(self, gnuplot=GNUPLOT):
+        self.proc = subprocess.Popen([gnuplot, '-'], stdin=subprocess.PIPE,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def run(self, inFile):
+        """ load one script, returns the stderr lines of this script
+        """
+        # reset keeps terminal and output, unset output closes the png
+        cmd  = "reset\n"
+        cmd += "load '%s'\n" % inFile.replace("'", "''")
+        cmd += "unset output\n"
+        cmd += "print '%s'\n" % self.MARK
+        self.proc.stdin.write(cmd.encode('latin1'))
+        self.proc.stdin.flush()
+
+        outerr = []
+        while True:
+            line = self.proc.stderr.readline()
+            if not line:
+                raise ValueError('gnuplot terminated unexpectedly')
+            line = line.decode('latin1')
+            if self.MARK in line:
+                break
+            outerr.append(line)
+
+        return outerr
+
+    def close(self):
+        if self.alive():
+            try:
+                self.proc.stdin.write(b"exit\n")
+                self.proc.stdin.close()
+                self.proc.wait(timeout=10)
+            except Exception:
+                self.proc.kill()
+        return
+
+
+_gnuplot_server = None
+
+def gnuplot_server():
+    """ the gnuplot process of this run, started on first use
+    """
+    global _gnuplot_server
+
+    if _gnuplot_server is None or not _gnuplot_server.alive():
+        _gnuplot_server = GnuPlotServer(GNUPLOT)
+        atexit.register(_gnuplot_server.close)
+
+    return _gnuplot_server
+
+
+def gnuplot_run(inFile, LEVEL1=False, LEVEL2=False):
+    """ run a gnuplot script, on the shared gnuplot process if enabled
+        returns 0 if ok, 1 on error
+    """
+    global _gnuplot_server
+    el = 0
+
+    if not os.path.exists(GNUPLOT):
+        print_dbg(True,"ERROR: gnuplot command '%s' not found." % GNUPLOT)
+        return 1
+
+    print_dbg(LEVEL1,"runGnuPlot: plot png " + inFile)
+    try:
+        with timed('plot', os.path.basename(inFile)):
+            if USE_GNUPLOT_SERVER:
+                try:
+                    outerr = gnuplot_server().run(inFile)
+                except (OSError, ValueError):
+                    # gnuplot died, the next plot gets a new process
+                    _gnuplot_server = None
+                    raise
+                output = []
+            else:
+                proc_out = subprocess.Popen([GNUPLOT, inFile], stdout=subprocess.PIPE,stderr=subprocess.PIPE)
+                output = [n.decode('latin1') for n in proc_out.stdout.readlines()]
+                outerr = [n.decode('latin1') for n in proc_out.stderr.readlines()]
+                proc_out.wait()
+
+        for line in outerr:
+            line = line.strip()
+            m = re.search(RE_GNUPLOT_ERR, line)
+            if m:
+                print_dbg(True, "STDERR: %s" % line)
+                if re.search("warning:",line):
+                    # we ignore warning errors
+                    pass
+                else:
+                    raise ValueError('syntax or plot error in gnuplot file')
+                el = 1
+
+        if LEVEL2:
+            for n in output:
+                print_dbg(True, "STDOUT: %s" % n.strip())
+            for n in outerr:
+                print_dbg(True, "STDERR: %s" % n.strip())
+
+    except Exception as e:
+        print_dbg(True, 'WARN : GnuPlot done with exception(s): %s.' % e)
         el = 1
 
+    return el
+
+
+def runGnuPlot(plt, KEEP_TMP=False, LEVEL1=False, LEVEL2=False):
+    """ run gnuplot
+    """
+    inFile = config.TMPPATH + 'plot' + plt + '.plt'
+
+    el = gnuplot_run(inFile, LEVEL1, LEVEL2)
+
     # cleanup temp files
     if not KEEP_TMP:
         if (os.path.isfile(inFile)):
@@ -124,16 +415,155 @@ def runGnuPlot(plt, KEEP_TMP=False, LEVEL1=False, LEVEL2=False):
     return el
 
 
+#-------------------------------------------------------------------------------
+# upload
+
+# collect the uploads of a run and send them in one transfer per mode at exit
+UPLOAD_BATCH = True
+
+# files are copied here when queued, the caller may delete or rewrite the original
+UPLOADSPOOL = config.TMPPATH + 'upload/'
+
+SCP_OPTIONS = '-o ConnectTimeout=12'
+
+# skip files whose content was already uploaded to the same target
+UPLOAD_SKIP_UNCHANGED = True
+
+# content hashes of the uploaded files, per SCPTARGET; remove it to upload everything again
+UPLOADMANIFEST = getattr(config, 'UPLOADMANIFEST', config.HOMEPATH + 'upload_manifest.json')
+
+_upload_queue = {}
+_upload_hash  = {}
+
+def uploadCommand(files, trans_mode='scp'):
+    """ scp or fscp command line for one or more files
+    """
+    return '%s %s %s %s' % (trans_mode, SCP_OPTIONS, ' '.join(files), config.SCPTARGET)
+
+
+def fileDigest(inFile):
+    """ sha256 of the file content
+    """
+    h = hashlib.sha256()
+    with open(inFile, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def readManifest():
+    """ uploaded hashes for the current SCPTARGET, basename -> sha256
+    """
+    try:
+        with open(UPLOADMANIFEST, 'r') as f:
+            return json.load(f).get(config.SCPTARGET, {})
+    except (OSError, ValueError):
+        return {}
+
+
+def updateManifest(digests):
+    """ record basename -> sha256 of successfully uploaded files
+    """
+    try:
+        with open(UPLOADMANIFEST, 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    manifest.setdefault(config.SCPTARGET, {}).update(digests)
+
+    tmpfile = UPLOADMANIFEST + '.tmp'
+    with open(tmpfile, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmpfile, UPLOADMANIFEST)
+    return
+
+
+def isUploaded(inFile, digest):
+    """ same content was uploaded to this target before
+    """
+    return UPLOAD_SKIP_UNCHANGED and readManifest().get(os.path.basename(inFile)) == digest
+
+
+def queueUpload(inFile, trans_mode='scp', digest=None):
+    """ add a copy of inFile to the upload batch of this run
+    """
+    if not os.path.isdir(UPLOADSPOOL):
+        os.makedirs(UPLOADSPOOL)
+
+    spooled = UPLOADSPOOL + os.path.basename(inFile)
+    shutil.copyfile(inFile, spooled)
+    _upload_hash[spooled] = digest
+
+    if not _upload_queue:
+        atexit.register(flushUploads)
+
+    queue = _upload_queue.setdefault(trans_mode, [])
+    if spooled not in queue:
+        queue.append(spooled)
+
+    print_dbg(True, 'INFO : queued %s for upload.' % (inFile))
+    return
+
+
+def flushUploads():
+    """ send all queued files, one transfer per mode
+        returns 0 if all transfers were ok
+    """
+    el = 0
+
+    for trans_mode in list(_upload_queue):
+        files = _upload_queue.pop(trans_mode)
+        if not files:
+            continue
+
+        print_dbg(True, 'INFO : uploading %s file(s): %s.' % (len(files), ' '.join(os.path.basename(f) for f in files)))
+        try:
+            with timed('upload', '%s %d file(s)' % (trans_mode, len(files))):
+                rc = os.system(uploadCommand(files, trans_mode))
+            if rc != 0:
+                print_dbg(True, 'ERROR: upload with %s failed.' % (trans_mode))
+                el = 1
+            else:
+                updateManifest(dict((os.path.basename(f), _upload_hash[f]) for f in files if _upload_hash.get(f)))
+        except Exception as e:
+            print_dbg(True, 'ERROR: upload %s: %s.' % (' '.join(files),e))
+            el = 1
+
+        for f in files:
+            if (os.path.isfile(f)):
+                os.unlink(f)
+
+    return el
+
+
+def upload(inFile, trans_mode='scp'):
+    """ send one file, queued if UPLOAD_BATCH is set
+        files with the same content as the last upload are skipped
+    """
+    digest = fileDigest(inFile)
+    if isUploaded(inFile, digest):
+        print_dbg(True, 'INFO : %s unchanged, skipping upload.' % (inFile))
+        return
+
+    if UPLOAD_BATCH:
+        queueUpload(inFile, trans_mode, digest)
+    else:
+        print_dbg(True, 'INFO : uploading %s.' % (inFile))
+        with timed('upload', os.path.basename(inFile)):
+            rc = os.system(uploadCommand([inFile], trans_mode))
+        if rc == 0:
+            updateManifest({os.path.basename(inFile): digest})
+    return
+
+
 def uploadAny(inFile, DO_SCP=True, KEEP_IN=False, trans_mode='scp'):
     """ copies the any file to the website
     """
 
-    SCPCOMMAND_PLOTINT = '%s -o ConnectTimeout=12 %s %s' % (trans_mode, inFile, config.SCPTARGET)
-
     if DO_SCP:
         try:
-            print_dbg(True, 'INFO : uploading %s.' % (inFile))
-            os.system(SCPCOMMAND_PLOTINT)
+            upload(inFile, trans_mode)
 
         except Exception as e:
             print_dbg(True, 'ERROR: upload %s: %s.' % (inFile,e))
@@ -151,12 +581,9 @@ def uploadPNG(png, DO_SCP=True, KEEP_PNG=False,trans_mode='scp'):
     """ copies the png file to the website
     """
 
-    SCPCOMMAND_PLOTINT = '%s -o ConnectTimeout=12 %s %s' % (trans_mode, png, config.SCPTARGET)
-
     if DO_SCP:
         try:
-            print_dbg(True, 'INFO : uploading %s.' % (png))
-            os.system(SCPCOMMAND_PLOTINT)
+            upload(png, trans_mode)
 
         except Exception as e:
             print_dbg(True, 'ERROR: upload png %s: %s.' % (png,e))
@@ -197,6 +624,11 @@ def stripNL(text):
 # -------------------------------------------------------------------------------------------
 
 def main():
+    # python wxtools.py [timing log]  ... which script needs how much
+    if len(sys.argv) > 1:
+        timingReport(sys.argv[1])
+    elif os.path.isfile(TIMINGLOG):
+        timingReport(TIMINGLOG)
     return
 
 if __name__ == '__main__':